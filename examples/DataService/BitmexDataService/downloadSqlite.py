@@ -6,9 +6,10 @@ import json
 import time
 import datetime
 
+import pandas as pd
 import requests
 from vnpy.trader.object import BarData
-from vnpy.trader.database import DbBarData, DbTickData
+from vnpy.trader.database import save_bar_data
 
 config = open('config.json')
 setting = json.load(config)
@@ -34,6 +35,23 @@ def generateVtBar(d):
     return bar
 
 
+# ----------------------------------------------------------------------
+def saveBars(rows, symbol, interval, vt_symbol):
+    """批量保存K线数据"""
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return
+
+    df['datetime'] = pd.to_datetime(df['timestamp'], format='%Y-%m-%dT%H:%M:%S.%f0Z')
+    df = df.rename(columns={'open': 'open_price', 'high': 'high_price',
+                            'low': 'low_price', 'close': 'close_price'})
+    df = df[['datetime', 'volume', 'open_price', 'high_price', 'low_price', 'close_price']]
+
+    count, speed = save_bar_data(df, symbol=symbol, exchange="BITMEX", interval=interval,
+                                 vt_symbol=vt_symbol, gateway_name="bitmexgateway")
+    print(u'保存K线数据%s条，速度%.0f条/秒' % (count, speed))
+
+
 # ----------------------------------------------------------------------
 def downMinuteBarBySymbol(symbol, period, start, end):
     """下载某一合约的分钟线数据"""
@@ -61,15 +79,7 @@ def downMinuteBarBySymbol(symbol, period, start, end):
 
     l = resp.json()
 
-    for d in l:
-        # {'timestamp': '2018-07-26T02:00:00.000Z', 'symbol': 'XBTUSD', 'open': 8240.5, 'high': 8255.5, 'low': 8206, 'close': 8224.5, 'trades': 17097, 'volume': 73042086, 'vwap': 8229.0981, 'lastSize': 6000, 'turnover': 887640041277, 'homeNotional': 8876.40041276999, 'foreignNotional': 73042086}
-        # print(d)
-        data = DbBarData(symbol="XBTUSD", exchange="BITMEX",
-                         datetime=datetime.datetime.strptime(d['timestamp'], '%Y-%m-%dT%H:%M:%S.%f0Z'),
-                         interval="", volume=d['volume'], open_price=d['open'], high_price=d['high'],
-                         low_price=d['low'],
-                         close_price=d['close'], vt_symbol="BITMEX", gateway_name="bitmexgateway")
-        data.save()
+    saveBars(l, "XBTUSD", "", "BITMEX")
 
     end_time = time.time()
     cost = (end_time - startTime) * 1000
@@ -106,15 +116,7 @@ def downHourBarBySymbol(symbol, period, start, end):
 
     l = resp.json()
 
-    for d in l:
-        # {'timestamp': '2018-07-26T02:00:00.000Z', 'symbol': 'XBTUSD', 'open': 8240.5, 'high': 8255.5, 'low': 8206, 'close': 8224.5, 'trades': 17097, 'volume': 73042086, 'vwap': 8229.0981, 'lastSize': 6000, 'turnover': 887640041277, 'homeNotional': 8876.40041276999, 'foreignNotional': 73042086}
-        # print(d)
-        data = DbBarData(symbol="XBTUSD", exchange="BITMEX",
-                         datetime=datetime.datetime.strptime(d['timestamp'], '%Y-%m-%dT%H:%M:%S.%f0Z'),
-                         interval="1h", volume=d['volume'], open_price=d['open'], high_price=d['high'],
-                         low_price=d['low'],
-                         close_price=d['close'], vt_symbol="BITMEX", gateway_name="bitmexgateway")
-        data.save()
+    saveBars(l, "XBTUSD", "1h", "BITMEX")
 
     endTime = time.time()
     cost = (endTime - startTime) * 1000
@@ -147,16 +149,7 @@ def downHourBarBySymbol2(symbol, period, startDt, endDt):
 
     l = resp.json()
 
-    for d in l:
-        # {'timestamp': '2018-07-26T02:00:00.000Z', 'symbol': 'XBTUSD', 'open': 8240.5, 'high': 8255.5, 'low': 8206, 'close': 8224.5, 'trades': 17097, 'volume': 73042086, 'vwap': 8229.0981, 'lastSize': 6000, 'turnover': 887640041277, 'homeNotional': 8876.40041276999, 'foreignNotional': 73042086}
-        # print(d)
-        data = DbBarData(symbol=symbol, exchange="BITMEX",
-                         datetime=datetime.datetime.strptime(d['timestamp'], '%Y-%m-%dT%H:%M:%S.%f0Z'),
-                         interval=period, volume=d['volume'], open_price=d['open'], high_price=d['high'],
-                         low_price=d['low'],
-                         close_price=d['close'], vt_symbol='%s.%s' % (symbol, 'BITMEX'), gateway_name="bitmexgateway")
-        data.save()
-        #data.replace()
+    saveBars(l, symbol, period, '%s.%s' % (symbol, 'BITMEX'))
 
     endTime = time.time()
     cost = (endTime - startTime) * 1000
@@ -0,0 +1,71 @@
+"""
+Tests of depth aware order matching.
+"""
+
+from datetime import datetime
+
+from vnpy.app.cta_strategy.matching import DepthOrderArray
+from vnpy.trader.constant import Direction, Exchange
+from vnpy.trader.object import TickData
+
+
+def create_tick(bids: list, asks: list, last_price: float, volume: float):
+    """
+    Create tick with depth of (price, volume) of each level.
+    """
+    tick = TickData(
+        symbol="TEST",
+        exchange=Exchange.CFFEX,
+        datetime=datetime(2019, 1, 1),
+        last_price=last_price,
+        volume=volume,
+        gateway_name="DB",
+    )
+
+    for n, (price, volume) in enumerate(bids, 1):
+        setattr(tick, f"bid_price_{n}", price)
+        setattr(tick, f"bid_volume_{n}", volume)
+
+    for n, (price, volume) in enumerate(asks, 1):
+        setattr(tick, f"ask_price_{n}", price)
+        setattr(tick, f"ask_volume_{n}", volume)
+
+    return tick
+
+
+BIDS = [(100, 10), (99, 10), (98, 10), (97, 10), (96, 10)]
+ASKS = [(102, 10), (103, 10), (104, 10), (105, 10), (106, 10)]
+
+
+def test_stale_last_price_fills_nothing():
+    """
+    Order inside spread is not filled by last price of tick without
+    traded volume.
+    """
+    array = DepthOrderArray()
+    array.match_tick(create_tick(BIDS, ASKS, 100, 1000))
+
+    array.add("long", Direction.LONG, 101, 5)
+
+    assert array.match_tick(create_tick(BIDS, ASKS, 100, 1000)) == []
+    assert array.match_tick(create_tick(BIDS, ASKS, 100, 1000)) == []
+    assert array.volumes[0] == 5
+
+
+def test_trade_through_capped_by_traded_volume():
+    """
+    Order traded through is filled by no more than traded volume.
+    """
+    array = DepthOrderArray()
+    array.match_tick(create_tick(BIDS, ASKS, 100, 1000))
+
+    array.add("long", Direction.LONG, 101, 5)
+    array.match_tick(create_tick(BIDS, ASKS, 100, 1000))
+
+    fills = array.match_tick(create_tick(BIDS, ASKS, 100, 1002))
+    assert fills == [("long", 101.0, 2.0)]
+    assert array.volumes[0] == 3
+
+    fills = array.match_tick(create_tick(BIDS, ASKS, 100, 1010))
+    assert fills == [("long", 101.0, 3.0)]
+    assert array.volumes[0] == 0
@@ -0,0 +1,291 @@
+"""
+Regression tests of BacktestingEngine optimization.
+"""
+
+import multiprocessing
+import random
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from vnpy.app.cta_strategy.backtesting import (
+    BacktestingEngine,
+    OptimizationSetting,
+    generate_walk_forward_windows,
+    load_history_snapshot,
+    save_history_snapshot,
+)
+from vnpy.app.cta_strategy.template import CtaTemplate
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+
+
+class GridStrategy(CtaTemplate):
+    """
+    Grid orders around close price, no order is sent if w is 0.
+    """
+
+    parameters = ["n", "w"]
+    variables = []
+
+    n = 3
+    w = 1
+
+    def on_init(self):
+        """"""
+        self.load_bar(1)
+
+    def on_bar(self, bar: BarData):
+        """"""
+        self.cancel_all()
+
+        if not self.w:
+            return
+
+        for i in range(1, self.n):
+            self.buy(bar.close_price - i, 1)
+            self.short(bar.close_price + i, 1)
+
+
+def generate_bars(count: int):
+    """"""
+    random.seed(1)
+
+    bars = []
+    price = 1000
+    start = datetime(2019, 1, 1)
+
+    for i in range(count):
+        open_price = price
+        price += random.gauss(0, 3)
+
+        bar = BarData(
+            symbol="TEST",
+            exchange=Exchange.CFFEX,
+            datetime=start + timedelta(minutes=i * 10),
+            interval=Interval.MINUTE,
+            open_price=open_price,
+            high_price=max(open_price, price) + abs(random.gauss(0, 2)),
+            low_price=min(open_price, price) - abs(random.gauss(0, 2)),
+            close_price=price,
+            volume=1,
+            gateway_name="DB",
+        )
+        bars.append(bar)
+
+    return bars
+
+
+def create_engine():
+    """"""
+    engine = BacktestingEngine()
+    engine.output = lambda msg: None
+    engine.set_parameters(
+        vt_symbol="TEST.CFFEX",
+        interval=Interval.MINUTE,
+        start=datetime(2019, 1, 1),
+        rate=0.0001,
+        slippage=0.2,
+        size=10,
+        pricetick=0.2,
+        end=datetime(2020, 1, 1),
+    )
+    engine.add_strategy(GridStrategy, {})
+    engine.history_data = generate_bars(1000)
+    return engine
+
+
+def test_no_trade_setting_after_trading_setting(monkeypatch):
+    """
+    Worker engine reused by a setting without trade should not report
+    statistics of the setting run before it.
+    """
+    # All settings run in one warm worker engine, in order of w = 1, 0.
+    monkeypatch.setattr(multiprocessing, "cpu_count", lambda: 1)
+
+    optimization_setting = OptimizationSetting()
+    optimization_setting.params["w"] = [1, 0]
+    optimization_setting.set_target("total_net_pnl")
+
+    engine = create_engine()
+    results = engine.run_optimization(optimization_setting, use_cache=False)
+    statistics = {setting: value for setting, value, _ in results}
+
+    assert statistics[str({"w": 1})] != 0
+    assert statistics[str({"w": 0})] == 0
+
+    for setting, value, result in results:
+        if setting == str({"w": 0}):
+            assert result["total_trade_count"] == 0
+            assert result["total_days"] == 0
+
+
+def test_history_snapshot(tmp_path):
+    """
+    Snapshot loaded by worker gives the same bars, created chunk by chunk
+    from memory-mapped columns.
+    """
+    bars = generate_bars(100)
+
+    data_class, constants = save_history_snapshot(bars, tmp_path)
+    assert constants["symbol"] == "TEST"
+
+    snapshot = load_history_snapshot(tmp_path, data_class, constants)
+    snapshot.chunk_size = 30
+
+    assert len(snapshot) == 100
+    assert list(snapshot) == bars
+    assert snapshot[10] == bars[10]
+    assert list(snapshot[20:50]) == bars[20:50]
+    assert not snapshot[100:]
+
+
+def test_history_snapshot_varying_field(tmp_path):
+    """"""
+    bars = generate_bars(100)
+    bars[50] = replace(bars[50], symbol="OTHER")
+
+    with pytest.raises(ValueError):
+        save_history_snapshot(bars, tmp_path)
+
+
+def run_settings(settings: list, history_data: list = None):
+    """
+    Run backtesting of every setting serially, return dict of setting
+    string and total net pnl.
+    """
+    values = {}
+    for setting in settings:
+        engine = create_engine()
+        engine.add_strategy(GridStrategy, setting)
+        if history_data is not None:
+            engine.history_data = history_data
+        engine.run_backtesting()
+        engine.calculate_result()
+        statistics = engine.calculate_statistics()
+        values[str(setting)] = statistics["total_net_pnl"]
+    return values
+
+
+def test_ga_optimization(monkeypatch):
+    """
+    Every setting evaluated by genetic algorithm gets the same target
+    value as running it alone, and the best one is found when whole
+    parameter space fits in population.
+    """
+    monkeypatch.setattr(multiprocessing, "cpu_count", lambda: 1)
+    random.seed(2)
+
+    optimization_setting = OptimizationSetting()
+    optimization_setting.add_parameter("n", 2, 7, 1)
+    optimization_setting.set_target("total_net_pnl")
+
+    expected = run_settings(optimization_setting.generate_setting())
+
+    engine = create_engine()
+    results = engine.run_ga_optimization(
+        optimization_setting, population_size=3, patience=30, use_cache=False
+    )
+    values = [value for _, value, _ in results]
+
+    assert len(results) == len(set(setting for setting, _, _ in results))
+    assert values == sorted(values, reverse=True)
+    for setting, value, _ in results:
+        assert value == expected[setting]
+
+    results = engine.run_ga_optimization(
+        optimization_setting, population_size=10, use_cache=False
+    )
+    assert len(results) == len(expected)
+    assert results[0][1] == max(expected.values())
+
+
+def test_breed_population():
+    """
+    Best individuals are kept, and new generation has no duplicate and
+    no value out of parameter range.
+    """
+    random.seed(3)
+
+    value_lists = [list(range(10)), [0.1, 0.2, 0.3]]
+    population = [(9, 0.3), (8, 0.3), (1, 0.1), (0, 0.1)]
+    population += [(i, 0.2) for i in range(2, 8)]
+    cache = {key: (str(key), sum(key), {}) for key in population}
+    population.sort(reverse=True, key=lambda key: cache[key][1])
+
+    engine = create_engine()
+    new_population = engine.breed_population(
+        population, value_lists, cache, 0.8, 0.2
+    )
+
+    assert new_population[0] == population[0]
+    assert len(new_population) == len(population)
+    assert len(set(new_population)) == len(new_population)
+    for n, w in new_population:
+        assert n in value_lists[0]
+        assert w in value_lists[1]
+
+
+def test_generate_walk_forward_windows():
+    """"""
+    # Two data every day from day 10 to day 19, and none on day 15.
+    days = [day for day in range(10, 20) if day != 15]
+    day_array = np.repeat(days, 2)
+
+    windows = generate_walk_forward_windows(day_array, 3, 2)
+
+    assert windows == [
+        ((0, 6), (6, 10)),      # train 10-12, test 13-14
+        ((4, 10), (10, 12)),    # train 12-14, test 15-16, day 15 missing
+        ((8, 12), (12, 16)),    # train 14-16, test 17-18
+        ((10, 16), (16, 18)),   # train 16-18, test 19
+    ]
+    assert generate_walk_forward_windows(day_array, 10, 2) == []
+
+
+def test_walk_forward(monkeypatch):
+    """
+    Best in-sample setting of every window is run on its out-of-sample
+    days, and daily results of out-of-sample days are stitched.
+    """
+    monkeypatch.setattr(multiprocessing, "cpu_count", lambda: 1)
+
+    optimization_setting = OptimizationSetting()
+    optimization_setting.add_parameter("n", 2, 5, 1)
+    optimization_setting.set_target("total_net_pnl")
+    settings = optimization_setting.generate_setting()
+
+    engine = create_engine()
+    bars = engine.history_data
+    window_values = engine.run_walk_forward(
+        optimization_setting, 2, 1, use_cache=False
+    )
+
+    assert len(window_values) == 5
+
+    test_days = []
+    for value in window_values:
+        train_bars = [
+            bar for bar in bars
+            if value["train_start"] <= bar.datetime <= value["train_end"]
+        ]
+        expected = run_settings(settings, train_bars)
+        best_setting = max(expected, key=expected.get)
+
+        assert str(value["setting"]) == best_setting
+        assert value["train_target"] == expected[best_setting]
+        assert (value["test_start"] - value["train_start"]).days == 2
+
+        test_days.append(value["test_start"].date())
+
+    df = engine.daily_df
+    assert df.index.is_unique
+    assert set(test_days) <= set(df.index)
+    assert df.index.min() == test_days[0]
+
+    statistics = engine.calculate_statistics()
+    assert statistics["total_net_pnl"] == pytest.approx(
+        sum(value["test_target"] for value in window_values)
+    )
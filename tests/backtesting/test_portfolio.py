@@ -0,0 +1,170 @@
+"""
+Tests of PortfolioBacktestingEngine against backtesting strategies alone.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from vnpy.app.cta_strategy.backtesting import BacktestingEngine
+from vnpy.app.cta_strategy.portfolio import PortfolioBacktestingEngine
+from vnpy.app.cta_strategy.template import CtaTemplate
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+
+START = datetime(2019, 1, 1)
+END = datetime(2020, 1, 1)
+
+# vt_symbol: (size, minutes between bars, count of bars)
+CONTRACTS = {
+    "A.CFFEX": (10, 10, 800),
+    "B.CFFEX": (300, 15, 600),
+}
+
+
+class SpreadStrategy(CtaTemplate):
+    """
+    Buy and short n away from close price of every bar.
+    """
+
+    parameters = ["n"]
+    variables = []
+
+    n = 1
+
+    def on_init(self):
+        """"""
+        self.load_bar(1)
+
+    def on_bar(self, bar: BarData):
+        """"""
+        self.cancel_all()
+        self.buy(bar.close_price - self.n, 1)
+        self.short(bar.close_price + self.n, 1)
+
+
+def generate_bars(vt_symbol: str, minutes: int, count: int):
+    """"""
+    random.seed(vt_symbol)
+
+    symbol, exchange = vt_symbol.split(".")
+    price = 1000
+    bars = []
+
+    for i in range(count):
+        open_price = price
+        price += random.gauss(0, 3)
+
+        bar = BarData(
+            symbol=symbol,
+            exchange=Exchange(exchange),
+            datetime=START + timedelta(minutes=i * minutes),
+            interval=Interval.MINUTE,
+            open_price=open_price,
+            high_price=max(open_price, price) + 1,
+            low_price=min(open_price, price) - 1,
+            close_price=price,
+            volume=1,
+            gateway_name="DB",
+        )
+        bars.append(bar)
+
+    return bars
+
+
+def create_portfolio_engine(history_data: dict):
+    """"""
+    engine = PortfolioBacktestingEngine()
+    engine.output = lambda msg: None
+    engine.set_parameters(Interval.MINUTE, START, END)
+
+    for vt_symbol, (size, _, _) in CONTRACTS.items():
+        engine.add_contract(vt_symbol, size, 0.0001, 0.2, 0.2)
+
+    engine.history_data = history_data
+    return engine
+
+
+def test_merge_history_data():
+    """
+    Data of all symbols are replayed in time order, and data with the
+    same datetime in order of symbols added.
+    """
+    history_data = {
+        vt_symbol: generate_bars(vt_symbol, minutes, 20)
+        for vt_symbol, (_, minutes, _) in CONTRACTS.items()
+    }
+    engine = create_portfolio_engine(history_data)
+
+    sequence = engine.merge_history_data()
+    assert len(sequence) == 40
+
+    keys = [
+        (history_data[vt_symbol][ix].datetime, vt_symbol)
+        for vt_symbol, ix in sequence
+    ]
+    assert keys == sorted(keys)
+
+    for vt_symbol in CONTRACTS:
+        ixs = [ix for symbol, ix in sequence if symbol == vt_symbol]
+        assert ixs == list(range(20))
+
+
+def test_portfolio_same_as_alone():
+    """
+    Trades and daily pnl of every strategy are the same as backtesting
+    it alone, and daily pnl of portfolio is their sum.
+    """
+    history_data = {
+        vt_symbol: generate_bars(vt_symbol, minutes, count)
+        for vt_symbol, (_, minutes, count) in CONTRACTS.items()
+    }
+    engine = create_portfolio_engine(dict(history_data))
+
+    strategies = [
+        ("a1", "A.CFFEX", 1),
+        ("a2", "A.CFFEX", 2),
+        ("b1", "B.CFFEX", 1),
+    ]
+    for strategy_name, vt_symbol, n in strategies:
+        engine.add_strategy(SpreadStrategy, strategy_name, vt_symbol, {"n": n})
+
+    engine.run_backtesting()
+    daily_df = engine.calculate_result()
+
+    for strategy_name, vt_symbol, n in strategies:
+        alone = BacktestingEngine()
+        alone.output = lambda msg: None
+        alone.set_parameters(
+            vt_symbol=vt_symbol,
+            interval=Interval.MINUTE,
+            start=START,
+            rate=0.0001,
+            slippage=0.2,
+            size=CONTRACTS[vt_symbol][0],
+            pricetick=0.2,
+            end=END,
+        )
+        alone.add_strategy(SpreadStrategy, {"n": n})
+        alone.history_data = history_data[vt_symbol]
+        alone.run_backtesting()
+        df = alone.calculate_result()
+
+        sub_engine = engine.engines[strategy_name]
+        assert [
+            (trade.datetime, trade.direction, trade.price)
+            for trade in sub_engine.trades.values()
+        ] == [
+            (trade.datetime, trade.direction, trade.price)
+            for trade in alone.trades.values()
+        ]
+        assert df["net_pnl"].equals(engine.strategy_dfs[strategy_name]["net_pnl"])
+
+    # Symbol B has more days than symbol A.
+    assert len(engine.strategy_dfs["b1"]) > len(engine.strategy_dfs["a1"])
+
+    expected = sum(
+        df["net_pnl"].reindex(daily_df.index, fill_value=0)
+        for df in engine.strategy_dfs.values()
+    )
+    assert (daily_df["net_pnl"] - expected).abs().max() < 1e-6
+    assert daily_df.index.is_monotonic_increasing
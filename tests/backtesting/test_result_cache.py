@@ -0,0 +1,144 @@
+"""
+Tests of backtesting result cache and its invalidation.
+"""
+
+import importlib
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from dataclasses import replace
+
+import vnpy.app.cta_strategy.backtesting as backtesting
+from vnpy.app.cta_strategy.backtesting import OptimizationSetting
+from vnpy.app.cta_strategy.result_cache import ResultCache, get_source_hash
+
+from test_optimization import create_engine
+
+BASE_SOURCE = '''
+from vnpy.app.cta_strategy.template import CtaTemplate
+
+
+class BaseStrategy(CtaTemplate):
+    n = {n}
+'''
+
+CHILD_SOURCE = '''
+from cache_base_strategy import BaseStrategy
+
+
+class ChildStrategy(BaseStrategy):
+    pass
+'''
+
+SENTINEL = 12345
+
+
+def test_evict_least_recently_used(tmp_path):
+    """"""
+    cache = ResultCache(tmp_path, max_size=10_000)
+
+    now = time.time()
+    for i, key in enumerate(["aa1", "bb2", "cc3"]):
+        cache.put(key, b"x" * 4000)
+        os.utime(cache.get_path(key), (now - 100 + i, now - 100 + i))
+
+    # Recently read result is kept, though saved first.
+    assert cache.get("aa1") is not None
+
+    assert cache.evict() == 1
+    assert cache.get("bb2") is None
+    assert cache.get("aa1") is not None
+    assert cache.get("cc3") is not None
+
+    assert cache.clear() == 2
+
+
+def test_source_hash_of_base_class(tmp_path, monkeypatch):
+    """
+    Changing source of module of base class gives new source hash of
+    strategy class.
+    """
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    base_path = tmp_path.joinpath("cache_base_strategy.py")
+    base_path.write_text(BASE_SOURCE.format(n=1))
+    tmp_path.joinpath("cache_child_strategy.py").write_text(CHILD_SOURCE)
+
+    try:
+        import cache_child_strategy
+        first_hash = get_source_hash(cache_child_strategy.ChildStrategy)
+        assert first_hash
+
+        base_path.write_text(BASE_SOURCE.format(n=2))
+        importlib.invalidate_caches()
+        importlib.reload(sys.modules["cache_base_strategy"])
+
+        assert get_source_hash(cache_child_strategy.ChildStrategy) != first_hash
+    finally:
+        sys.modules.pop("cache_base_strategy", None)
+        sys.modules.pop("cache_child_strategy", None)
+
+    # Strategy without source code found is not cached.
+    strategy_class = type("ShellStrategy", (), {"__module__": "not_loaded"})
+    assert get_source_hash(strategy_class) == ""
+
+
+def fake_cached_results(folder):
+    """
+    Replace target value of all cached results with sentinel, so that
+    results taken from cache can be told.
+    """
+    for path in folder.glob("*/*.pkl"):
+        with open(path, "rb") as f:
+            statistics = pickle.load(f)
+
+        statistics["total_net_pnl"] = SENTINEL
+
+        with open(path, "wb") as f:
+            pickle.dump(statistics, f)
+
+
+def run_optimization(engine):
+    """"""
+    optimization_setting = OptimizationSetting()
+    optimization_setting.add_parameter("n", 2, 4, 1)
+    optimization_setting.set_target("total_net_pnl")
+
+    results = engine.run_optimization(optimization_setting)
+    return [value for _, value, _ in results]
+
+
+def test_optimization_cache_invalidated(tmp_path, monkeypatch):
+    """
+    Results are taken from cache only if history data and engine
+    parameters are both unchanged.
+    """
+    monkeypatch.setattr(multiprocessing, "cpu_count", lambda: 1)
+    monkeypatch.setattr(
+        backtesting, "ResultCache", lambda: ResultCache(tmp_path)
+    )
+
+    engine = create_engine()
+    values = run_optimization(engine)
+    assert SENTINEL not in values
+    assert len(list(tmp_path.glob("*/*.pkl"))) == 3
+
+    fake_cached_results(tmp_path)
+    assert run_optimization(engine) == [SENTINEL] * 3
+
+    # Changed history data
+    engine = create_engine()
+    bar = engine.history_data[500]
+    engine.history_data[500] = replace(bar, close_price=bar.close_price + 1)
+    assert SENTINEL not in run_optimization(engine)
+
+    # Changed engine parameters
+    fake_cached_results(tmp_path)
+    engine = create_engine()
+    engine.rate = 0.0002
+    assert SENTINEL not in run_optimization(engine)
+
+    engine = create_engine()
+    assert run_optimization(engine) == [SENTINEL] * 3
@@ -0,0 +1,90 @@
+"""
+Tests of columnar bar store.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from vnpy.app.cta_strategy.backtesting import BacktestingEngine
+from vnpy.trader.bar_store import PRICE_COLUMNS, BarStore
+from vnpy.trader.constant import Interval
+
+VT_SYMBOL = "TEST.CFFEX"
+START = datetime(2019, 1, 1)
+
+
+def generate_columns(start: datetime, count: int):
+    """"""
+    columns = {
+        "datetime": np.array(
+            [start + timedelta(minutes=i) for i in range(count)],
+            dtype="datetime64[ns]"
+        )
+    }
+    for name in PRICE_COLUMNS:
+        columns[name] = np.arange(count, dtype=float)
+    return columns
+
+
+def test_coverage(tmp_path):
+    """"""
+    store = BarStore(tmp_path)
+    interval = Interval.MINUTE.value
+
+    assert not store.covers(VT_SYMBOL, interval, START, START)
+
+    store.save_columns(VT_SYMBOL, interval, generate_columns(START, 100))
+
+    end = START + timedelta(minutes=99)
+    assert store.covers(VT_SYMBOL, interval, START, end)
+    assert not store.covers(VT_SYMBOL, interval, START, end + timedelta(minutes=1))
+    assert not store.covers(VT_SYMBOL, interval, START - timedelta(minutes=1), end)
+
+    # Overlapped ranges are merged.
+    start = START + timedelta(minutes=50)
+    store.save_columns(VT_SYMBOL, interval, generate_columns(start, 100))
+
+    end = START + timedelta(minutes=149)
+    assert store.covers(VT_SYMBOL, interval, START, end)
+    assert len(store.load_coverage(VT_SYMBOL, interval)) == 1
+    assert len(store.load_bar_columns(VT_SYMBOL, interval)) == 150
+
+    # Disjoint range does not cover the gap.
+    start = START + timedelta(days=1)
+    store.save_columns(VT_SYMBOL, interval, generate_columns(start, 10))
+
+    assert len(store.load_coverage(VT_SYMBOL, interval)) == 2
+    assert not store.covers(VT_SYMBOL, interval, START, start)
+
+
+def test_backtesting_falls_back_if_not_covered(tmp_path):
+    """"""
+    store = BarStore(tmp_path)
+    store.save_columns(
+        VT_SYMBOL, Interval.MINUTE.value, generate_columns(START, 100)
+    )
+
+    engine = BacktestingEngine()
+    engine.bar_store = store
+
+    engine.set_parameters(
+        vt_symbol=VT_SYMBOL,
+        interval=Interval.MINUTE.value,
+        start=START,
+        end=START + timedelta(minutes=99),
+        rate=0,
+        slippage=0,
+        size=1,
+        pricetick=1,
+    )
+    columns = engine.load_bar_columns()
+    assert len(columns) == 100
+
+    bars = list(columns.iter_bars(30))
+    assert len(bars) == 100
+    assert bars[-1].datetime == START + timedelta(minutes=99)
+    assert bars[-1].close_price == 99
+
+    engine.end = START + timedelta(days=1)
+    assert engine.load_bar_columns() is None
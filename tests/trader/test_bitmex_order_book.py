@@ -0,0 +1,200 @@
+"""
+Tests of BitMEX local order book maintained by orderBookL2 data.
+"""
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from vnpy.gateway.bitmex.bitmex_gateway import (
+    ASK_PRICE_NAMES,
+    ASK_VOLUME_NAMES,
+    BID_PRICE_NAMES,
+    BID_VOLUME_NAMES,
+    DEPTH_LEVELS,
+    BitmexWebsocketApi,
+)
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import SubscribeRequest
+
+SYMBOL = "XBTUSD"
+TOPIC = "orderBookL2"
+TIMESTAMP = "2019-01-01T08:00:00.123Z"
+
+
+@pytest.fixture
+def api():
+    """
+    Websocket api with fake gateway, and packets sent recorded instead.
+    """
+    gateway = SimpleNamespace(gateway_name="BITMEX", ticks=[], logs=[])
+    gateway.on_tick = gateway.ticks.append
+    gateway.write_log = gateway.logs.append
+
+    api = BitmexWebsocketApi(gateway)
+    api.depth_topic = TOPIC
+    api.batch_callbacks[TOPIC] = api.on_book
+
+    api.sent = []
+    api.send_packet = api.sent.append
+
+    api.subscribe(SubscribeRequest(symbol=SYMBOL, exchange=Exchange.BITMEX))
+    return api
+
+
+def send(api, action: str, data: list):
+    """"""
+    for d in data:
+        d.setdefault("symbol", SYMBOL)
+        d.setdefault("timestamp", TIMESTAMP)
+    api.on_packet({"table": TOPIC, "action": action, "data": data})
+
+
+def get_tick_top(tick):
+    """"""
+    return tuple(
+        tuple(getattr(tick, name) for name in names)
+        for names in (
+            BID_PRICE_NAMES, BID_VOLUME_NAMES, ASK_PRICE_NAMES, ASK_VOLUME_NAMES
+        )
+    )
+
+
+def get_reference_top(levels: dict):
+    """
+    Get top levels of reference book, dict of id: [side, price, size].
+    """
+    bids = sorted(
+        (level for level in levels.values() if level[0] == "Buy"),
+        key=lambda level: -level[1]
+    )
+    asks = sorted(
+        (level for level in levels.values() if level[0] == "Sell"),
+        key=lambda level: level[1]
+    )
+
+    padding = [0] * DEPTH_LEVELS
+    return (
+        tuple(([level[1] for level in bids] + padding)[:DEPTH_LEVELS]),
+        tuple(([level[2] for level in bids] + padding)[:DEPTH_LEVELS]),
+        tuple(([level[1] for level in asks] + padding)[:DEPTH_LEVELS]),
+        tuple(([level[2] for level in asks] + padding)[:DEPTH_LEVELS]),
+    )
+
+
+def partial(api, levels: dict):
+    """"""
+    data = [
+        {"id": level_id, "side": side, "price": price, "size": size}
+        for level_id, (side, price, size) in levels.items()
+    ]
+    send(api, "partial", data)
+
+
+def generate_levels():
+    """
+    Bids priced 1 to 100 and asks priced 101 to 200, so book is never
+    crossed.
+    """
+    levels = {}
+    for price in range(90, 96):
+        levels[price] = ["Buy", price, price * 10]
+    for price in range(105, 111):
+        levels[price] = ["Sell", price, price * 10]
+    return levels
+
+
+def test_random_updates(api):
+    """
+    Tick pushed is always the same as top levels of reference book, and
+    only pushed when top levels changed.
+    """
+    rng = random.Random(1)
+
+    levels = generate_levels()
+    partial(api, levels)
+
+    top = get_reference_top(levels)
+    assert len(api.gateway.ticks) == 1
+    assert get_tick_top(api.gateway.ticks[-1]) == top
+
+    for _ in range(3000):
+        action = rng.choice(["insert", "update", "delete"])
+        data = []
+
+        for _ in range(rng.randint(1, 3)):
+            if action == "insert":
+                side = rng.choice(["Buy", "Sell"])
+                if side == "Buy":
+                    price = rng.randint(1, 100)
+                else:
+                    price = rng.randint(101, 200)
+
+                if price in levels:
+                    continue
+
+                levels[price] = [side, price, rng.randint(1, 100)]
+                data.append({"id": price, "side": side, "price": price, "size": levels[price][2]})
+
+            elif levels:
+                level_id = rng.choice(list(levels.keys()))
+                if any(d["id"] == level_id for d in data):
+                    continue
+
+                if action == "update":
+                    levels[level_id][2] = rng.randint(1, 100)
+                    data.append({"id": level_id, "size": levels[level_id][2]})
+                else:
+                    levels.pop(level_id)
+                    data.append({"id": level_id})
+
+        tick_count = len(api.gateway.ticks)
+        send(api, action, data)
+
+        new_top = get_reference_top(levels)
+        if new_top == top:
+            assert len(api.gateway.ticks) == tick_count
+        else:
+            assert len(api.gateway.ticks) == tick_count + 1
+            assert get_tick_top(api.gateway.ticks[-1]) == new_top
+            top = new_top
+
+    assert not api.sent
+    assert api.gateway.ticks[-1].epoch_ns
+
+
+@pytest.mark.parametrize("action, data", [
+    ("update", [{"id": 999, "size": 1}]),                       # unknown id
+    ("delete", [{"id": 999}]),                                  # unknown id
+    ("insert", [{"id": 95, "side": "Buy", "price": 1, "size": 1}]),     # same id
+    ("insert", [{"id": 1, "side": "Buy", "price": 95, "size": 1}]),     # same price
+    ("insert", [{"id": 120, "side": "Buy", "price": 120, "size": 1}]),  # crossed
+])
+def test_resync(api, action, data):
+    """
+    Inconsistent data makes books subscribed again, and updates are
+    ignored until new partial.
+    """
+    partial(api, generate_levels())
+    tick_count = len(api.gateway.ticks)
+
+    send(api, action, data)
+
+    assert api.sent == [
+        {"op": "unsubscribe", "args": [TOPIC]},
+        {"op": "subscribe", "args": [TOPIC]},
+    ]
+    assert not api.books
+    assert len(api.gateway.ticks) == tick_count
+
+    send(api, "update", [{"id": 95, "size": 1}])
+    assert len(api.gateway.ticks) == tick_count
+    assert len(api.sent) == 2
+
+    levels = generate_levels()
+    levels[95][2] = 1
+    partial(api, levels)
+
+    assert len(api.gateway.ticks) == tick_count + 1
+    assert get_tick_top(api.gateway.ticks[-1]) == get_reference_top(levels)
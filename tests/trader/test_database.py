@@ -0,0 +1,145 @@
+"""
+Tests of chunked bulk save and streaming load of database.
+"""
+
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+import pytest
+from pandas import DataFrame
+
+from vnpy.trader import database
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import (
+    DB,
+    DbBarData,
+    DbTickData,
+    load_bar_data,
+    load_tick_data,
+    save_bar_data,
+    save_tick_data,
+)
+from vnpy.trader.object import BarData, TickData
+
+START = datetime(2019, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def temp_database(tmp_path):
+    """
+    Bind database to a temp file instead of the one in .vntrader folder.
+    """
+    DB.close()
+    DB.init(str(tmp_path.joinpath("test.db")))
+    DB.connect()
+    DB.create_tables([DbBarData, DbTickData])
+
+    yield
+
+    DB.close()
+    DB.init(database.dbname)
+    DB.connect()
+
+
+def generate_bars(count: int):
+    """"""
+    bars = []
+    for i in range(count):
+        bar = BarData(
+            symbol="TEST",
+            exchange=Exchange.CFFEX,
+            datetime=START + timedelta(minutes=i),
+            interval=Interval.MINUTE,
+            volume=i,
+            open_price=i + 0.5,
+            high_price=i + 1.5,
+            low_price=i - 0.5,
+            close_price=i + 0.25,
+            gateway_name="DB",
+        )
+        bars.append(bar)
+    return bars
+
+
+@pytest.mark.parametrize("chunk_size", [7, 50, 1000])
+def test_bar_round_trip(chunk_size):
+    """
+    Bars are loaded the same as saved, for chunk size not dividing,
+    dividing and larger than count of bars.
+    """
+    bars = generate_bars(350)
+
+    count, _ = save_bar_data(bars, chunk_size)
+    assert count == 350
+
+    loaded = list(load_bar_data(
+        "TEST.CFFEX", Interval.MINUTE.value, chunk_size=chunk_size
+    ))
+    assert loaded == bars
+
+    start = bars[13].datetime
+    end = bars[301].datetime
+    loaded = list(load_bar_data(
+        "TEST.CFFEX", Interval.MINUTE.value, start, end, chunk_size
+    ))
+    assert loaded == bars[13:302]
+
+
+def test_save_replaces_existing_bars():
+    """"""
+    bars = generate_bars(100)
+    save_bar_data(bars, 30)
+
+    changed = [replace(bar, close_price=-1) for bar in bars[50:]]
+    save_bar_data(changed, 30)
+
+    loaded = list(load_bar_data("TEST.CFFEX", Interval.MINUTE.value))
+    assert loaded == bars[:50] + changed
+    assert DbBarData.select().count() == 100
+
+
+def test_save_data_frame_with_constants():
+    """"""
+    bars = generate_bars(100)
+    columns = ["open_price", "high_price", "low_price", "close_price", "volume"]
+
+    df = DataFrame(
+        [[getattr(bar, name) for name in columns] for bar in bars],
+        columns=columns,
+        index=[bar.datetime for bar in bars],
+    )
+    save_bar_data(
+        df,
+        symbol="TEST",
+        exchange=Exchange.CFFEX,
+        interval=Interval.MINUTE,
+    )
+
+    loaded = list(load_bar_data("TEST.CFFEX", Interval.MINUTE.value))
+    assert loaded == bars
+
+
+def test_tick_round_trip():
+    """
+    Pre close of tick is saved in close price field.
+    """
+    ticks = []
+    for i in range(20):
+        tick = TickData(
+            symbol="TEST",
+            exchange=Exchange.CFFEX,
+            datetime=START + timedelta(seconds=i),
+            name="TEST",
+            last_price=i + 0.5,
+            pre_close=99.0,
+            bid_price_1=i,
+            ask_price_1=i + 1,
+            gateway_name="DB",
+        )
+        ticks.append(tick)
+
+    save_tick_data(ticks, 6)
+    assert DbTickData.get().close_price == 99
+
+    loaded = list(load_tick_data("TEST.CFFEX", chunk_size=6))
+    assert loaded == ticks
@@ -0,0 +1,66 @@
+"""
+Tests of ShardedEventEngine.
+"""
+
+from threading import Lock
+from time import sleep, time
+from types import SimpleNamespace
+
+from vnpy.event import Event, ShardedEventEngine
+
+EVENT_TICK = "eTick."
+EVENT_LOG = "eLog"
+
+
+def wait_until(condition, timeout: float = 5):
+    """"""
+    end = time() + timeout
+    while not condition() and time() < end:
+        sleep(0.01)
+
+
+def test_sharded_event_count():
+    """
+    Events with key put into both worker lane and global lane for
+    general handlers are counted only once.
+    """
+    engine = ShardedEventEngine(worker_count=4)
+
+    lock = Lock()
+    received = {}
+
+    def on_event(event: Event):
+        with lock:
+            received[event.type] = received.get(event.type, 0) + 1
+
+    def on_general(event: Event):
+        with lock:
+            received["general"] = received.get("general", 0) + 1
+
+    engine.register(EVENT_TICK, on_event)
+    engine.register(EVENT_LOG, on_event)
+    engine.register_general(on_general)
+    engine.start()
+
+    symbols = ["A.TEST", "B.TEST", "C.TEST"]
+    for i in range(600):
+        tick = SimpleNamespace(vt_symbol=symbols[i % 3], last_price=i)
+        engine.put(Event(EVENT_TICK, tick))
+
+    engine.put(Event(EVENT_LOG, "a"))
+    engine.put(Event(EVENT_LOG, "b"))
+
+    try:
+        wait_until(lambda: received.get("general", 0) >= 602)
+        wait_until(lambda: engine.get_counters()["event_count"] >= 602)
+        sleep(0.1)
+    finally:
+        engine.stop()
+
+    assert received[EVENT_TICK] == 600
+    assert received[EVENT_LOG] == 2
+
+    # Timer events may also be counted while waiting.
+    counters = engine.get_counters()
+    timer_count = received["general"] - 602
+    assert counters["event_count"] == 602 + timer_count
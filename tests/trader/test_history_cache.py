@@ -0,0 +1,110 @@
+"""
+Tests of history data cache used by CtaEngine.
+"""
+
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from vnpy.app.cta_strategy.history_cache import HistoryCache, get_data_size
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+
+START = datetime(2019, 1, 1)
+
+
+def create_data(n: int):
+    """"""
+    return SimpleNamespace(datetime=START + timedelta(seconds=n))
+
+
+def test_update_within_max_size():
+    """
+    Live updates past max size trim the oldest data of window.
+    """
+    data_size = get_data_size(create_data(0))
+    max_size = data_size * 100
+
+    cache = HistoryCache(max_size=max_size)
+    key = ("tick", "TEST.CFFEX")
+
+    def query(start: datetime, end: datetime):
+        return [create_data(n) for n in range(50)]
+
+    cache.load(key, START, START + timedelta(seconds=49), query)
+
+    for n in range(50, 1000):
+        cache.update(key, create_data(n))
+        assert cache.total_size <= max_size
+
+    window = cache.windows[key]
+    assert window.size == cache.total_size
+    assert window.datetimes[-1] == START + timedelta(seconds=999)
+    assert window.start == window.datetimes[0]
+    assert window.datetimes == sorted(window.datetimes)
+
+
+def test_update_evicts_other_windows():
+    """
+    Live updates past max size evict least recently used windows first.
+    """
+    data_size = get_data_size(create_data(0))
+    cache = HistoryCache(max_size=data_size * 100)
+
+    def query(start: datetime, end: datetime):
+        return [create_data(n) for n in range(40)]
+
+    end = START + timedelta(seconds=39)
+    cache.load(("bar", "A"), START, end, query)
+    cache.load(("bar", "B"), START, end, query)
+
+    for n in range(40, 80):
+        cache.update(("bar", "B"), create_data(n))
+
+    assert list(cache.windows) == [("bar", "B")]
+    assert len(cache.windows[("bar", "B")]) == 80
+    assert cache.total_size == data_size * 80
+
+
+def test_slotted_tick_size():
+    """
+    Values of slotted tick are counted in its size, the same as values
+    of bar kept in __dict__.
+    """
+    tick = TickData(
+        symbol="TEST",
+        exchange=Exchange.CFFEX,
+        datetime=START,
+        last_price=1.5,
+        bid_price_1=1.0,
+        ask_price_1=2.0,
+        gateway_name="DB",
+    )
+    assert not hasattr(tick, "__dict__")
+
+    values_size = sum(
+        sys.getsizeof(value)
+        for value in (tick.datetime, tick.last_price, tick.bid_price_1, tick.ask_price_1)
+    )
+    assert get_data_size(tick) == sys.getsizeof(tick) + values_size
+
+
+def test_record_slotted_tick():
+    """"""
+    pytest.importorskip("pymongo")
+    from vnpy.app.dataRecorder.drEngine import getDataDict
+
+    tick = TickData(
+        symbol="TEST",
+        exchange=Exchange.CFFEX,
+        datetime=START,
+        last_price=1.5,
+        gateway_name="DB",
+    )
+
+    d = getDataDict(tick)
+    assert d["last_price"] == 1.5
+    assert d["gateway_name"] == "DB"
+    assert d["vt_symbol"] == "TEST.CFFEX"
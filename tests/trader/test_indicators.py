@@ -0,0 +1,158 @@
+"""
+Parity tests of incremental indicators against talib.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import talib
+
+from vnpy.trader.utility import (
+    AdxIndicator,
+    ArrayManager,
+    AtrIndicator,
+    CciIndicator,
+    DonchianIndicator,
+    EmaIndicator,
+    MacdIndicator,
+    RsiIndicator,
+    SmaIndicator,
+    StdIndicator,
+)
+
+
+def generate_prices(count: int = 600):
+    """
+    Random walk of high, low and close prices with flat stretches, where
+    price stops moving at all.
+    """
+    rng = np.random.RandomState(1)
+
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    high = close + np.abs(rng.normal(0, 0.5, count))
+    low = close - np.abs(rng.normal(0, 0.5, count))
+
+    for start, end in [(20, 40), (120, 170), (300, 320), (450, 600)]:
+        if start >= count:
+            break
+        close[start:end] = close[start]
+        high[start:end] = close[start]
+        low[start:end] = close[start]
+
+    return high, low, close
+
+
+def run_indicator(indicator, high, low, close):
+    """"""
+    values = []
+    for bar in zip(high.tolist(), low.tolist(), close.tolist()):
+        values.append(indicator.update(*bar))
+    return np.array(values, dtype=float)
+
+
+def assert_parity(values, expected):
+    """"""
+    assert np.array_equal(np.isnan(values), np.isnan(expected))
+    np.testing.assert_allclose(values, expected, rtol=1e-6, atol=1e-6)
+
+
+@pytest.mark.parametrize("n", [2, 14])
+@pytest.mark.parametrize("name, indicator_class, function, inputs", [
+    ("sma", SmaIndicator, talib.SMA, "c"),
+    ("ema", EmaIndicator, talib.EMA, "c"),
+    ("std", StdIndicator, talib.STDDEV, "c"),
+    ("atr", AtrIndicator, talib.ATR, "hlc"),
+    ("rsi", RsiIndicator, talib.RSI, "c"),
+    ("cci", CciIndicator, talib.CCI, "hlc"),
+    ("adx", AdxIndicator, talib.ADX, "hlc"),
+])
+def test_single_value_indicator(name, indicator_class, function, inputs, n):
+    """"""
+    high, low, close = generate_prices()
+    arrays = {"h": high, "l": low, "c": close}
+
+    values = run_indicator(indicator_class(n), high, low, close)
+    expected = function(*[arrays[i] for i in inputs], n)
+
+    assert_parity(values, expected)
+
+
+def test_macd_indicator():
+    """"""
+    high, low, close = generate_prices()
+
+    indicator = MacdIndicator(12, 26, 9)
+    values = []
+    for bar in zip(high.tolist(), low.tolist(), close.tolist()):
+        values.append(indicator.update(*bar))
+    values = np.array(values, dtype=float)
+
+    for i, expected in enumerate(talib.MACD(close, 12, 26, 9)):
+        assert_parity(values[:, i], expected)
+
+
+def test_donchian_indicator():
+    """"""
+    high, low, close = generate_prices()
+
+    indicator = DonchianIndicator(20)
+    values = []
+    for bar in zip(high.tolist(), low.tolist(), close.tolist()):
+        values.append(indicator.update(*bar))
+    values = np.array(values, dtype=float)
+
+    assert_parity(values[:, 0], talib.MAX(high, 20))
+    assert_parity(values[:, 1], talib.MIN(low, 20))
+
+
+def test_rsi_flat_after_move():
+    """
+    Average loss is zero while average gain only decays after price
+    stops moving, talib gives 100 instead of 0.
+    """
+    close = np.array([1, 2] + [2] * 40, dtype=float)
+
+    values = run_indicator(RsiIndicator(2), close, close, close)
+    assert_parity(values, talib.RSI(close, 2))
+    assert values[-1] == 100
+
+    close = np.array([1, 2] + [2] * 400, dtype=float)
+
+    values = run_indicator(RsiIndicator(14), close, close, close)
+    assert_parity(values, talib.RSI(close, 14))
+    assert values[-1] == 100
+
+    # No move at all gives 0.
+    close = np.array([2] * 40, dtype=float)
+
+    values = run_indicator(RsiIndicator(14), close, close, close)
+    assert_parity(values, talib.RSI(close, 14))
+    assert values[-1] == 0
+
+
+def test_indicator_requested_before_inited():
+    """
+    Indicator first used before array manager is inited is warmed up
+    with bars received only.
+    """
+    high, low, close = generate_prices(60)
+
+    am = ArrayManager(size=100, incremental=True)
+
+    for i in range(len(close)):
+        bar = SimpleNamespace(
+            open_price=close[i],
+            high_price=high[i],
+            low_price=low[i],
+            close_price=close[i],
+            volume=1,
+        )
+        am.update_bar(bar)
+
+        if i == 30:
+            am.rsi(14)
+            am.atr(14)
+
+    np.testing.assert_allclose(am.rsi(14), talib.RSI(close, 14)[-1])
+    np.testing.assert_allclose(am.atr(14), talib.ATR(high, low, close, 14)[-1])
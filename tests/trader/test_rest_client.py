@@ -0,0 +1,97 @@
+"""
+Tests of RestClient and AsyncRestClient against a local HTTP server.
+"""
+
+import json
+import subprocess
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import sleep
+
+import pytest
+
+from vnpy.api.rest import AsyncRestClient, RequestPriority, RestClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Reply path of request, with status 404 if path contains "bad".
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        """"""
+        sleep(0.05)
+
+        body = json.dumps({"path": self.path}).encode()
+        if "bad" in self.path:
+            self.send_response(404)
+        else:
+            self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        """"""
+        pass
+
+
+@pytest.fixture(scope="module")
+def url_base():
+    """"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("client_class", [RestClient, AsyncRestClient])
+def test_priority_and_status(client_class, url_base):
+    """
+    Requests waiting in queue are sent by priority, and any 2xx status
+    is success.
+    """
+    paths = []
+    failed = []
+
+    client = client_class()
+    client.init(url_base)
+    client.on_failed = lambda status_code, request: failed.append(status_code)
+    client.start(1)
+
+    def callback(data, request):
+        paths.append(data["path"])
+
+    # The only worker is busy with first request while others are added.
+    client.add_request("GET", "/first", callback)
+    sleep(0.02)
+
+    client.add_request("GET", "/query", callback, priority=RequestPriority.low)
+    client.add_request(
+        "POST", "/order", callback, params={"id": "1 2"},
+        priority=RequestPriority.high
+    )
+    client.add_request("GET", "/bad", callback)
+
+    client.join()
+    client.stop()
+
+    assert paths == ["/first", "/order?id=1+2", "/query"]
+    assert failed == [404]
+
+
+def test_import_without_aiohttp():
+    """
+    Synchronous client and BitMEX gateway do not need aiohttp.
+    """
+    code = (
+        "import sys; sys.modules['aiohttp'] = None; "
+        "import vnpy.api.rest, vnpy.gateway.bitmex.bitmex_gateway"
+    )
+    subprocess.check_call([sys.executable, "-c", code])
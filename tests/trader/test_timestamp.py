@@ -0,0 +1,114 @@
+"""
+Tests of fast timestamp parsing against datetime.strptime.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from vnpy.trader import timestamp
+from vnpy.trader.timestamp import (
+    get_epoch_ns,
+    parse_ctp_timestamp,
+    parse_iso_timestamp,
+    parse_timestamp,
+)
+
+
+def generate_datetimes(count: int = 1000):
+    """
+    Random datetimes with microseconds, including leap day and the
+    first and last second of day.
+    """
+    rng = random.Random(1)
+
+    dts = [
+        datetime(2020, 2, 29, 0, 0, 0),
+        datetime(2019, 12, 31, 23, 59, 59, 999999),
+        datetime(1970, 1, 1),
+        datetime(1969, 12, 31, 23, 59, 59, 500000),
+    ]
+    for _ in range(count):
+        dt = datetime(2000, 1, 1) + timedelta(
+            seconds=rng.randrange(40 * 365 * 86400),
+            microseconds=rng.randrange(1_000_000)
+        )
+        dts.append(dt)
+
+    return dts
+
+
+def test_parse_timestamp():
+    """"""
+    for dt in generate_datetimes():
+        time_str = dt.strftime("%H:%M:%S.%f")
+
+        assert parse_timestamp(dt.strftime("%Y%m%d"), time_str) == dt
+        assert parse_timestamp(dt.strftime("%Y-%m-%d"), time_str) == dt
+
+        # Fraction of second with less digits, or none.
+        expected = dt.replace(microsecond=dt.microsecond // 1000 * 1000)
+        assert parse_timestamp(
+            dt.strftime("%Y%m%d"), time_str[:12]
+        ) == expected
+
+        expected = dt.replace(microsecond=0)
+        assert parse_timestamp(
+            dt.strftime("%Y%m%d"), time_str[:8]
+        ) == expected
+
+
+def test_parse_ctp_timestamp():
+    """"""
+    for dt in generate_datetimes():
+        dt = dt.replace(microsecond=dt.microsecond // 1000 * 1000)
+
+        assert parse_ctp_timestamp(
+            dt.strftime("%Y%m%d"),
+            dt.strftime("%H:%M:%S"),
+            dt.microsecond // 1000
+        ) == dt
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2019-01-01T08:00:00.123Z", datetime(2019, 1, 1, 8, 0, 0, 123000)),
+    ("2019-01-01T08:00:00.123456Z", datetime(2019, 1, 1, 8, 0, 0, 123456)),
+    ("2019-01-01T08:00:00.5Z", datetime(2019, 1, 1, 8, 0, 0, 500000)),
+    ("2019-01-01T08:00:00Z", datetime(2019, 1, 1, 8, 0, 0)),
+    ("2019-01-01T08:00:00", datetime(2019, 1, 1, 8, 0, 0)),
+])
+def test_parse_iso_timestamp(text, expected):
+    """"""
+    assert parse_iso_timestamp(text) == expected
+
+
+def test_parse_iso_timestamp_random():
+    """"""
+    for dt in generate_datetimes():
+        text = dt.strftime("%Y-%m-%dT%H:%M:%S.%f")[:23] + "Z"
+        expected = datetime.strptime(text, "%Y-%m-%dT%H:%M:%S.%fZ")
+
+        assert parse_iso_timestamp(text) == expected
+
+
+def test_get_epoch_ns():
+    """"""
+    for dt in generate_datetimes():
+        expected = np.datetime64(dt, "ns").astype(np.int64)
+        assert get_epoch_ns(dt) == expected
+
+
+def test_date_cache_size(monkeypatch):
+    """
+    Date cache is cleared when full, and parsing is still right.
+    """
+    monkeypatch.setattr(timestamp, "DATE_CACHE_SIZE", 10)
+    monkeypatch.setattr(timestamp, "date_cache", {})
+
+    start = datetime(2019, 1, 1)
+    for i in range(100):
+        dt = start + timedelta(days=i, hours=i % 24)
+        assert parse_timestamp(dt.strftime("%Y%m%d"), dt.strftime("%H:%M:%S")) == dt
+        assert len(timestamp.date_cache) <= 10
@@ -1 +1,2 @@
-from .rest_client import Request, RequestStatus, RestClient
+from .rest_client import Request, RequestPriority, RequestStatus, RestClient
+from .async_rest_client import AsyncRestClient
@@ -0,0 +1,223 @@
+# encoding: UTF-8
+
+import asyncio
+import json
+import sys
+from threading import Lock, Thread
+from urllib.parse import urlencode
+
+from requests import ConnectionError
+
+from .rest_client import Request, RestClient
+
+
+class AsyncResponse(object):
+    """
+    Response of AsyncRestClient, with the same attributes as
+    requests.Response used by callbacks.
+    """
+
+    def __init__(self, status_code: int, headers, content: bytes, encoding: str):
+        """"""
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def text(self):
+        """"""
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        """"""
+        return json.loads(self.content)
+
+
+class AsyncRestClient(RestClient):
+    """
+    HTTP Client running on asyncio, with the same interface as RestClient.
+
+    All requests are sent by n worker coroutines in one event loop thread,
+    sharing a keep-alive connection pool of at most n connections. Requests
+    waiting in queue are sent in order of priority, so that orders are not
+    delayed by queries added before them.
+
+    Callbacks are called in event loop thread, and should not block.
+
+    aiohttp is imported only when the client is started. Its connection
+    errors are raised as requests.ConnectionError to callbacks, the same
+    as RestClient.
+    """
+
+    def __init__(self):
+        """"""
+        super(AsyncRestClient, self).__init__()
+
+        self.proxy = None
+
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._workers = []
+
+        self._queue = None  # asyncio.PriorityQueue created in event loop
+        self._queue_lock = Lock()
+        self._pending = []  # requests added before client started
+
+    def init(self, url_base: str, proxy_host: str = "", proxy_port: int = 0):
+        """"""
+        super(AsyncRestClient, self).init(url_base, proxy_host, proxy_port)
+
+        if proxy_host and proxy_port:
+            self.proxy = f"http://{proxy_host}:{proxy_port}"
+
+    def _create_session(self, n: int):
+        """"""
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=n, limit_per_host=n)
+        return aiohttp.ClientSession(connector=connector)
+
+    def start(self, n: int = 3):
+        """
+        Start rest client with n concurrent connections.
+        """
+        if self._active:
+            return
+
+        self._active = True
+        self._loop = asyncio.new_event_loop()
+
+        self._thread = Thread(target=self._run_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+        asyncio.run_coroutine_threadsafe(
+            self._start_workers(n), self._loop
+        ).result()
+
+    def stop(self):
+        """
+        Stop rest client immediately.
+        """
+        if not self._active:
+            return
+
+        self._active = False
+        asyncio.run_coroutine_threadsafe(self._stop_workers(), self._loop)
+
+    def join(self):
+        """
+        Wait till all requests are processed.
+        """
+        queue = self._queue
+        if not self._active or queue is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(queue.join(), self._loop).result()
+
+    def _put_request(self, request: Request):
+        """
+        Put request into queue of event loop, which may be called from
+        any thread.
+        """
+        item = (request.priority, next(self._count), request)
+
+        # Scheduled within lock, so that queue is not closed by
+        # _stop_workers in between.
+        with self._queue_lock:
+            queue = self._queue
+            if queue is None:
+                self._pending.append(item)
+                return
+
+            self._loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def _run_loop(self):
+        """"""
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _start_workers(self, n: int):
+        """"""
+        self._session = self._create_session(n)
+
+        with self._queue_lock:
+            self._queue = asyncio.PriorityQueue()
+
+            for item in self._pending:
+                self._queue.put_nowait(item)
+            self._pending.clear()
+
+        self._workers = [
+            self._loop.create_task(self._run()) for i in range(n)
+        ]
+
+    async def _stop_workers(self):
+        """"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+        await self._session.close()
+
+        with self._queue_lock:
+            self._queue = None
+
+        self._loop.stop()
+
+    async def _run(self):
+        """"""
+        while self._active:
+            priority, n, request = await self._queue.get()
+            try:
+                await self._process_request(request, self._session)
+            finally:
+                self._queue.task_done()
+
+    async def _process_request(self, request: Request, session):
+        """
+        Sending request to server and get result.
+        """
+        import aiohttp
+        from yarl import URL
+
+        # noinspection PyBroadException
+        try:
+            request = self.sign(request)
+
+            url = self.make_full_url(request.path)
+
+            # Query string is encoded the same as requests, so that it
+            # matches the one used in signature.
+            if request.params:
+                url = url + "?" + urlencode(request.params, doseq=True)
+
+            try:
+                async with session.request(
+                    request.method,
+                    URL(url, encoded=True),
+                    headers=request.headers,
+                    data=request.data,
+                    proxy=self.proxy,
+                ) as response:
+                    content = await response.read()
+            except aiohttp.ClientConnectionError as e:
+                raise ConnectionError(e) from e
+
+            request.response = AsyncResponse(
+                response.status,
+                response.headers,
+                content,
+                response.get_encoding(),
+            )
+
+            self._process_response(request)
+        except asyncio.CancelledError:
+            raise
+        except:  # noqa
+            t, v, tb = sys.exc_info()
+            self._process_error(t, v, tb, request)
@@ -3,9 +3,10 @@
 import sys
 import traceback
 from datetime import datetime
-from enum import Enum
+from enum import Enum, IntEnum
+from itertools import count
 from multiprocessing.dummy import Pool
-from queue import Empty, Queue
+from queue import Empty, PriorityQueue
 from typing import Any, Callable
 
 import requests
@@ -18,6 +19,15 @@ class RequestStatus(Enum):
     error = 3  # Exception raised
 
 
+class RequestPriority(IntEnum):
+    """
+    Requests with lower value are sent first.
+    """
+    high = 0  # Order placement and cancellation
+    normal = 1  # Default
+    low = 2  # Background queries
+
+
 class Request(object):
     """
     Request object for status check.
@@ -34,6 +44,7 @@ class Request(object):
         on_failed: Callable = None,
         on_error: Callable = None,
         extra: Any = None,
+        priority: RequestPriority = RequestPriority.normal,
     ):
         """"""
         self.method = method
@@ -46,6 +57,7 @@ class Request(object):
         self.on_failed = on_failed
         self.on_error = on_error
         self.extra = extra
+        self.priority = priority
 
         self.response = None
         self.status = RequestStatus.ready
@@ -83,6 +95,7 @@ class RestClient(object):
     * Reimplement on_failed function to handle Non-2xx responses.
     * Use on_failed parameter in add_request function for individual Non-2xx response handling.
     * Reimplement on_error function to handle exception msg.
+    * Use priority parameter in add_request function to send orders ahead of queries.
     """
 
     def __init__(self):
@@ -91,8 +104,9 @@ class RestClient(object):
         self.url_base = None  # type: str
         self._active = False
 
-        self._queue = Queue()
+        self._queue = PriorityQueue()
         self._pool = None  # type: Pool
+        self._count = count()  # keeps FIFO order within the same priority
 
         self.proxies = None
 
@@ -120,7 +134,8 @@ class RestClient(object):
 
         self._active = True
         self._pool = Pool(n)
-        self._pool.apply_async(self._run)
+        for i in range(n):
+            self._pool.apply_async(self._run)
 
     def stop(self):
         """
@@ -145,6 +160,7 @@ class RestClient(object):
         on_failed: Callable = None,
         on_error: Callable = None,
         extra: Any = None,
+        priority: RequestPriority = RequestPriority.normal,
     ):
         """
         Add a new request.
@@ -157,6 +173,7 @@ class RestClient(object):
         :param on_failed: callback function if Non-2xx status, type, type: (code, dict, Request)
         :param on_error: callback function when catching Python exception, type: (etype, evalue, tb, Request)
         :param extra: Any extra data which can be used when handling callback
+        :param priority: requests with higher priority are sent first
         :return: Request
         """
         request = Request(
@@ -169,16 +186,23 @@ class RestClient(object):
             on_failed,
             on_error,
             extra,
+            priority,
         )
-        self._queue.put(request)
+        self._put_request(request)
         return request
 
+    def _put_request(self, request: Request):
+        """
+        Put request into queue ordered by priority.
+        """
+        self._queue.put((request.priority, next(self._count), request))
+
     def _run(self):
         try:
             session = self._create_session()
             while self._active:
                 try:
-                    request = self._queue.get(timeout=1)
+                    priority, n, request = self._queue.get(timeout=1)
                     try:
                         self._process_request(request, session)
                     finally:
@@ -257,25 +281,45 @@ class RestClient(object):
             )
             request.response = response
 
-            status_code = response.status_code
-            if status_code / 100 == 2:  # 2xx都算成功，尽管交易所都用200
-                jsonBody = response.json()
-                request.callback(jsonBody, request)
-                request.status = RequestStatus.success
-            else:
-                request.status = RequestStatus.failed
-
-                if request.on_failed:
-                    request.on_failed(status_code, request)
-                else:
-                    self.on_failed(status_code, request)
+            self._process_response(request)
         except:  # noqa
-            request.status = RequestStatus.error
             t, v, tb = sys.exc_info()
-            if request.on_error:
-                request.on_error(t, v, tb, request)
+            self._process_error(t, v, tb, request)
+
+    def _process_response(self, request: Request):
+        """
+        Call callback of request according to status code of response.
+        """
+        response = request.response
+
+        status_code = response.status_code
+        if status_code // 100 == 2:  # 2xx都算成功，尽管交易所都用200
+            jsonBody = response.json()
+            request.callback(jsonBody, request)
+            request.status = RequestStatus.success
+        else:
+            request.status = RequestStatus.failed
+
+            if request.on_failed:
+                request.on_failed(status_code, request)
             else:
-                self.on_error(t, v, tb, request)
+                self.on_failed(status_code, request)
+
+    def _process_error(
+        self,
+        exception_type: type,
+        exception_value: Exception,
+        tb,
+        request: Request,
+    ):
+        """
+        Call error callback of request when exception raised.
+        """
+        request.status = RequestStatus.error
+        if request.on_error:
+            request.on_error(exception_type, exception_value, tb, request)
+        else:
+            self.on_error(exception_type, exception_value, tb, request)
 
     def make_full_url(self, path: str):
         """
@@ -4,12 +4,30 @@ import json
 import ssl
 import sys
 import traceback
+from collections import deque
 from datetime import datetime
 from threading import Lock, Thread
 from time import sleep
 
 import websocket
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Default decoder of received text, orjson is used if installed.
+if orjson:
+    DEFAULT_DECODER = orjson.loads
+else:
+    DEFAULT_DECODER = json.loads
+
+# Number of received texts kept for debugging.
+RECEIVED_TEXT_COUNT = 5
+
+# Max length of each text shown in exception detail.
+TEXT_LENGTH = 1000
+
 
 class WebsocketClient(object):
     """
@@ -21,7 +39,8 @@ class WebsocketClient(object):
     Use stop to stop threads and disconnect websocket before destroying the client
     object (especially when exiting the programme).
 
-    Default serialization format is json.
+    Default serialization format is json, decoded by orjson if it is
+    installed. Use set_decoder to change the decoder.
 
     Callbacks to reimplement:
     * on_connected
@@ -46,9 +65,11 @@ class WebsocketClient(object):
         self.proxy_host = None
         self.proxy_port = None
 
-        # For debugging
+        self.decoder = DEFAULT_DECODER
+
+        # For debugging, texts are only formatted when error happens.
         self._last_sent_text = None
-        self._last_received_text = None
+        self._received_texts = deque(maxlen=RECEIVED_TEXT_COUNT)
 
     def init(self, host: str, proxy_host: str = "", proxy_port: int = 0):
         """"""
@@ -58,6 +79,13 @@ class WebsocketClient(object):
             self.proxy_host = proxy_host
             self.proxy_port = proxy_port
 
+    def set_decoder(self, decoder):
+        """
+        Set function to decode received text into packet, such as
+        json.loads or orjson.loads.
+        """
+        self.decoder = decoder
+
     def start(self):
         """
         Start the client and on_connected function is called after webscoket
@@ -146,6 +174,8 @@ class WebsocketClient(object):
         """
         Keep running till stop is called.
         """
+        record_text = self._received_texts.append
+
         try:
             self._connect()
 
@@ -161,7 +191,7 @@ class WebsocketClient(object):
                             self._reconnect()
                             continue
 
-                        self._record_last_received_text(text)
+                        record_text(text)
 
                         try:
                             data = self.unpack_data(text)
@@ -184,14 +214,13 @@ class WebsocketClient(object):
             self.on_error(et, ev, tb)
             self._reconnect()
 
-    @staticmethod
-    def unpack_data(data: str):
+    def unpack_data(self, data: str):
         """
         Default serialization format is json.
 
         Reimplement this method if you want to use other serialization format.
         """
-        return json.loads(data)
+        return self.decoder(data)
 
     def _run_ping(self):
         """"""
@@ -253,7 +282,9 @@ class WebsocketClient(object):
             datetime.now().isoformat(), exception_type
         )
         text += "LastSentText:\n{}\n".format(self._last_sent_text)
-        text += "LastReceivedText:\n{}\n".format(self._last_received_text)
+        text += "LastReceivedText:\n"
+        for received_text in list(self._received_texts):
+            text += "{}\n".format(received_text[:TEXT_LENGTH])
         text += "Exception trace: \n"
         text += "".join(
             traceback.format_exception(exception_type, exception_value, tb)
@@ -264,10 +295,10 @@ class WebsocketClient(object):
         """
         Record last sent text for debug purpose.
         """
-        self._last_sent_text = text[:1000]
+        self._last_sent_text = text[:TEXT_LENGTH]
 
     def _record_last_received_text(self, text: str):
         """
         Record last received text for debug purpose.
         """
-        self._last_received_text = text[:1000]
+        self._received_texts.append(text)
@@ -1,21 +1,25 @@
-from collections import defaultdict
 from datetime import date, datetime
 from typing import Callable
 from itertools import product
 import multiprocessing
+import random
+import shutil
+import tempfile
+from dataclasses import fields
+from pathlib import Path
 
 import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
-import matplotlib.dates as mdates
-from matplotlib.dates import YearLocator, MonthLocator, DateFormatter
-from mpl_finance import candlestick_ohlc
-
-import seaborn as sns
-from pandas import DataFrame
+from pandas import DataFrame, concat
 
+from vnpy.trader.bar_store import BarStore
 from vnpy.trader.constant import Direction, Exchange, Interval, Status
-from vnpy.trader.database import DbBarData, DbTickData
+from vnpy.trader.database import (
+    CHUNK_SIZE,
+    DbBarData,
+    DbTickData,
+    load_bar_data,
+    load_tick_data,
+)
 from vnpy.trader.object import OrderData, TradeData
 from vnpy.trader.utility import round_to_pricetick
 
@@ -28,9 +32,38 @@ from vnpy.app.cta_strategy.base import (
     StopOrder,
     StopOrderStatus,
 )
+from .matching import DepthOrderArray, OrderArray
+from .result_cache import (
+    ResultCache,
+    generate_key,
+    get_files_hash,
+    get_source_hash,
+)
 from .template import CtaTemplate
 
-sns.set_style("whitegrid")
+# Number of trading days in one year, used for annualizing.
+ANNUAL_DAYS = 240
+
+
+class HistoryStream:
+    """
+    History data which is loaded chunk by chunk when iterated.
+
+    Every iteration calls generator function again, so that the stream
+    can be replayed multiple times without keeping all data in memory.
+    """
+
+    def __init__(self, generator: Callable):
+        """"""
+        self.generator = generator
+
+    def __iter__(self):
+        """"""
+        return iter(self.generator())
+
+    def __bool__(self):
+        """"""
+        return True
 
 
 class OptimizationSetting:
@@ -104,6 +137,7 @@ class BacktestingEngine:
         self.pricetick = 0  # 价格最小变动
         self.capital = 1_000_000  # 回测时的起始本金（默认100万）
         self.mode = BacktestingMode.BAR  # 回测模式，默认为K线
+        self.depth_matching = False  # Tick回测时是否按五档深度和排队位置撮合
 
         self.strategy_class = None
         self.strategy = None
@@ -115,22 +149,32 @@ class BacktestingEngine:
         self.days = 0
         self.callback = None
         self.history_data = []
+        self.stream = False  # 是否流式回放历史数据（分块加载，不全部放入内存）
+        self.chunk_size = CHUNK_SIZE  # 流式回放时每次加载的数据量
+        self.bar_store = BarStore()  # 列式K线存储，覆盖回测区间时优先于SQLite加载
         # 本地停止单
         self.stop_order_count = 0  # 编号计数：stopOrderID = STOPORDERPREFIX + str(stopOrderCount)
         # 本地停止单字典, key为stopOrderID，value为stopOrder对象
         self.stop_orders = {}  # 停止单撤销后不会从本字典中删除
         self.active_stop_orders = {}
+        self.stop_order_array = OrderArray()  # 活动停止单价格数组，用于向量化撮合
 
         self.limit_order_count = 0  # 限价单编号
         self.limit_orders = {}  # 限价单字典
-        self.active_limit_orders = {}  # 活动限价单字典，用于进行撮合用
+        self.active_limit_orders = {}  # 活动限价单字典
+        self.limit_order_array = OrderArray()  # 活动限价单价格数组，用于向量化撮合
 
         self.trade_count = 0  # 成交编号
         self.trades = {}  # 成交字典
 
+        # 成交列数据，用于向量化计算逐日盈亏
+        self.trade_days = []  # 成交日期序数
+        self.trade_prices = []  # 成交价格
+        self.trade_pos_changes = []  # 成交导致的仓位变化（多正空负）
+
         self.logs = []  # 日志记录
 
-        self.daily_results = {}  # 日线回测结果计算用
+        self.daily_closes = {}  # 每日收盘价，日线回测结果计算用
         self.daily_df = None
 
     def clear_data(self):
@@ -145,16 +189,23 @@ class BacktestingEngine:
         self.stop_order_count = 0
         self.stop_orders.clear()
         self.active_stop_orders.clear()
+        self.stop_order_array.clear()
 
         self.limit_order_count = 0
         self.limit_orders.clear()
         self.active_limit_orders.clear()
+        self.limit_order_array.clear()
 
         self.trade_count = 0
         self.trades.clear()
 
+        self.trade_days.clear()
+        self.trade_prices.clear()
+        self.trade_pos_changes.clear()
+
         self.logs.clear()
-        self.daily_results.clear()
+        self.daily_closes.clear()
+        self.daily_df = None
 
     def set_parameters(
             self,
@@ -168,6 +219,9 @@ class BacktestingEngine:
             capital: int = 0,
             end: datetime = None,
             mode: BacktestingMode = BacktestingMode.BAR,
+            stream: bool = False,
+            chunk_size: int = CHUNK_SIZE,
+            depth_matching: bool = False,
     ):
         """"""
         self.mode = mode
@@ -191,11 +245,27 @@ class BacktestingEngine:
         if mode:
             self.mode = mode
 
-    def add_strategy(self, strategy_class: type, setting: dict):
+        self.stream = stream
+        self.chunk_size = chunk_size
+
+        # Limit orders are matched with depth and queue position only in
+        # tick mode.
+        self.depth_matching = depth_matching
+        if depth_matching and self.mode == BacktestingMode.TICK:
+            self.limit_order_array = DepthOrderArray()
+        else:
+            self.limit_order_array = OrderArray()
+
+    def add_strategy(
+            self, strategy_class: type, setting: dict, strategy_name: str = ""
+    ):
         """"""
+        if not strategy_name:
+            strategy_name = strategy_class.__name__
+
         self.strategy_class = strategy_class
         self.strategy = strategy_class(
-            self, strategy_class.__name__, self.vt_symbol, setting
+            self, strategy_name, self.vt_symbol, setting
         )
         self.strategy.trading = True
 
@@ -203,17 +273,31 @@ class BacktestingEngine:
         """"""
         self.output("开始加载历史数据")
 
+        if self.stream:
+            self.history_data = HistoryStream(self.generate_history_data)
+            self.output("历史数据将在回放时分块加载")
+            return
+
         if self.mode == BacktestingMode.BAR:
-            s = (
-                DbBarData.select()
+            # Load from columnar bar store if it covers the date range,
+            # otherwise load from SQLite database. All bars are created
+            # here, use stream mode to replay from memory-mapped columns
+            # chunk by chunk instead.
+            columns = self.load_bar_columns()
+            if columns is not None:
+                self.history_data = columns.to_bars()
+            else:
+                s = (
+                    DbBarData.select()
                     .where(
-                    (DbBarData.vt_symbol == self.vt_symbol) &
-                    (DbBarData.interval == self.interval)
-                    & (DbBarData.datetime >= self.start)
-                    & (DbBarData.datetime <= self.end)
-                ) .order_by(DbBarData.datetime)
-            )
-            self.history_data = [db_bar.to_bar() for db_bar in s]
+                        (DbBarData.vt_symbol == self.vt_symbol)
+                        & (DbBarData.interval == self.interval)
+                        & (DbBarData.datetime >= self.start)
+                        & (DbBarData.datetime <= self.end)
+                    )
+                    .order_by(DbBarData.datetime)
+                )
+                self.history_data = [db_bar.to_bar() for db_bar in s]
         else:
             s = (
                 DbTickData.select()
@@ -228,12 +312,58 @@ class BacktestingEngine:
 
         self.output(f"历史数据加载完成，数据量：{len(self.history_data)}")
 
+    def load_bar_columns(self):
+        """
+        Load bar columns from bar store, return None if date range of
+        backtesting is not covered by store.
+        """
+        if not self.bar_store.covers(
+            self.vt_symbol, self.interval, self.start, self.end
+        ):
+            return None
+
+        return self.bar_store.load_bar_columns(
+            self.vt_symbol, self.interval, self.start, self.end
+        )
+
+    def generate_history_data(self):
+        """
+        Generator of history data loaded chunk by chunk, used for
+        streaming replay.
+        """
+        if self.mode == BacktestingMode.BAR:
+            columns = self.load_bar_columns()
+            if columns is not None:
+                return columns.iter_bars(self.chunk_size)
+
+            return load_bar_data(
+                self.vt_symbol,
+                self.interval,
+                self.start,
+                self.end,
+                self.chunk_size
+            )
+        else:
+            return load_tick_data(
+                self.vt_symbol, self.start, self.end, self.chunk_size
+            )
+
     def show_figure(self):
+        """
+        Show candlestick chart of history data with trades.
+        """
+        # Plotting libraries are imported only when needed, so that
+        # headless backtesting does not load them.
+        import matplotlib.pyplot as plt
+        import matplotlib.dates as mdates
+        from mpl_finance import candlestick_ohlc
+
         plt.rcParams['font.sans-serif'] = ['SimHei']
         plt.rcParams['axes.unicode_minus'] = False
-        data =[s.__dict__ for s in self.history_data]
+        columns = ['datetime', 'open_price', 'high_price', 'low_price', 'close_price']
+        data = [[getattr(s, name) for name in columns] for s in self.history_data]
 
-        df = pd.DataFrame(data,columns=['datetime','open_price','high_price','low_price','close_price'])
+        df = DataFrame(data, columns=columns)
         fig, ax = plt.subplots()
 
         ax.autoscale_view()
@@ -274,9 +404,12 @@ class BacktestingEngine:
 
         self.strategy.on_init()
 
-        # Use the first [days] of history data for initializing strategy
+        # Use the first [days] of history data for initializing strategy.
+        # History data is consumed by iterator, so that it can also be
+        # a stream loaded chunk by chunk.
+        history_iterator = iter(self.history_data)
         day_count = 0
-        for ix, data in enumerate(self.history_data):
+        for data in history_iterator:
             if self.datetime and data.datetime.day != self.datetime.day:
                 day_count += 1
                 if day_count >= self.days:
@@ -292,8 +425,10 @@ class BacktestingEngine:
         self.strategy.trading = True
         self.output("开始回放历史数据")
 
-        # Use the rest of history data for running backtesting
-        for data in self.history_data[ix:]:
+        # Use the rest of history data for running backtesting, starting
+        # from the data which ends initializing.
+        func(data)
+        for data in history_iterator:
             func(data)
 
         self.output("历史数据回放结束")
@@ -304,34 +439,71 @@ class BacktestingEngine:
 
         if not self.trades:
             self.output("成交记录为空，无法计算")
+            self.daily_df = None
             return
 
-        # Add trade data into daily reuslt.
-        for trade in self.trades.values():
-            d = trade.datetime.date()
-            daily_result = self.daily_results[d]
-            daily_result.add_trade(trade)
+        # Daily close prices, days are in time order.
+        dates = list(self.daily_closes.keys())
+        day_count = len(dates)
+
+        days = np.fromiter(
+            (d.toordinal() for d in dates), dtype=np.int64, count=day_count
+        )
+        close_price = np.fromiter(
+            self.daily_closes.values(), dtype=float, count=day_count
+        )
+        pre_close = np.concatenate([[0], close_price[:-1]])
 
-        # Calculate daily result by iteration.
-        pre_close = 0
-        start_pos = 0
+        # Locate day of every trade, and sum up trade values by day.
+        trade_ix = days.searchsorted(np.array(self.trade_days, dtype=np.int64))
+        trade_price = np.array(self.trade_prices, dtype=float)
+        pos_change = np.array(self.trade_pos_changes, dtype=float)
+        trade_volume = np.abs(pos_change)
+        trade_turnover = trade_price * trade_volume * self.size
 
-        for daily_result in self.daily_results.values():
-            daily_result.calculate_pnl(
-                pre_close, start_pos, self.size, self.rate, self.slippage
-            )
+        def sum_by_day(values: np.ndarray):
+            """Sum up trade values of each day."""
+            return np.bincount(trade_ix, weights=values, minlength=day_count)
 
-            pre_close = daily_result.close_price
-            start_pos = daily_result.end_pos
+        trade_count = np.bincount(trade_ix, minlength=day_count)
+        turnover = sum_by_day(trade_turnover)
+        commission = sum_by_day(trade_turnover * self.rate)
+        slippage = sum_by_day(trade_volume * self.size * self.slippage)
 
-        # Generate dataframe
-        results = defaultdict(list)
+        # Trading pnl is the pnl from new trade during the day
+        trading_pnl = sum_by_day(
+            pos_change * (close_price[trade_ix] - trade_price) * self.size
+        )
 
-        for daily_result in self.daily_results.values():
-            for key, value in daily_result.__dict__.items():
-                results[key].append(value)
+        # Holding pnl is the pnl from holding position at day start
+        end_pos = np.cumsum(sum_by_day(pos_change))
+        start_pos = np.concatenate([[0], end_pos[:-1]])
+        holding_pnl = start_pos * (close_price - pre_close) * self.size
 
-        self.daily_df = DataFrame.from_dict(results).set_index("date")
+        # Net pnl takes account of commission and slippage cost
+        total_pnl = trading_pnl + holding_pnl
+        net_pnl = total_pnl - commission - slippage
+
+        daily_trades = [[] for d in dates]
+        for ix, trade in zip(trade_ix.tolist(), self.trades.values()):
+            daily_trades[ix].append(trade)
+
+        self.daily_df = DataFrame({
+            "date": dates,
+            "close_price": close_price,
+            "pre_close": pre_close,
+            "trades": daily_trades,
+            "trade_count": trade_count,
+            "start_pos": start_pos,
+            "end_pos": end_pos,
+            "turnover": turnover,
+            "commission": commission,
+            "slippage": slippage,
+            "trading_pnl": trading_pnl,
+            "holding_pnl": holding_pnl,
+            "total_pnl": total_pnl,
+            "net_pnl": net_pnl,
+        }).set_index("date")
 
         self.output("逐日盯市盈亏计算完成")
         return self.daily_df
@@ -340,151 +512,26 @@ class BacktestingEngine:
         """"""
         self.output("开始计算策略统计指标")
 
-        if not df:
-            df = self.daily_df
-
         if df is None:
-            # Set all statistics to 0 if no trade.
-            start_date = ""
-            end_date = ""
-            total_days = 0
-            profit_days = 0
-            loss_days = 0
-            end_balance = 0
-            max_drawdown = 0
-            max_ddpercent = 0
-            total_net_pnl = 0
-            daily_net_pnl = 0
-            total_commission = 0
-            daily_commission = 0
-            total_slippage = 0
-            daily_slippage = 0
-            total_turnover = 0
-            daily_turnover = 0
-            total_trade_count = 0
-            daily_trade_count = 0
-            total_return = 0
-            annual_return = 0
-            daily_return = 0
-            return_std = 0
-            sharpe_ratio = 0
-        else:
-            # Calculate balance related time series data
-            df["balance"] = df["net_pnl"].cumsum() + self.capital
-            df["return"] = np.log(df["balance"] / df["balance"].shift(1)).fillna(0)
-            df["highlevel"] = (
-                df["balance"].rolling(
-                    min_periods=1, window=len(df), center=False).max()
-            )
-            df["drawdown"] = df["balance"] - df["highlevel"]
-            df["ddpercent"] = df["drawdown"] / df["highlevel"] * 100
-
-            # Calculate statistics value
-            start_date = df.index[0]
-            end_date = df.index[-1]
-
-            total_days = len(df)
-            profit_days = len(df[df["net_pnl"] > 0])
-            loss_days = len(df[df["net_pnl"] < 0])
-
-            end_balance = df["balance"].iloc[-1]
-            max_drawdown = df["drawdown"].min()
-            max_ddpercent = df["ddpercent"].min()
-
-            total_net_pnl = df["net_pnl"].sum()
-            daily_net_pnl = total_net_pnl / total_days
-
-            total_commission = df["commission"].sum()
-            daily_commission = total_commission / total_days
-
-            total_slippage = df["slippage"].sum()
-            daily_slippage = total_slippage / total_days
-
-            total_turnover = df["turnover"].sum()
-            daily_turnover = total_turnover / total_days
-
-            total_trade_count = df["trade_count"].sum()
-            daily_trade_count = total_trade_count / total_days
-
-            total_return = (end_balance / self.capital - 1) * 100
-            annual_return = total_return / total_days * 240
-            daily_return = df["return"].mean() * 100
-            return_std = df["return"].std() * 100
+            df = self.daily_df
 
-            if return_std:
-                sharpe_ratio = daily_return / return_std * np.sqrt(240)
-            else:
-                sharpe_ratio = 0
-
-        # Output
-        self.output("-" * 30)
-        self.output(f"首个交易日：\t{start_date}")
-        self.output(f"最后交易日：\t{end_date}")
-
-        self.output(f"总交易日：\t{total_days}")
-        self.output(f"盈利交易日：\t{profit_days}")
-        self.output(f"亏损交易日：\t{loss_days}")
-
-        self.output(f"起始资金：\t{self.capital:,.2f}")
-        self.output(f"结束资金：\t{end_balance:,.2f}")
-
-        self.output(f"总收益率：\t{total_return:,.2f}%")
-        self.output(f"年化收益：\t{annual_return:,.2f}%")
-        self.output(f"最大回撤: \t{max_drawdown:,.2f}")
-        self.output(f"百分比最大回撤: {max_ddpercent:,.2f}%")
-
-        self.output(f"总盈亏：\t{total_net_pnl:,.2f}")
-        self.output(f"总手续费：\t{total_commission:,.2f}")
-        self.output(f"总滑点：\t{total_slippage:,.2f}")
-        self.output(f"总成交金额：\t{total_turnover:,.2f}")
-        self.output(f"总成交笔数：\t{total_trade_count}")
-
-        self.output(f"日均盈亏：\t{daily_net_pnl:,.2f}")
-        self.output(f"日均手续费：\t{daily_commission:,.2f}")
-        self.output(f"日均滑点：\t{daily_slippage:,.2f}")
-        self.output(f"日均成交金额：\t{daily_turnover:,.2f}")
-        self.output(f"日均成交笔数：\t{daily_trade_count}")
-
-        self.output(f"日均收益率：\t{daily_return:,.2f}%")
-        self.output(f"收益标准差：\t{return_std:,.2f}%")
-        self.output(f"Sharpe Ratio：\t{sharpe_ratio:,.2f}")
-
-        statistics = {
-            "start_date": start_date,
-            "end_date": end_date,
-            "total_days": total_days,
-            "profit_days": profit_days,
-            "loss_days": loss_days,
-            "end_balance": end_balance,
-            "max_drawdown": max_drawdown,
-            "max_ddpercent": max_ddpercent,
-            "total_net_pnl": total_net_pnl,
-            "daily_net_pnl": daily_net_pnl,
-            "total_commission": total_commission,
-            "daily_commission": daily_commission,
-            "total_slippage": total_slippage,
-            "daily_slippage": daily_slippage,
-            "total_turnover": total_turnover,
-            "daily_turnover": daily_turnover,
-            "total_trade_count": total_trade_count,
-            "daily_trade_count": daily_trade_count,
-            "total_return": total_return,
-            "annual_return": annual_return,
-            "daily_return": daily_return,
-            "return_std": return_std,
-            "sharpe_ratio": sharpe_ratio,
-        }
+        statistics = calculate_statistics(df, self.capital)
+        output_statistics(statistics, self.capital, self.output)
 
         return statistics
 
     def show_chart(self, df: DataFrame = None):
         """"""
-        if not df:
+        if df is None:
             df = self.daily_df
 
         if df is None:
             return
 
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        sns.set_style("whitegrid")
         plt.figure(figsize=(10, 16))
 
         balance_plot = plt.subplot(4, 1, 1)
@@ -505,11 +552,19 @@ class BacktestingEngine:
 
         plt.show()
 
-    def run_optimization(self, optimization_setting: OptimizationSetting):
-        """"""
+    def run_optimization(
+            self, optimization_setting: OptimizationSetting, use_cache: bool = True
+    ):
+        """
+        Run backtesting of all settings with process pool.
+
+        If use_cache is True, results are also saved into and loaded from
+        persistent result cache, so settings backtested before with the
+        same strategy code, history data and parameters are not run again.
+        """
         # Get optimization setting and target
         settings = optimization_setting.generate_setting()
-        target_name = optimization_setting.target_name
+        target_name = optimization_setting.target
 
         if not settings:
             self.output("优化参数组合为空，请检查")
@@ -519,30 +574,25 @@ class BacktestingEngine:
             self.output("优化目标为设置，请检查")
             return
 
-        # Use multiprocessing pool for running backtesting with different setting
-        pool = multiprocessing.Pool(multiprocessing.cpu_count())
+        if not self.load_optimization_data():
+            return
 
-        results = []
-        for setting in settings:
-            result = (pool.apply_async(optimize, (
-                target_name,
-                self.strategy_class,
-                setting,
-                self.vt_symbol,
-                self.interval,
-                self.start,
-                self.rate,
-                self.slippage,
-                self.size,
-                self.pricetick,
-                self.capital,
-                self.end,
-                self.mode
-            )))
-            results.append(result)
+        snapshot_path = Path(tempfile.mkdtemp(prefix="vnpy_optimization_"))
+        try:
+            pool = self.create_optimization_pool(snapshot_path, use_cache)
 
-        pool.close()
-        pool.join()
+            results = []
+            for setting in settings:
+                result = pool.apply_async(
+                    optimize_setting,
+                    (target_name, self.strategy_class, setting)
+                )
+                results.append(result)
+
+            pool.close()
+            pool.join()
+        finally:
+            shutil.rmtree(snapshot_path, ignore_errors=True)
 
         # Sort results and output
         result_values = [result.get() for result in results]
@@ -554,15 +604,427 @@ class BacktestingEngine:
 
         return result_values
 
-    def update_daily_close(self, price: float):
-        """"""
-        d = self.datetime.date()
+    def run_ga_optimization(
+            self,
+            optimization_setting: OptimizationSetting,
+            population_size: int = 100,
+            max_generation: int = 30,
+            crossover_prob: float = 0.8,
+            mutation_prob: float = 0.2,
+            patience: int = 5,
+            use_cache: bool = True,
+    ):
+        """
+        Run genetic algorithm optimization over parameter ranges of
+        optimization setting, instead of trying every combination.
+
+        Each generation is evaluated in parallel by the process pool,
+        and settings already evaluated are taken from cache. Search is
+        stopped when best target value has not improved for [patience]
+        generations. Result cache is used as in run_optimization.
+        """
+        target_name = optimization_setting.target
+        names = list(optimization_setting.params.keys())
+        value_lists = list(optimization_setting.params.values())
+
+        if not names:
+            self.output("优化参数组合为空，请检查")
+            return
+
+        if not target_name:
+            self.output("优化目标为设置，请检查")
+            return
+
+        if not self.load_optimization_data():
+            return
+
+        total_count = 1
+        for values in value_lists:
+            total_count *= len(values)
+        population_size = min(population_size, total_count)
+
+        # Cache of evaluated settings, key: tuple of parameter values,
+        # value: (setting string, target value, statistics)
+        cache = {}
+
+        snapshot_path = Path(tempfile.mkdtemp(prefix="vnpy_optimization_"))
+        try:
+            pool = self.create_optimization_pool(snapshot_path, use_cache)
+
+            population = set()
+            while len(population) < population_size:
+                population.add(
+                    tuple(random.choice(values) for values in value_lists)
+                )
+            population = list(population)
+
+            best_value = None
+            stall_count = 0
+
+            for generation in range(max_generation):
+                self.evaluate_population(
+                    pool, population, names, target_name, cache
+                )
+
+                population.sort(reverse=True, key=lambda key: cache[key][1])
+                generation_best = cache[population[0]][1]
+
+                self.output(
+                    f"第{generation + 1}代，已回测参数组合：{len(cache)}，"
+                    f"最优目标：{generation_best}"
+                )
+
+                if best_value is None or generation_best > best_value:
+                    best_value = generation_best
+                    stall_count = 0
+                else:
+                    stall_count += 1
+
+                if stall_count >= patience or len(cache) >= total_count:
+                    break
+
+                population = self.breed_population(
+                    population, value_lists, cache, crossover_prob, mutation_prob
+                )
+
+            pool.close()
+            pool.join()
+        finally:
+            shutil.rmtree(snapshot_path, ignore_errors=True)
+
+        # Sort results and output
+        result_values = list(cache.values())
+        result_values.sort(reverse=True, key=lambda result: result[1])
+
+        for value in result_values[:population_size]:
+            msg = f"参数：{value[0]}, 目标：{value[1]}"
+            self.output(msg)
+
+        return result_values
+
+    def evaluate_population(
+            self,
+            pool: multiprocessing.Pool,
+            population: list,
+            names: list,
+            target_name: str,
+            cache: dict,
+    ):
+        """
+        Run backtesting of individuals not found in cache with process
+        pool, and save results into cache.
+        """
+        results = {}
+        for key in population:
+            if key in cache or key in results:
+                continue
+
+            setting = dict(zip(names, key))
+            results[key] = pool.apply_async(
+                optimize_setting,
+                (target_name, self.strategy_class, setting)
+            )
+
+        for key, result in results.items():
+            cache[key] = result.get()
+
+    def breed_population(
+            self,
+            population: list,
+            value_lists: list,
+            cache: dict,
+            crossover_prob: float,
+            mutation_prob: float,
+    ):
+        """
+        Generate next generation from population sorted by target value.
+
+        The best individuals are kept (elitism), others are bred from
+        parents chosen by tournament selection, with uniform crossover
+        and random reset mutation.
+        """
+        size = len(population)
+        elite_count = max(1, size // 10)
+
+        def select():
+            """Tournament selection of 3 individuals."""
+            candidates = random.sample(population, min(3, size))
+            return max(candidates, key=lambda key: cache[key][1])
+
+        new_population = population[:elite_count]
+        members = set(new_population)
+
+        # Stop trying to find new individuals after too many duplicates.
+        tries = 0
+        while len(new_population) < size and tries < size * 10:
+            tries += 1
+
+            parent_1 = select()
+            parent_2 = select()
+
+            if random.random() < crossover_prob:
+                child = [
+                    random.choice(genes) for genes in zip(parent_1, parent_2)
+                ]
+            else:
+                child = list(parent_1)
+
+            for ix, values in enumerate(value_lists):
+                if random.random() < mutation_prob:
+                    child[ix] = random.choice(values)
+
+            child = tuple(child)
+            if child not in members:
+                members.add(child)
+                new_population.append(child)
+
+        return new_population
+
+    def run_walk_forward(
+            self,
+            optimization_setting: OptimizationSetting,
+            train_days: int,
+            test_days: int,
+            use_cache: bool = True,
+    ):
+        """
+        Run walk-forward optimization.
+
+        Backtesting period is split into rolling windows of [train_days]
+        in-sample data followed by [test_days] out-of-sample data, rolled
+        forward by [test_days]. All settings of all in-sample windows are
+        optimized in parallel by one process pool, and the best setting
+        of each window is then run on its out-of-sample window.
+
+        History data is loaded only once and sliced for every window.
+        Daily results of out-of-sample windows are stitched into daily_df
+        of this engine, which can be passed to calculate_statistics.
+        Each out-of-sample run starts with no position.
+
+        Return list of result dict of every window.
+        """
+        settings = optimization_setting.generate_setting()
+        target_name = optimization_setting.target
+
+        if not settings:
+            self.output("优化参数组合为空，请检查")
+            return
+
+        if not target_name:
+            self.output("优化目标为设置，请检查")
+            return
+
+        if not self.load_optimization_data():
+            return
+
+        day_array = np.fromiter(
+            (data.datetime.toordinal() for data in self.history_data),
+            dtype=np.int64,
+            count=len(self.history_data)
+        )
+        windows = generate_walk_forward_windows(
+            day_array, train_days, test_days
+        )
+
+        if not windows:
+            self.output("历史数据不足一个滚动窗口，无法进行滚动优化")
+            return
+
+        self.output(f"滚动窗口数量：{len(windows)}")
+
+        snapshot_path = Path(tempfile.mkdtemp(prefix="vnpy_optimization_"))
+        try:
+            pool = self.create_optimization_pool(snapshot_path, use_cache)
+
+            window_results = []
+            for train_window, test_window in windows:
+                results = []
+                for setting in settings:
+                    result = pool.apply_async(
+                        optimize_setting,
+                        (target_name, self.strategy_class, setting, train_window)
+                    )
+                    results.append(result)
+                window_results.append(results)
+
+            pool.close()
+            pool.join()
+        finally:
+            shutil.rmtree(snapshot_path, ignore_errors=True)
+
+        window_values = []
+        daily_dfs = []
+
+        for (train_window, test_window), results in zip(windows, window_results):
+            result_values = [result.get() for result in results]
+            best_ix = max(
+                range(len(settings)), key=lambda ix: result_values[ix][1]
+            )
+            setting = settings[best_ix]
+
+            train_start, train_end = train_window
+            test_start, test_end = test_window
+
+            df = self.run_out_of_sample(setting, day_array, test_window)
+            if df is not None:
+                daily_dfs.append(df)
+                statistics = calculate_statistics(df, self.capital)
+                test_value = statistics.get(target_name, 0)
+            else:
+                statistics = {}
+                test_value = 0
+
+            value = {
+                "train_start": self.history_data[train_start].datetime,
+                "train_end": self.history_data[train_end - 1].datetime,
+                "test_start": self.history_data[test_start].datetime,
+                "test_end": self.history_data[test_end - 1].datetime,
+                "setting": setting,
+                "train_target": result_values[best_ix][1],
+                "test_target": test_value,
+                "statistics": statistics,
+            }
+            window_values.append(value)
+
+            self.output(
+                f"样本外区间：{value['test_start']} - {value['test_end']}，"
+                f"参数：{setting}，样本内目标：{value['train_target']}，"
+                f"样本外目标：{test_value}"
+            )
+
+        if daily_dfs:
+            self.daily_df = concat(daily_dfs)
+        else:
+            self.daily_df = None
+            self.output("样本外成交记录为空，无法计算")
+
+        return window_values
 
-        daily_result = self.daily_results.get(d, None)
-        if daily_result:
-            daily_result.close_price = price
+    def run_out_of_sample(
+            self, setting: dict, day_array: np.ndarray, test_window: tuple
+    ):
+        """
+        Run backtesting of setting on out-of-sample window, and return
+        its daily result.
+
+        Strategy is initialized with [days] of data just before the
+        window, so that trading starts at the first data of the window.
+        """
+        engine = BacktestingEngine()
+        engine.output = self.output
+        engine.set_parameters(**self.get_parameters())
+
+        # Call on_init of a temporary strategy to find days of data
+        # required for initializing strategy.
+        engine.add_strategy(self.strategy_class, setting)
+        engine.strategy.on_init()
+        init_days = engine.days
+
+        test_start, test_end = test_window
+        days = np.unique(day_array[:test_start])
+        if init_days and len(days) >= init_days:
+            start = int(np.searchsorted(day_array, days[-init_days]))
         else:
-            self.daily_results[d] = DailyResult(d, price)
+            start = test_start
+
+        engine.clear_data()
+        engine.history_data = self.history_data[start:test_end]
+        engine.add_strategy(self.strategy_class, setting)
+        engine.run_backtesting()
+
+        return engine.calculate_result()
+
+    def load_optimization_data(self):
+        """
+        Load history data for optimization if not loaded yet.
+        """
+        if not self.history_data:
+            self.load_data()
+
+        # Worker processes need column arrays of all history data, so
+        # stream is loaded into list here.
+        if isinstance(self.history_data, HistoryStream):
+            self.history_data = list(self.history_data)
+
+        if not self.history_data:
+            self.output("历史数据为空，无法进行参数优化")
+            return False
+
+        return True
+
+    def get_parameters(self):
+        """
+        Get parameters for creating another engine with the same setup.
+        """
+        parameters = {
+            "vt_symbol": self.vt_symbol,
+            "interval": self.interval,
+            "start": self.start,
+            "rate": self.rate,
+            "slippage": self.slippage,
+            "size": self.size,
+            "pricetick": self.pricetick,
+            "capital": self.capital,
+            "end": self.end,
+            "mode": self.mode,
+            "depth_matching": self.depth_matching,
+        }
+        return parameters
+
+    def create_optimization_pool(self, snapshot_path: Path, use_cache: bool):
+        """
+        Create process pool for optimization.
+
+        History data is loaded only once, and published to worker
+        processes through memory-mapped column files under snapshot_path.
+        Each worker keeps one engine with history data loaded for running
+        all settings assigned to it.
+        """
+        data_class, constants = save_history_snapshot(
+            self.history_data, snapshot_path
+        )
+
+        parameters = self.get_parameters()
+
+        # Key of everything deciding results except strategy setting.
+        cache = None
+        cache_key = ""
+
+        if use_cache:
+            source_hash = get_source_hash(self.strategy_class)
+
+            if source_hash:
+                cache = ResultCache()
+                cache.evict()
+
+                data_hash = get_files_hash(snapshot_path)
+                cache_key = generate_key(
+                    source_hash,
+                    data_hash,
+                    data_class.__name__,
+                    sorted(constants.items()),
+                    sorted(parameters.items()),
+                )
+            else:
+                self.output("找不到策略源代码，不使用回测结果缓存")
+
+        pool = multiprocessing.Pool(
+            multiprocessing.cpu_count(),
+            initializer=init_optimization_worker,
+            initargs=(
+                parameters,
+                snapshot_path,
+                data_class,
+                constants,
+                cache,
+                cache_key
+            )
+        )
+        return pool
+
+    def update_daily_close(self, price: float):
+        """"""
+        self.daily_closes[self.datetime.date()] = price
 
     def new_bar(self, bar: DbBarData):
         """"""
@@ -590,6 +1052,10 @@ class BacktestingEngine:
         """
         Cross limit order with last bar/tick data.
         """
+        if isinstance(self.limit_order_array, DepthOrderArray):
+            self.cross_depth_order()
+            return
+
         if self.mode == BacktestingMode.BAR:
             long_cross_price = self.bar.low_price
             short_cross_price = self.bar.high_price
@@ -601,63 +1067,98 @@ class BacktestingEngine:
             long_best_price = long_cross_price
             short_best_price = short_cross_price
 
-        for order in list(self.active_limit_orders.values()):
-            # Push order update with status "not traded" (pending).
-            if order.status == Status.SUBMITTING:
-                order.status = Status.NOTTRADED
-                self.strategy.on_order(order)
-
-            # Check whether limit orders can be filled.
-            long_cross = (
-                    order.direction == Direction.LONG
-                    and order.price >= long_cross_price
-                    and long_cross_price > 0
-            )
+        # Find all crossed orders with one vectorized comparison, and
+        # only create data objects for those filled.
+        vt_orderids = self.limit_order_array.cross_limit(
+            long_cross_price, short_cross_price
+        )
+        if not vt_orderids:
+            return
 
-            short_cross = (
-                    order.direction == Direction.SHORT
-                    and order.price <= short_cross_price
-                    and short_cross_price > 0
-            )
+        trade_time = self.datetime.strftime("%H:%M:%S")
 
-            if not long_cross and not short_cross:
+        for vt_orderid in vt_orderids:
+            # Order may be cancelled in callback of previous fill.
+            order = self.active_limit_orders.pop(vt_orderid, None)
+            if not order:
                 continue
+            self.limit_order_array.remove(vt_orderid)
 
             # Push order udpate with status "all traded" (filled).
             order.traded = order.volume
             order.status = Status.ALLTRADED
             self.strategy.on_order(order)
 
-            self.active_limit_orders.pop(order.vt_orderid)
-
             # Push trade update
-            self.trade_count += 1
-
-            if long_cross:
+            if order.direction == Direction.LONG:
                 trade_price = min(order.price, long_best_price)
-                pos_change = order.volume
             else:
                 trade_price = max(order.price, short_best_price)
-                pos_change = -order.volume
 
-            trade = TradeData(
-                symbol=order.symbol,
-                exchange=order.exchange,
-                orderid=order.orderid,
-                tradeid=str(self.trade_count),
-                direction=order.direction,
-                offset=order.offset,
-                price=trade_price,
-                volume=order.volume,
-                time=self.datetime.strftime("%H:%M:%S"),
-                gateway_name=self.gateway_name,
-            )
-            trade.datetime = self.datetime
+            self.push_trade(order, trade_price, order.volume, trade_time)
 
-            self.strategy.pos += pos_change
-            self.strategy.on_trade(trade)
+    def cross_depth_order(self):
+        """
+        Cross limit order with five levels of depth of last tick, which
+        may fill order partly.
+        """
+        fills = self.limit_order_array.match_tick(self.tick)
+        if not fills:
+            return
+
+        trade_time = self.datetime.strftime("%H:%M:%S")
+
+        for vt_orderid, price, volume in fills:
+            # Order may be cancelled in callback of previous fill.
+            order = self.active_limit_orders.get(vt_orderid, None)
+            if not order:
+                continue
+
+            order.traded += volume
+            if order.traded >= order.volume:
+                order.traded = order.volume
+                order.status = Status.ALLTRADED
+
+                self.active_limit_orders.pop(vt_orderid)
+                self.limit_order_array.remove(vt_orderid)
+            else:
+                order.status = Status.PARTTRADED
+
+            self.strategy.on_order(order)
 
-            self.trades[trade.vt_tradeid] = trade
+            self.push_trade(order, price, volume, trade_time)
+
+    def push_trade(
+            self, order: OrderData, price: float, volume: float, trade_time: str
+    ):
+        """
+        Create trade of order and push it to strategy.
+        """
+        self.trade_count += 1
+
+        if order.direction == Direction.LONG:
+            pos_change = volume
+        else:
+            pos_change = -volume
+
+        trade = TradeData(
+            symbol=order.symbol,
+            exchange=order.exchange,
+            orderid=order.orderid,
+            tradeid=str(self.trade_count),
+            direction=order.direction,
+            offset=order.offset,
+            price=price,
+            volume=volume,
+            time=trade_time,
+            gateway_name=self.gateway_name,
+        )
+        trade.datetime = self.datetime
+
+        self.strategy.pos += pos_change
+        self.strategy.on_trade(trade)
+
+        self.record_trade(trade, pos_change)
 
     def cross_stop_order(self):
         """
@@ -674,20 +1175,20 @@ class BacktestingEngine:
             long_best_price = long_cross_price
             short_best_price = short_cross_price
 
-        for stop_order in list(self.active_stop_orders.values()):
-            # Check whether stop order can be triggered.
-            long_cross = (
-                    stop_order.direction == Direction.LONG
-                    and stop_order.price <= long_cross_price
-            )
+        stop_orderids = self.stop_order_array.cross_stop(
+            long_cross_price, short_cross_price
+        )
+        if not stop_orderids:
+            return
 
-            short_cross = (
-                    stop_order.direction == Direction.SHORT
-                    and stop_order.price >= short_cross_price
-            )
+        trade_time = self.datetime.strftime("%H:%M:%S")
 
-            if not long_cross and not short_cross:
+        for stop_orderid in stop_orderids:
+            # Stop order may be cancelled in callback of previous fill.
+            stop_order = self.active_stop_orders.pop(stop_orderid, None)
+            if not stop_order:
                 continue
+            self.stop_order_array.remove(stop_orderid)
 
             # Create order data.
             self.limit_order_count += 1
@@ -707,7 +1208,7 @@ class BacktestingEngine:
             self.limit_orders[order.vt_orderid] = order
 
             # Create trade data.
-            if long_cross:
+            if stop_order.direction == Direction.LONG:
                 trade_price = max(stop_order.price, long_best_price)
                 pos_change = order.volume
             else:
@@ -725,19 +1226,17 @@ class BacktestingEngine:
                 offset=order.offset,
                 price=trade_price,
                 volume=order.volume,
-                time=self.datetime.strftime("%H:%M:%S"),
+                time=trade_time,
                 gateway_name=self.gateway_name,
             )
             trade.datetime = self.datetime
 
-            self.trades[trade.vt_tradeid] = trade
+            self.record_trade(trade, pos_change)
 
             # Update stop order.
             stop_order.vt_orderid = order.vt_orderid
             stop_order.status = StopOrderStatus.TRIGGERED
 
-            self.active_stop_orders.pop(stop_order.stop_orderid)
-
             # Push update to strategy.
             self.strategy.on_stop_order(stop_order)
             self.strategy.on_order(order)
@@ -745,6 +1244,17 @@ class BacktestingEngine:
             self.strategy.pos += pos_change
             self.strategy.on_trade(trade)
 
+    def record_trade(self, trade: TradeData, pos_change: float):
+        """
+        Save trade into dict, and also into columns for calculating
+        daily result.
+        """
+        self.trades[trade.vt_tradeid] = trade
+
+        self.trade_days.append(trade.datetime.toordinal())
+        self.trade_prices.append(trade.price)
+        self.trade_pos_changes.append(pos_change)
+
     def load_bar(
             self, vt_symbol: str, days: int, interval: Interval, callback: Callable
     ):
@@ -787,6 +1297,9 @@ class BacktestingEngine:
 
         self.active_stop_orders[stop_order.stop_orderid] = stop_order
         self.stop_orders[stop_order.stop_orderid] = stop_order
+        self.stop_order_array.add(
+            stop_order.stop_orderid, stop_order.direction, price, volume
+        )
 
         return stop_order.stop_orderid
 
@@ -809,6 +1322,7 @@ class BacktestingEngine:
 
         self.active_limit_orders[order.vt_orderid] = order
         self.limit_orders[order.vt_orderid] = order
+        self.limit_order_array.add(order.vt_orderid, direction, price, volume)
 
         return order.vt_orderid
 
@@ -826,6 +1340,7 @@ class BacktestingEngine:
         if vt_orderid not in self.active_stop_orders:
             return
         stop_order = self.active_stop_orders.pop(vt_orderid)
+        self.stop_order_array.remove(vt_orderid)
 
         stop_order.status = StopOrderStatus.CANCELLED
         self.strategy.on_stop_order(stop_order)
@@ -835,6 +1350,7 @@ class BacktestingEngine:
         if vt_orderid not in self.active_limit_orders:
             return
         order = self.active_limit_orders.pop(vt_orderid)
+        self.limit_order_array.remove(vt_orderid)
 
         order.status = Status.CANCELLED
         self.strategy.on_order(order)
@@ -991,3 +1507,397 @@ def optimize(
 
     target_value = statistics[target_name]
     return (str(setting), target_value, statistics)
+
+
+def calculate_statistics(df: DataFrame, capital: float):
+    """
+    Calculate statistics of daily result, and return them in dict.
+
+    Columns of balance, return, highlevel, drawdown and ddpercent are
+    added into df, which are used by show_chart. All statistics are 0
+    if df is None (no trade).
+    """
+    statistics = {
+        "start_date": "",
+        "end_date": "",
+        "total_days": 0,
+        "profit_days": 0,
+        "loss_days": 0,
+        "end_balance": 0,
+        "max_drawdown": 0,
+        "max_ddpercent": 0,
+        "max_drawdown_duration": 0,
+        "total_net_pnl": 0,
+        "daily_net_pnl": 0,
+        "total_commission": 0,
+        "daily_commission": 0,
+        "total_slippage": 0,
+        "daily_slippage": 0,
+        "total_turnover": 0,
+        "daily_turnover": 0,
+        "total_trade_count": 0,
+        "daily_trade_count": 0,
+        "total_return": 0,
+        "annual_return": 0,
+        "daily_return": 0,
+        "return_std": 0,
+        "sharpe_ratio": 0,
+        "return_drawdown_ratio": 0,
+    }
+
+    if df is None or not len(df):
+        return statistics
+
+    # Calculate balance related time series data
+    net_pnl = df["net_pnl"].values
+    balance = np.cumsum(net_pnl) + capital
+    highlevel = np.maximum.accumulate(balance)
+    drawdown = balance - highlevel
+
+    pre_balance = np.concatenate([[balance[0]], balance[:-1]])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_return = np.log(balance / pre_balance)
+    daily_return[np.isnan(daily_return)] = 0
+
+    df["balance"] = balance
+    df["return"] = daily_return
+    df["highlevel"] = highlevel
+    df["drawdown"] = drawdown
+    df["ddpercent"] = drawdown / highlevel * 100
+
+    # Drawdown duration is number of days since last new high.
+    day_ix = np.arange(len(df))
+    last_high_ix = np.maximum.accumulate(np.where(drawdown >= 0, day_ix, 0))
+
+    total_days = len(df)
+    end_balance = balance[-1]
+
+    total_net_pnl = net_pnl.sum()
+    total_commission = df["commission"].values.sum()
+    total_slippage = df["slippage"].values.sum()
+    total_turnover = df["turnover"].values.sum()
+    total_trade_count = df["trade_count"].values.sum()
+
+    total_return = (end_balance / capital - 1) * 100
+    max_ddpercent = df["ddpercent"].values.min()
+
+    return_mean = daily_return.mean() * 100
+    if total_days > 1:
+        return_std = daily_return.std(ddof=1) * 100
+    else:
+        return_std = 0
+
+    if return_std:
+        sharpe_ratio = return_mean / return_std * np.sqrt(ANNUAL_DAYS)
+    else:
+        sharpe_ratio = 0
+
+    if max_ddpercent:
+        return_drawdown_ratio = -total_return / max_ddpercent
+    else:
+        return_drawdown_ratio = 0
+
+    statistics.update({
+        "start_date": df.index[0],
+        "end_date": df.index[-1],
+        "total_days": total_days,
+        "profit_days": int((net_pnl > 0).sum()),
+        "loss_days": int((net_pnl < 0).sum()),
+        "end_balance": end_balance,
+        "max_drawdown": drawdown.min(),
+        "max_ddpercent": max_ddpercent,
+        "max_drawdown_duration": int((day_ix - last_high_ix).max()),
+        "total_net_pnl": total_net_pnl,
+        "daily_net_pnl": total_net_pnl / total_days,
+        "total_commission": total_commission,
+        "daily_commission": total_commission / total_days,
+        "total_slippage": total_slippage,
+        "daily_slippage": total_slippage / total_days,
+        "total_turnover": total_turnover,
+        "daily_turnover": total_turnover / total_days,
+        "total_trade_count": total_trade_count,
+        "daily_trade_count": total_trade_count / total_days,
+        "total_return": total_return,
+        "annual_return": total_return / total_days * ANNUAL_DAYS,
+        "daily_return": return_mean,
+        "return_std": return_std,
+        "sharpe_ratio": sharpe_ratio,
+        "return_drawdown_ratio": return_drawdown_ratio,
+    })
+
+    return statistics
+
+
+def output_statistics(statistics: dict, capital: float, output: Callable):
+    """
+    Output statistics with output function.
+    """
+    output("-" * 30)
+    output(f"首个交易日：\t{statistics['start_date']}")
+    output(f"最后交易日：\t{statistics['end_date']}")
+
+    output(f"总交易日：\t{statistics['total_days']}")
+    output(f"盈利交易日：\t{statistics['profit_days']}")
+    output(f"亏损交易日：\t{statistics['loss_days']}")
+
+    output(f"起始资金：\t{capital:,.2f}")
+    output(f"结束资金：\t{statistics['end_balance']:,.2f}")
+
+    output(f"总收益率：\t{statistics['total_return']:,.2f}%")
+    output(f"年化收益：\t{statistics['annual_return']:,.2f}%")
+    output(f"最大回撤: \t{statistics['max_drawdown']:,.2f}")
+    output(f"百分比最大回撤: {statistics['max_ddpercent']:,.2f}%")
+    output(f"最长回撤天数: \t{statistics['max_drawdown_duration']}")
+
+    output(f"总盈亏：\t{statistics['total_net_pnl']:,.2f}")
+    output(f"总手续费：\t{statistics['total_commission']:,.2f}")
+    output(f"总滑点：\t{statistics['total_slippage']:,.2f}")
+    output(f"总成交金额：\t{statistics['total_turnover']:,.2f}")
+    output(f"总成交笔数：\t{statistics['total_trade_count']}")
+
+    output(f"日均盈亏：\t{statistics['daily_net_pnl']:,.2f}")
+    output(f"日均手续费：\t{statistics['daily_commission']:,.2f}")
+    output(f"日均滑点：\t{statistics['daily_slippage']:,.2f}")
+    output(f"日均成交金额：\t{statistics['daily_turnover']:,.2f}")
+    output(f"日均成交笔数：\t{statistics['daily_trade_count']}")
+
+    output(f"日均收益率：\t{statistics['daily_return']:,.2f}%")
+    output(f"收益标准差：\t{statistics['return_std']:,.2f}%")
+    output(f"Sharpe Ratio：\t{statistics['sharpe_ratio']:,.2f}")
+    output(f"收益回撤比：\t{statistics['return_drawdown_ratio']:,.2f}")
+
+
+def generate_walk_forward_windows(
+        day_array: np.ndarray, train_days: int, test_days: int
+):
+    """
+    Split history data into rolling windows by calendar days.
+
+    day_array is date ordinal of every history data in time order.
+    Return list of (train window, test window), each window is (start
+    index, end index) of history data. Windows are rolled forward by
+    [test_days], so that test windows are next to each other.
+    """
+    windows = []
+    if not len(day_array):
+        return windows
+
+    first_day = int(day_array[0])
+    last_day = int(day_array[-1])
+
+    train_start_day = first_day
+    while train_start_day + train_days <= last_day:
+        test_start_day = train_start_day + train_days
+        test_end_day = test_start_day + test_days
+
+        train_start, test_start, test_end = np.searchsorted(
+            day_array, [train_start_day, test_start_day, test_end_day]
+        ).tolist()
+
+        if train_start < test_start < test_end:
+            windows.append(((train_start, test_start), (test_start, test_end)))
+
+        train_start_day += test_days
+
+    return windows
+
+
+# Engine, history data snapshot and result cache of optimization worker
+# process, set by init_optimization_worker. History data is loaded from
+# snapshot when first needed.
+optimization_engine = None
+optimization_snapshot = None
+optimization_cache = None
+optimization_history = []
+
+
+def save_history_snapshot(history_data: list, path: Path):
+    """
+    Save history data into numpy column files under path, for sharing
+    with optimization worker processes.
+
+    Return data class and values of fields which are the same for all
+    data (symbol, exchange, etc.). Fields which are neither numbers nor
+    datetime should be the same for all data, otherwise ValueError is
+    raised.
+    """
+    first = history_data[0]
+    constants = {}
+
+    for field in fields(first):
+        name = field.name
+        value = getattr(first, name)
+
+        if name == "datetime":
+            array = np.array(
+                [data.datetime for data in history_data],
+                dtype="datetime64[us]"
+            )
+        elif isinstance(value, (int, float)):
+            array = np.array([getattr(data, name) for data in history_data])
+
+            # Integer columns (such as epoch_ns) are kept as integer to
+            # avoid losing precision.
+            if array.dtype.kind != "i":
+                array = array.astype(float)
+        else:
+            for data in history_data:
+                if getattr(data, name) != value:
+                    raise ValueError(
+                        f"历史数据字段{name}的值不全相同：{value}，{getattr(data, name)}"
+                    )
+
+            constants[name] = value
+            continue
+
+        np.save(path.joinpath(f"{name}.npy"), array)
+
+    return type(first), constants
+
+
+def load_history_snapshot(path: Path, data_class: type, constants: dict):
+    """
+    Load history data from memory-mapped column files saved by
+    save_history_snapshot.
+    """
+    columns = {}
+    for file_path in path.glob("*.npy"):
+        columns[file_path.stem] = np.load(file_path, mmap_mode="r")
+
+    return HistorySnapshot(data_class, columns, constants)
+
+
+class HistorySnapshot:
+    """
+    History data backed by memory-mapped column files.
+
+    Column files are shared by all worker processes through page cache.
+    Data objects are only created chunk by chunk when iterated, and not
+    kept after being replayed, so a worker never holds a copy of all
+    history data. Slicing returns another snapshot of column views.
+    """
+
+    def __init__(
+        self,
+        data_class: type,
+        columns: dict,
+        constants: dict,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        """"""
+        self.data_class = data_class
+        self.columns = columns
+        self.constants = constants
+        self.chunk_size = chunk_size
+
+        self.names = list(columns.keys())
+        self.count = len(next(iter(columns.values()))) if columns else 0
+
+    def __len__(self):
+        """"""
+        return self.count
+
+    def __bool__(self):
+        """"""
+        return self.count > 0
+
+    def __getitem__(self, key):
+        """"""
+        if isinstance(key, slice):
+            columns = {name: array[key] for name, array in self.columns.items()}
+            return HistorySnapshot(
+                self.data_class, columns, self.constants, self.chunk_size
+            )
+
+        values = [self.columns[name][key].tolist() for name in self.names]
+        return self.create_data(values)
+
+    def __iter__(self):
+        """"""
+        for ix in range(0, self.count, self.chunk_size):
+            chunk = [
+                self.columns[name][ix:ix + self.chunk_size].tolist()
+                for name in self.names
+            ]
+
+            for values in zip(*chunk):
+                yield self.create_data(values)
+
+    def create_data(self, values: list):
+        """"""
+        kwargs = dict(zip(self.names, values))
+        return self.data_class(**kwargs, **self.constants)
+
+
+def init_optimization_worker(
+        parameters: dict,
+        path: Path,
+        data_class: type,
+        constants: dict,
+        cache: ResultCache,
+        cache_key: str,
+):
+    """
+    Initializer of optimization worker process, which creates the engine
+    used for all settings run in this process.
+
+    History data is loaded only once when the first setting not found
+    in result cache is run.
+    """
+    global optimization_engine, optimization_snapshot, optimization_cache
+
+    optimization_engine = BacktestingEngine()
+    optimization_engine.set_parameters(**parameters)
+
+    optimization_snapshot = (path, data_class, constants)
+    optimization_cache = (cache, cache_key)
+
+
+def optimize_setting(
+        target_name: str,
+        strategy_class: CtaTemplate,
+        setting: dict,
+        window: tuple = None,
+):
+    """
+    Function for running in multiprocessing.pool with engine created
+    by init_optimization_worker.
+
+    If window (start index, end index) is given, only the slice of
+    history data in it is used.
+    """
+    global optimization_history
+
+    cache, cache_key = optimization_cache
+    if cache:
+        if window:
+            key = generate_key(cache_key, sorted(setting.items()), window)
+        else:
+            key = generate_key(cache_key, sorted(setting.items()))
+        statistics = cache.get(key)
+
+        if statistics is not None:
+            return (str(setting), statistics[target_name], statistics)
+
+    engine = optimization_engine
+    engine.clear_data()
+
+    if not optimization_history:
+        optimization_history = load_history_snapshot(*optimization_snapshot)
+
+    if window:
+        start, end = window
+        engine.history_data = optimization_history[start:end]
+    else:
+        engine.history_data = optimization_history
+
+    engine.add_strategy(strategy_class, setting)
+    engine.run_backtesting()
+    engine.calculate_result()
+    statistics = engine.calculate_statistics()
+
+    if cache:
+        cache.put(key, statistics)
+
+    target_value = statistics[target_name]
+    return (str(setting), target_value, statistics)
@@ -4,11 +4,12 @@ import importlib
 import os
 import traceback
 from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Callable
 from datetime import datetime, timedelta
-from threading import Thread
-from queue import Queue
+from threading import Lock
+from time import time
 
 import rqdatac
 
@@ -38,6 +39,8 @@ from .base import (
     ORDER_CTA2VT,
     STOPORDER_PREFIX
 )
+from .history_cache import HistoryCache
+from .matching import StopOrderIndex
 from .template import CtaTemplate
 
 
@@ -49,6 +52,8 @@ class CtaEngine(BaseEngine):
     setting_filename = "cta_strategy_setting.json"
     data_filename = "cta_strategy_data.json"
 
+    init_worker_count = 8  # number of strategies initialized at same time
+
     def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
         """"""
         super(CtaEngine, self).__init__(
@@ -68,9 +73,16 @@ class CtaEngine(BaseEngine):
 
         self.stop_order_count = 0   # for generating stop_orderid
         self.stop_orders = {}       # stop_orderid: stop_order
+        self.symbol_stop_orders = defaultdict(
+            StopOrderIndex)         # vt_symbol: stop orders by price
 
-        self.init_thread = None
-        self.init_queue = Queue()
+        self.init_executor = None   # thread pool for initializing strategies
+        self.init_lock = Lock()
+        self.init_names = set()     # names of strategies being initialized
+        self.init_count = 0         # strategies initialized in this batch
+        self.init_total = 0         # strategies submitted in this batch
+        self.history_futures = {}   # history request: future of data
+        self.history_cache = HistoryCache()  # recent history data windows
 
         self.rq_client = None
         self.rq_symbols = set()
@@ -87,7 +99,8 @@ class CtaEngine(BaseEngine):
 
     def close(self):
         """"""
-        pass
+        if self.init_executor:
+            self.init_executor.shutdown(wait=False)
 
     def register_event(self):
         """"""
@@ -136,18 +149,27 @@ class CtaEngine(BaseEngine):
             end_date=end
         )
 
+        exchange = Exchange(exchange_str)
+
         data = []
-        for ix, row in df.iterrows():
+        for dt, open_price, high_price, low_price, close_price, volume in zip(
+            df.index.to_pydatetime(),
+            df["open"].tolist(),
+            df["high"].tolist(),
+            df["low"].tolist(),
+            df["close"].tolist(),
+            df["volume"].tolist(),
+        ):
             bar = BarData(
                 symbol=symbol,
-                exchange=Exchange(exchange_str),
+                exchange=exchange,
                 interval=interval,
-                datetime=row.name.to_pydatetime(),
-                open_price=row["open"],
-                high_price=row["high"],
-                low_price=row["low"],
-                close_price=row["close"],
-                volume=row["volume"],
+                datetime=dt,
+                open_price=open_price,
+                high_price=high_price,
+                low_price=low_price,
+                close_price=close_price,
+                volume=volume,
                 gateway_name="RQ"
             )
             data.append(bar)
@@ -163,6 +185,7 @@ class CtaEngine(BaseEngine):
             return
 
         self.check_stop_order(tick)
+        self.history_cache.update(("tick", tick.vt_symbol), tick)
 
         for strategy in strategies:
             if strategy.inited:
@@ -200,55 +223,60 @@ class CtaEngine(BaseEngine):
         self.put_strategy_event(strategy)
 
     def check_stop_order(self, tick: TickData):
-        """"""
-        for stop_order in self.stop_orders.values():
-            if stop_order.vt_symbol != tick.vt_symbol:
+        """
+        Trigger stop orders of tick symbol, only stop orders whose price
+        is crossed by last price are checked.
+        """
+        index = self.symbol_stop_orders.get(tick.vt_symbol, None)
+        if not index:
+            return
+
+        for stop_orderid in index.pop_triggered(tick.last_price):
+            # Stop order may be cancelled in callback of previous one.
+            stop_order = self.stop_orders.get(stop_orderid, None)
+            if not stop_order:
                 continue
 
-            long_triggered = (
-                stop_order.direction == Direction.LONG and tick.last_price >= stop_order.price
-            )
-            short_triggered = (
-                stop_order.direction == Direction.SHORT and tick.last_price <= stop_order.price
-            )
+            strategy = self.strategies[stop_order.strategy_name]
 
-            if long_triggered or short_triggered:
-                strategy = self.strategies[stop_order.strategy_name]
-
-                # To get excuted immediately after stop order is
-                # triggered, use limit price if available, otherwise
-                # use ask_price_5 or bid_price_5
-                if stop_order.direction == Direction.LONG:
-                    if tick.limit_up:
-                        price = tick.limit_up
-                    else:
-                        price = tick.ask_price_5
+            # To get excuted immediately after stop order is
+            # triggered, use limit price if available, otherwise
+            # use ask_price_5 or bid_price_5
+            if stop_order.direction == Direction.LONG:
+                if tick.limit_up:
+                    price = tick.limit_up
+                else:
+                    price = tick.ask_price_5
+            else:
+                if tick.limit_down:
+                    price = tick.limit_down
                 else:
-                    if tick.limit_down:
-                        price = tick.limit_down
-                    else:
-                        price = tick.bid_price_5
+                    price = tick.bid_price_5
 
-                vt_orderid = self.send_limit_order(
-                    strategy, stop_order.order_type, price, stop_order.volume
-                )
+            vt_orderid = self.send_limit_order(
+                strategy, stop_order.order_type, price, stop_order.volume
+            )
 
-                # Update stop order status if placed successfully
-                if vt_orderid:
-                    # Remove from relation map.
-                    self.stop_orders.pop(stop_order.stop_orderid)
+            # Update stop order status if placed successfully, otherwise
+            # keep it for next tick.
+            if not vt_orderid:
+                index.add(stop_order)
+                continue
 
-                    vt_orderids = self.strategy_orderid_map[strategy.strategy_name]
-                    if stop_order.stop_orderid in vt_orderids:
-                        vt_orderids.remove(stop_order.stop_orderid)
+            # Remove from relation map.
+            self.stop_orders.pop(stop_order.stop_orderid)
 
-                    # Change stop order status to cancelled and update to strategy.
-                    stop_order.status = StopOrderStatus.TRIGGERED
-                    stop_order.vt_orderid = vt_orderid
+            vt_orderids = self.strategy_orderid_map[strategy.strategy_name]
+            if stop_order.stop_orderid in vt_orderids:
+                vt_orderids.remove(stop_order.stop_orderid)
 
-                    self.call_strategy_func(
-                        strategy, strategy.on_stop_order, stop_order
-                    )
+            # Change stop order status to cancelled and update to strategy.
+            stop_order.status = StopOrderStatus.TRIGGERED
+            stop_order.vt_orderid = vt_orderid
+
+            self.call_strategy_func(
+                strategy, strategy.on_stop_order, stop_order
+            )
 
     def send_limit_order(
         self,
@@ -271,7 +299,7 @@ class CtaEngine(BaseEngine):
         req = OrderRequest(
             symbol=contract.symbol,
             exchange=contract.exchange,
-            dierction=direction,
+            direction=direction,
             offset=offset,
             price_type=PriceType.LIMIT,
             price=price,
@@ -299,13 +327,11 @@ class CtaEngine(BaseEngine):
         Send a new order.
         """
         self.stop_order_count += 1
-        direction, offset = ORDER_CTA2VT[order_type]
         stop_orderid = f"{STOPORDER_PREFIX}.{self.stop_order_count}"
 
         stop_order = StopOrder(
             vt_symbol=strategy.vt_symbol,
-            direction=direction,
-            offset=offset,
+            order_type=order_type,
             price=price,
             volume=volume,
             stop_orderid=stop_orderid,
@@ -313,6 +339,7 @@ class CtaEngine(BaseEngine):
         )
 
         self.stop_orders[stop_orderid] = stop_order
+        self.symbol_stop_orders[stop_order.vt_symbol].add(stop_order)
 
         vt_orderids = self.strategy_orderid_map[strategy.strategy_name]
         vt_orderids.add(stop_orderid)
@@ -344,6 +371,7 @@ class CtaEngine(BaseEngine):
 
         # Remove from relation map.
         self.stop_orders.pop(stop_orderid)
+        self.symbol_stop_orders[stop_order.vt_symbol].remove(stop_orderid)
 
         vt_orderids = self.strategy_orderid_map[strategy.strategy_name]
         if stop_orderid in vt_orderids:
@@ -396,10 +424,99 @@ class CtaEngine(BaseEngine):
         self, vt_symbol: str, days: int, interval: Interval, callback: Callable
     ):
         """"""
+        data = self.get_history_data(
+            ("bar", vt_symbol, interval, days),
+            self.query_bar_history,
+            vt_symbol,
+            days,
+            interval
+        )
+
+        for bar in data:
+            callback(bar)
+
+    def load_tick(self, vt_symbol: str, days: int, callback: Callable):
+        """"""
+        data = self.get_history_data(
+            ("tick", vt_symbol, days),
+            self.query_tick_history,
+            vt_symbol,
+            days
+        )
+
+        for tick in data:
+            callback(tick)
+
+    def get_history_data(self, key: tuple, func: Callable, *args):
+        """
+        Get history data of a request while initializing strategies.
+
+        The same request (type, vt_symbol, interval, days) from many
+        strategies is only queried once: the first strategy queries it in
+        its own init thread, and others wait for the result.
+        """
+        with self.init_lock:
+            future = self.history_futures.get(key, None)
+            owner = future is None
+
+            if owner:
+                future = Future()
+                self.history_futures[key] = future
+
+        if not owner:
+            return future.result()
+
+        start = time()
+        try:
+            data = func(*args)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+
+        future.set_result(data)
+
+        cost = time() - start
+        self.write_log(f"{key[1]}历史数据加载完成，数据量{len(data)}，耗时{cost:.2f}秒")
+
+        return data
+
+    def query_bar_history(self, vt_symbol: str, days: int, interval: Interval):
+        """
+        Query bar data of last [days] through history cache, so that only
+        data not loaded before is queried.
+        """
         end = datetime.now()
         start = end - timedelta(days)
 
-        # Query data from RQData by default, if not found, load from database.
+        return self.history_cache.load(
+            ("bar", vt_symbol, interval),
+            start,
+            end,
+            lambda start, end: self.query_bar_data(vt_symbol, interval, start, end)
+        )
+
+    def query_tick_history(self, vt_symbol: str, days: int):
+        """
+        Query tick data of last [days] through history cache, so that
+        only data not loaded before is queried.
+        """
+        end = datetime.now()
+        start = end - timedelta(days)
+
+        return self.history_cache.load(
+            ("tick", vt_symbol),
+            start,
+            end,
+            lambda start, end: self.query_tick_data(vt_symbol, start, end)
+        )
+
+    def query_bar_data(
+        self, vt_symbol: str, interval: Interval, start: datetime, end: datetime
+    ):
+        """
+        Query bar data from RQData by default, if not found, load from
+        database.
+        """
         data = self.query_bar_from_rq(vt_symbol, interval, start, end)
         if not data:
             s = (
@@ -414,26 +531,24 @@ class CtaEngine(BaseEngine):
             )
             data = [db_bar.to_bar() for db_bar in s]
 
-        for bar in data:
-            callback(bar)
-
-    def load_tick(self, vt_symbol: str, days: int, callback: Callable):
-        """"""
-        end = datetime.now()
-        start = end - timedelta(days)
+        return data
 
+    def query_tick_data(self, vt_symbol: str, start: datetime, end: datetime):
+        """
+        Query tick data from database.
+        """
         s = (
             DbTickData.select()
             .where(
-                (DbBarData.vt_symbol == vt_symbol)
-                & (DbBarData.datetime >= start)
-                & (DbBarData.datetime <= end)
+                (DbTickData.vt_symbol == vt_symbol)
+                & (DbTickData.datetime >= start)
+                & (DbTickData.datetime <= end)
             )
-            .order_by(DbBarData.datetime)
+            .order_by(DbTickData.datetime)
         )
+        data = [db_tick.to_tick() for db_tick in s]
 
-        for tick in s:
-            callback(tick)
+        return data
 
     def call_strategy_func(
         self, strategy: CtaTemplate, func: Callable, params: Any = None
@@ -479,28 +594,45 @@ class CtaEngine(BaseEngine):
 
     def init_strategy(self, strategy_name: str):
         """
-        Init a strategy.
-        """ 
-        self.init_queue.put(strategy_name)
+        Init a strategy in thread pool, so that many strategies can be
+        initialized at the same time.
+        """
+        strategy = self.strategies[strategy_name]
+        if strategy.inited:
+            self.write_log(f"{strategy_name}已经完成初始化，禁止重复操作")
+            return
+
+        with self.init_lock:
+            if strategy_name in self.init_names:
+                self.write_log(f"{strategy_name}正在初始化，禁止重复操作")
+                return
 
-        if not self.init_thread:
-            self.init_thread = Thread(target=self._init_strategy)
-            self.init_thread.start()
+            # Start a new batch when all strategies submitted before are
+            # initialized.
+            if not self.init_names:
+                self.init_count = 0
+                self.init_total = 0
 
-    def _init_strategy(self):
+            self.init_names.add(strategy_name)
+            self.init_total += 1
+
+            if not self.init_executor:
+                self.init_executor = ThreadPoolExecutor(
+                    max_workers=self.init_worker_count
+                )
+
+        self.init_executor.submit(self._init_strategy, strategy_name)
+
+    def _init_strategy(self, strategy_name: str):
         """
-        Init strategies in queue.
+        Init a strategy, running in thread pool.
         """
-        while not self.init_queue.empty():
-            strategy_name = self.init_queue.get()
-            strategy = self.strategies[strategy_name]
-
-            if strategy.inited:
-                self.write_log(f"{strategy_name}已经完成初始化，禁止重复操作")
-                continue
+        strategy = self.strategies[strategy_name]
+        start = time()
 
-            self.write_log(f"{strategy_name}开始执行初始化")
+        self.write_log(f"{strategy_name}开始执行初始化")
 
+        try:
             # Call on_init function of strategy
             self.call_strategy_func(strategy, strategy.on_init)
 
@@ -524,9 +656,21 @@ class CtaEngine(BaseEngine):
             # Put event to update init completed status.
             strategy.inited = True
             self.put_strategy_event(strategy)
-            self.write_log(f"{strategy_name}初始化完成")
-        
-        self.init_thread = None
+        finally:
+            with self.init_lock:
+                self.init_names.discard(strategy_name)
+                self.init_count += 1
+                count = self.init_count
+                total = self.init_total
+
+                # History data is only shared within one batch.
+                if not self.init_names:
+                    self.history_futures.clear()
+
+        cost = time() - start
+        self.write_log(
+            f"{strategy_name}初始化完成，耗时{cost:.2f}秒，进度{count}/{total}"
+        )
 
     def start_strategy(self, strategy_name: str):
         """
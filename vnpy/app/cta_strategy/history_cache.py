@@ -0,0 +1,251 @@
+"""
+In-process cache of recent history data used by CtaEngine.
+"""
+
+import sys
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from typing import Callable
+
+
+slot_names = {}     # type: names of slots of the type and its bases
+
+
+def get_slot_names(data_type: type):
+    """
+    Get names of all slots of a slotted type.
+    """
+    names = slot_names.get(data_type, None)
+
+    if names is None:
+        names = []
+        for cls in data_type.__mro__:
+            slots = cls.__dict__.get("__slots__", ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            names.extend(slots)
+        slot_names[data_type] = names
+
+    return names
+
+
+def get_data_size(data):
+    """
+    Estimate memory size of one bar/tick object in bytes, including
+    its attribute values, which are kept either in __dict__ or in
+    __slots__ (TickData).
+
+    Only floats, datetimes and large ints are counted as values, since
+    strings, enums and small ints are shared by all data objects.
+    """
+    size = sys.getsizeof(data)
+
+    attributes = getattr(data, "__dict__", None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+        values = list(attributes.values())
+    else:
+        values = []
+
+    for name in get_slot_names(type(data)):
+        if name not in ("__dict__", "__weakref__"):
+            values.append(getattr(data, name, None))
+
+    for value in values:
+        if isinstance(value, (float, datetime)):
+            size += sys.getsizeof(value)
+        elif isinstance(value, int) and not -5 <= value <= 256:
+            size += sys.getsizeof(value)
+
+    return size
+
+
+class HistoryWindow:
+    """
+    History data of one key, covering time range [start, end].
+    """
+
+    def __init__(self, start: datetime, end: datetime, data: list):
+        """"""
+        self.start = start
+        self.end = end
+        self.data = data
+        self.datetimes = [d.datetime for d in data]
+
+        if data:
+            self.data_size = get_data_size(data[0])
+        else:
+            self.data_size = 0
+
+    def __len__(self):
+        """"""
+        return len(self.data)
+
+    @property
+    def size(self):
+        """
+        Estimated memory size in bytes.
+        """
+        return len(self.data) * self.data_size
+
+    def append(self, data: list):
+        """
+        Append data newer than the last data in window.
+        """
+        if not data:
+            return
+
+        if self.datetimes:
+            last_datetime = self.datetimes[-1]
+            data = [d for d in data if d.datetime > last_datetime]
+
+        if not data:
+            return
+
+        if not self.data_size:
+            self.data_size = get_data_size(data[0])
+
+        self.data.extend(data)
+        self.datetimes.extend(d.datetime for d in data)
+
+    def get(self, start: datetime, end: datetime):
+        """
+        Get data within [start, end].
+        """
+        ix_start = bisect_left(self.datetimes, start)
+        ix_end = bisect_right(self.datetimes, end)
+        return self.data[ix_start:ix_end]
+
+    def trim(self, count: int):
+        """
+        Remove the oldest count of data, start of window is moved to the
+        first data left.
+        """
+        del self.data[:count]
+        del self.datetimes[:count]
+
+        if self.datetimes:
+            self.start = self.datetimes[0]
+        else:
+            self.start = self.end
+
+
+class HistoryCache:
+    """
+    LRU cache of history data windows keyed by request type, vt_symbol
+    and interval.
+
+    A window loaded before is reused if it covers start of request, and
+    only data after its end is queried to top it up. Live data can also
+    be appended by update. Least recently used windows are evicted when
+    estimated memory size exceeds max_size, and the oldest data of the
+    last window left is trimmed if it still exceeds max_size.
+    """
+
+    def __init__(self, max_size: int = 512 * 1024 * 1024):
+        """"""
+        self.max_size = max_size
+        self.windows = OrderedDict()    # key: HistoryWindow
+        self.total_size = 0             # estimated size of all windows
+        self.lock = Lock()
+
+    def load(self, key: tuple, start: datetime, end: datetime, query: Callable):
+        """
+        Load data within [start, end] of key.
+
+        query(start, end) is called to get data not in cache, which
+        should return a list of data sorted by datetime.
+        """
+        with self.lock:
+            window = self.windows.get(key, None)
+            if window and window.start <= start:
+                self.windows.move_to_end(key)
+            else:
+                window = None
+
+        if not window:
+            window = HistoryWindow(start, end, query(start, end))
+
+            with self.lock:
+                old_window = self.windows.pop(key, None)
+                if old_window:
+                    self.total_size -= old_window.size
+
+                self.windows[key] = window
+                self.total_size += window.size
+                self.evict()
+        elif end > window.end:
+            data = query(window.end, end)
+
+            with self.lock:
+                size = window.size
+                window.append(data)
+                window.end = end
+
+                # Window may be evicted while querying.
+                if self.windows.get(key, None) is window:
+                    self.total_size += window.size - size
+                    self.evict()
+
+        with self.lock:
+            return window.get(start, end)
+
+    def update(self, key: tuple, data):
+        """
+        Append a live bar/tick into window of key, if it is cached.
+        """
+        with self.lock:
+            window = self.windows.get(key, None)
+            if not window:
+                return
+
+            # Live ticks may have the same datetime as the last one.
+            if window.datetimes and data.datetime < window.datetimes[-1]:
+                return
+
+            window.data.append(data)
+            window.datetimes.append(data.datetime)
+
+            if not window.data_size:
+                window.data_size = get_data_size(data)
+            self.total_size += window.data_size
+
+            if data.datetime > window.end:
+                window.end = data.datetime
+
+            if self.total_size > self.max_size:
+                self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used windows until total size is within
+        max size. The latest window is always kept, but its oldest data
+        is trimmed if it alone exceeds max size.
+        """
+        while self.total_size > self.max_size and len(self.windows) > 1:
+            key, window = self.windows.popitem(last=False)
+            self.total_size -= window.size
+
+        if self.total_size <= self.max_size or not self.windows:
+            return
+
+        window = next(reversed(self.windows.values()))
+        if not window.data_size:
+            return
+
+        # Trim at least a tenth of window, so that list is not shifted
+        # on every live update.
+        excess = self.total_size - self.max_size
+        count = max(-(-excess // window.data_size), len(window) // 10)
+
+        size = window.size
+        window.trim(count)
+        self.total_size += window.size - size
+
+    def clear(self):
+        """"""
+        with self.lock:
+            self.windows.clear()
+            self.total_size = 0
@@ -0,0 +1,483 @@
+"""
+Order matching kernels used by BacktestingEngine and CtaEngine.
+"""
+
+import heapq
+from operator import attrgetter
+
+import numpy as np
+
+from vnpy.trader.constant import Direction
+
+DEPTH_LEVELS = 5
+
+# Rows of depth array of a tick, each row has one value per level.
+BID_PRICE = 0
+BID_VOLUME = 1
+ASK_PRICE = 2
+ASK_VOLUME = 3
+
+get_depth = attrgetter(*[
+    f"{name}_{level}"
+    for name in ["bid_price", "bid_volume", "ask_price", "ask_volume"]
+    for level in range(1, DEPTH_LEVELS + 1)
+])
+
+# Tolerance for comparing float prices.
+PRICE_EPSILON = 1e-8
+
+
+class OrderArray:
+    """
+    Resting orders saved in parallel arrays of price, volume and
+    direction, so that crosses of all orders against a bar/tick are
+    found with one vectorized comparison.
+
+    Each order is identified by a key (vt_orderid or stop_orderid).
+    The slot of a removed order is filled with the last order to keep
+    arrays compact, and sequence numbers keep the original submit order
+    for pushing fills.
+    """
+
+    # Names of parallel arrays, one slot per order.
+    array_names = ["prices", "volumes", "directions", "seqs"]
+
+    def __init__(self, capacity: int = 64):
+        """"""
+        self.count = 0
+        self.seq = 0
+
+        self.prices = np.zeros(capacity)
+        self.volumes = np.zeros(capacity)
+        self.directions = np.zeros(capacity, dtype=np.int8)
+        self.seqs = np.zeros(capacity, dtype=np.int64)
+
+        self.keys = []          # index: key
+        self.positions = {}     # key: index
+
+    def __len__(self):
+        """"""
+        return self.count
+
+    def __contains__(self, key: str):
+        """"""
+        return key in self.positions
+
+    def add(self, key: str, direction: Direction, price: float, volume: float):
+        """
+        Add a new resting order.
+        """
+        if self.count == len(self.prices):
+            self._grow()
+
+        ix = self.count
+        self.prices[ix] = price
+        self.volumes[ix] = volume
+        self.seqs[ix] = self.seq
+
+        if direction == Direction.LONG:
+            self.directions[ix] = 1
+        else:
+            self.directions[ix] = -1
+
+        self.keys.append(key)
+        self.positions[key] = ix
+
+        self.count += 1
+        self.seq += 1
+
+    def remove(self, key: str):
+        """
+        Remove an order by moving the last order into its slot.
+        """
+        ix = self.positions.pop(key, None)
+        if ix is None:
+            return
+
+        last = self.count - 1
+        last_key = self.keys.pop()
+
+        if ix != last:
+            for name in self.array_names:
+                array = getattr(self, name)
+                array[ix] = array[last]
+
+            self.keys[ix] = last_key
+            self.positions[last_key] = ix
+
+        self.count = last
+
+    def clear(self):
+        """"""
+        self.count = 0
+        self.seq = 0
+        self.keys.clear()
+        self.positions.clear()
+
+    def cross_limit(self, long_cross_price: float, short_cross_price: float):
+        """
+        Get keys of limit orders crossed, in submit order.
+
+        Long orders cross when price >= long_cross_price, and short
+        orders cross when price <= short_cross_price. Zero cross price
+        means no market on that side.
+        """
+        if not self.count:
+            return []
+
+        prices = self.prices[:self.count]
+        directions = self.directions[:self.count]
+
+        crossed = np.zeros(self.count, dtype=bool)
+        if long_cross_price > 0:
+            crossed |= (directions == 1) & (prices >= long_cross_price)
+        if short_cross_price > 0:
+            crossed |= (directions == -1) & (prices <= short_cross_price)
+
+        return self._get_keys(crossed)
+
+    def cross_stop(self, long_cross_price: float, short_cross_price: float):
+        """
+        Get keys of stop orders triggered, in submit order.
+
+        Long stops trigger when price <= long_cross_price, and short
+        stops trigger when price >= short_cross_price.
+        """
+        if not self.count:
+            return []
+
+        prices = self.prices[:self.count]
+        directions = self.directions[:self.count]
+
+        crossed = (
+            ((directions == 1) & (prices <= long_cross_price))
+            | ((directions == -1) & (prices >= short_cross_price))
+        )
+
+        return self._get_keys(crossed)
+
+    def _get_keys(self, crossed: np.ndarray):
+        """"""
+        ix = np.flatnonzero(crossed)
+        if not len(ix):
+            return []
+
+        if len(ix) > 1:
+            ix = ix[np.argsort(self.seqs[ix])]
+
+        return [self.keys[i] for i in ix]
+
+    def _grow(self):
+        """
+        Double capacity of arrays.
+        """
+        capacity = len(self.prices) * 2
+
+        for name in self.array_names:
+            old_array = getattr(self, name)
+            new_array = np.zeros(capacity, dtype=old_array.dtype)
+            new_array[:self.count] = old_array[:self.count]
+            setattr(self, name, new_array)
+
+
+class DepthOrderArray(OrderArray):
+    """
+    Resting limit orders matched against five levels of tick depth.
+
+    Order crossing the opposite side takes liquidity level by level,
+    and is partly filled if depth within its price is not enough. The
+    rest of it, and any order not crossing, waits in queue at its price.
+
+    Queue ahead of each order is estimated from depth at its price when
+    it is first visible in the book. It is then reduced by volume traded
+    at its price and capped by depth left at its price. Order is filled
+    when traded volume is larger than queue ahead, or filled up to traded
+    volume when market trades through its price. Last price of tick
+    without any traded volume fills nothing.
+
+    Remaining volume of each order is kept in volumes array.
+    """
+
+    array_names = OrderArray.array_names + ["queues"]
+
+    def __init__(self, capacity: int = 64):
+        """"""
+        super(DepthOrderArray, self).__init__(capacity)
+
+        self.queues = np.zeros(capacity)
+        self.total_volume = None    # cumulative volume of last tick
+
+    def add(self, key: str, direction: Direction, price: float, volume: float):
+        """"""
+        super(DepthOrderArray, self).add(key, direction, price, volume)
+
+        # Queue is unknown until the price is visible in depth.
+        self.queues[self.count - 1] = np.nan
+
+    def clear(self):
+        """"""
+        super(DepthOrderArray, self).clear()
+        self.total_volume = None
+
+    def match_tick(self, tick):
+        """
+        Match resting orders with depth of a new tick.
+
+        Return list of fills (key, price, volume) in submit order. Filled
+        volume is deducted from remaining volume, but orders are not
+        removed.
+        """
+        # Volume traded since last tick.
+        if self.total_volume is None or tick.volume < self.total_volume:
+            traded_volume = 0
+        else:
+            traded_volume = tick.volume - self.total_volume
+        self.total_volume = tick.volume
+
+        if not self.count:
+            return []
+
+        depth = np.array(get_depth(tick), dtype=float)
+        depth = depth.reshape(4, DEPTH_LEVELS)
+
+        count = self.count
+        prices = self.prices[:count]
+        volumes = self.volumes[:count]
+        is_long = self.directions[:count] == 1
+
+        # Orders crossing the opposite side take liquidity.
+        best_bid = depth[BID_PRICE, 0]
+        best_ask = depth[ASK_PRICE, 0]
+
+        crossed = np.zeros(count, dtype=bool)
+        if best_ask > 0:
+            crossed |= is_long & (prices >= best_ask - PRICE_EPSILON)
+        if best_bid > 0:
+            crossed |= ~is_long & (prices <= best_bid + PRICE_EPSILON)
+
+        fills = []
+        if crossed.any():
+            fills.extend(self._take_depth(np.flatnonzero(crossed), depth))
+
+        # Orders resting in queue on their own side.
+        waiting = ~crossed & (volumes > 0)
+        if waiting.any():
+            fills.extend(self._match_queue(
+                np.flatnonzero(waiting),
+                depth,
+                tick.last_price,
+                traded_volume
+            ))
+
+        if len(fills) > 1:
+            fills.sort(key=lambda fill: self.seqs[self.positions[fill[0]]])
+
+        return fills
+
+    def _take_depth(self, ixs: np.ndarray, depth: np.ndarray):
+        """
+        Fill crossing orders level by level. Depth taken by an order is
+        not available for orders submitted after it.
+        """
+        fills = []
+        level_volumes = {
+            BID_PRICE: depth[BID_VOLUME].tolist(),
+            ASK_PRICE: depth[ASK_VOLUME].tolist(),
+        }
+
+        ixs = ixs[np.argsort(self.seqs[ixs])]
+        for ix in ixs:
+            key = self.keys[ix]
+            price = self.prices[ix]
+            remaining = self.volumes[ix]
+
+            if self.directions[ix] == 1:
+                row = ASK_PRICE
+                sign = 1
+            else:
+                row = BID_PRICE
+                sign = -1
+
+            prices = depth[row].tolist()
+            volumes = level_volumes[row]
+
+            for level in range(DEPTH_LEVELS):
+                level_price = prices[level]
+                if not level_price or sign * (level_price - price) > PRICE_EPSILON:
+                    break
+
+                volume = min(remaining, volumes[level])
+                if volume <= 0:
+                    continue
+
+                volumes[level] -= volume
+                remaining -= volume
+                fills.append((key, level_price, float(volume)))
+
+                if remaining <= 0:
+                    break
+
+            self.volumes[ix] = remaining
+
+            # The rest of order becomes the best price on its side.
+            self.queues[ix] = 0
+
+        return fills
+
+    def _match_queue(
+            self,
+            ixs: np.ndarray,
+            depth: np.ndarray,
+            last_price: float,
+            traded_volume: float,
+    ):
+        """
+        Update queue ahead of waiting orders and fill them by volume
+        traded at or through their prices.
+        """
+        prices = self.prices[ixs]
+        volumes = self.volumes[ixs]
+        queues = self.queues[ixs]
+        is_long = self.directions[ixs] == 1
+
+        # Depth of own side of each order, shape (orders, levels).
+        rows = np.where(is_long, BID_PRICE, ASK_PRICE)
+        side_prices = depth[rows]
+        side_volumes = depth[rows + 1]
+
+        at_level = np.abs(side_prices - prices[:, None]) < PRICE_EPSILON
+        level_volumes = (side_volumes * at_level).sum(axis=1)
+
+        # Price is visible if it is not worse than the last level.
+        bid_prices = depth[BID_PRICE]
+        ask_prices = depth[ASK_PRICE]
+        worst_bid = bid_prices[bid_prices > 0].min(initial=np.inf)
+        worst_ask = ask_prices[ask_prices > 0].max(initial=0)
+
+        signs = np.where(is_long, 1, -1)
+        worst_prices = np.where(is_long, worst_bid, worst_ask)
+        visible = (prices - worst_prices) * signs > -PRICE_EPSILON
+
+        # Fill by trades at or through order price.
+        known = ~np.isnan(queues)
+        filled = np.zeros(len(ixs))
+
+        if last_price > 0 and traded_volume > 0:
+            diffs = (prices - last_price) * signs
+            through = diffs > PRICE_EPSILON
+            filled[through] = np.minimum(volumes[through], traded_volume)
+
+            at_price = known & (np.abs(diffs) < PRICE_EPSILON)
+            if at_price.any():
+                filled[at_price] = np.minimum(
+                    volumes[at_price],
+                    np.maximum(traded_volume - queues[at_price], 0)
+                )
+                queues[at_price] = np.maximum(
+                    queues[at_price] - traded_volume, 0
+                )
+
+        # Queue is capped by depth left at order price. Unknown queue
+        # (NaN) of order first visible is initialized by fmin.
+        queues[visible] = np.fmin(queues[visible], level_volumes[visible])
+
+        self.queues[ixs] = queues
+        self.volumes[ixs] = volumes - filled
+
+        fills = []
+        for i in np.flatnonzero(filled > 0):
+            ix = ixs[i]
+            fills.append(
+                (self.keys[ix], float(self.prices[ix]), float(filled[i]))
+            )
+
+        return fills
+
+
+class StopOrderIndex:
+    """
+    Live stop orders of one symbol in two heaps sorted by trigger price,
+    so that checking a tick only touches stop orders triggered.
+
+    Long stops trigger when price rises to stop price (min-heap), and
+    short stops trigger when price falls to stop price (max-heap by
+    negative price). Cancelled orders are deleted lazily: they are only
+    removed from active set, and skipped when popped. Heaps are rebuilt
+    when most of their entries are stale.
+    """
+
+    def __init__(self):
+        """"""
+        self.long_heap = []     # (price, seq, stop_orderid)
+        self.short_heap = []    # (-price, seq, stop_orderid)
+        self.active = set()     # stop_orderid
+        self.seq = 0
+
+    def __len__(self):
+        """"""
+        return len(self.active)
+
+    def add(self, stop_order):
+        """
+        Add a new stop order.
+        """
+        self.seq += 1
+        stop_orderid = stop_order.stop_orderid
+
+        if stop_order.direction == Direction.LONG:
+            entry = (stop_order.price, self.seq, stop_orderid)
+            heapq.heappush(self.long_heap, entry)
+        else:
+            entry = (-stop_order.price, self.seq, stop_orderid)
+            heapq.heappush(self.short_heap, entry)
+
+        self.active.add(stop_orderid)
+
+    def remove(self, stop_orderid: str):
+        """
+        Remove a stop order, its heap entry is deleted lazily.
+        """
+        self.active.discard(stop_orderid)
+
+        entry_count = len(self.long_heap) + len(self.short_heap)
+        if entry_count > len(self.active) * 2 + 64:
+            self._compact()
+
+    def pop_triggered(self, last_price: float):
+        """
+        Remove and return ids of stop orders triggered by last price,
+        in submit order.
+        """
+        triggered = []
+
+        heap = self.long_heap
+        while heap and heap[0][0] <= last_price:
+            price, seq, stop_orderid = heapq.heappop(heap)
+            if stop_orderid in self.active:
+                triggered.append((seq, stop_orderid))
+
+        heap = self.short_heap
+        while heap and -heap[0][0] >= last_price:
+            price, seq, stop_orderid = heapq.heappop(heap)
+            if stop_orderid in self.active:
+                triggered.append((seq, stop_orderid))
+
+        if not triggered:
+            return []
+
+        triggered.sort()
+
+        stop_orderids = []
+        for seq, stop_orderid in triggered:
+            self.active.remove(stop_orderid)
+            stop_orderids.append(stop_orderid)
+
+        return stop_orderids
+
+    def _compact(self):
+        """
+        Rebuild heaps with active entries only.
+        """
+        for heap in [self.long_heap, self.short_heap]:
+            heap[:] = [entry for entry in heap if entry[2] in self.active]
+            heapq.heapify(heap)
@@ -0,0 +1,283 @@
+"""
+Portfolio backtesting of multiple CTA strategies on multiple symbols.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from vnpy.trader.constant import Interval
+
+from .backtesting import (
+    BacktestingEngine,
+    BacktestingMode,
+    calculate_statistics,
+    output_statistics,
+)
+from .template import CtaTemplate
+
+# Columns of daily result which can be summed over strategies.
+PNL_COLUMNS = [
+    "trade_count",
+    "turnover",
+    "commission",
+    "slippage",
+    "trading_pnl",
+    "holding_pnl",
+    "total_pnl",
+    "net_pnl",
+]
+
+
+class PortfolioBacktestingEngine:
+    """
+    Backtesting engine running many strategies on many symbols together.
+
+    Each strategy runs in its own BacktestingEngine (sub engine) with
+    contract parameters of its symbol, so that order matching and daily
+    pnl are the same as backtesting it alone. History data of each
+    symbol is loaded once and shared by all strategies trading it.
+
+    Feeds of all symbols are merged into one time-ordered replay by a
+    stable argsort of all datetimes, and every bar/tick is only routed
+    to strategies of its own symbol.
+    """
+
+    def __init__(self):
+        """"""
+        self.interval = None
+        self.start = None
+        self.end = None
+        self.capital = 1_000_000
+        self.mode = BacktestingMode.BAR
+
+        self.contracts = {}         # vt_symbol: contract parameters
+        self.engines = {}           # strategy_name: sub engine
+        self.symbol_engines = {}    # vt_symbol: list of sub engines
+
+        self.history_data = {}      # vt_symbol: list of bar/tick
+        self.init_day_counts = {}   # strategy_name: days initialized
+
+        self.daily_df = None
+        self.strategy_dfs = {}      # strategy_name: daily result df
+
+    def set_parameters(
+            self,
+            interval: Interval,
+            start: datetime,
+            end: datetime,
+            capital: int = 0,
+            mode: BacktestingMode = BacktestingMode.BAR,
+    ):
+        """"""
+        self.interval = interval
+        self.start = start
+        self.end = end
+        self.mode = mode
+
+        if capital:
+            self.capital = capital
+
+    def add_contract(
+            self,
+            vt_symbol: str,
+            size: float,
+            rate: float,
+            slippage: float,
+            pricetick: float,
+    ):
+        """
+        Add contract parameters of a symbol.
+        """
+        self.contracts[vt_symbol] = {
+            "size": size,
+            "rate": rate,
+            "slippage": slippage,
+            "pricetick": pricetick,
+        }
+
+    def add_strategy(
+            self,
+            strategy_class: type,
+            strategy_name: str,
+            vt_symbol: str,
+            setting: dict,
+    ):
+        """
+        Add a strategy running on a symbol, whose contract parameters
+        should be added before.
+        """
+        if strategy_name in self.engines:
+            self.output(f"创建策略失败，存在重名{strategy_name}")
+            return
+
+        contract = self.contracts.get(vt_symbol, None)
+        if not contract:
+            self.output(f"创建策略失败，找不到合约参数{vt_symbol}")
+            return
+
+        engine = BacktestingEngine()
+        engine.output = self.output
+        engine.set_parameters(
+            vt_symbol=vt_symbol,
+            interval=self.interval,
+            start=self.start,
+            capital=self.capital,
+            end=self.end,
+            mode=self.mode,
+            **contract
+        )
+        engine.add_strategy(strategy_class, setting, strategy_name)
+
+        self.engines[strategy_name] = engine
+        self.symbol_engines.setdefault(vt_symbol, []).append(engine)
+
+    def load_data(self):
+        """
+        Load history data of every symbol once.
+        """
+        self.history_data.clear()
+
+        for vt_symbol, engines in self.symbol_engines.items():
+            self.output(f"{vt_symbol}：")
+
+            engine = engines[0]
+            engine.load_data()
+
+            self.history_data[vt_symbol] = engine.history_data
+            engine.history_data = []
+
+    def merge_history_data(self):
+        """
+        Merge history data of all symbols into time order.
+
+        Return list of (vt_symbol, data index) of all data. Data with
+        the same datetime are kept in the order of symbols added.
+        """
+        vt_symbols = list(self.history_data.keys())
+
+        datetime_arrays = []
+        symbol_arrays = []
+        index_arrays = []
+
+        for symbol_ix, vt_symbol in enumerate(vt_symbols):
+            data_list = self.history_data[vt_symbol]
+            count = len(data_list)
+
+            datetime_arrays.append(np.array(
+                [data.datetime for data in data_list],
+                dtype="datetime64[us]"
+            ))
+            symbol_arrays.append(np.full(count, symbol_ix, dtype=np.int64))
+            index_arrays.append(np.arange(count, dtype=np.int64))
+
+        if not datetime_arrays:
+            return []
+
+        order = np.argsort(np.concatenate(datetime_arrays), kind="stable")
+        symbol_ixs = np.concatenate(symbol_arrays)[order].tolist()
+        data_ixs = np.concatenate(index_arrays)[order].tolist()
+
+        return [(vt_symbols[i], j) for i, j in zip(symbol_ixs, data_ixs)]
+
+    def run_backtesting(self):
+        """"""
+        self.init_day_counts.clear()
+
+        for engine in self.engines.values():
+            engine.strategy.on_init()
+
+        sequence = self.merge_history_data()
+        self.output(f"开始回放历史数据，数据量：{len(sequence)}")
+
+        for vt_symbol, ix in sequence:
+            data = self.history_data[vt_symbol][ix]
+
+            for engine in self.symbol_engines[vt_symbol]:
+                self.new_data(engine, data)
+
+        self.output("历史数据回放结束")
+
+    def new_data(self, engine: BacktestingEngine, data):
+        """
+        Push data into sub engine.
+
+        The first [days] of data of each strategy are used for
+        initializing it, the same as BacktestingEngine.run_backtesting.
+        """
+        strategy = engine.strategy
+
+        if not strategy.inited:
+            if engine.datetime and data.datetime.day != engine.datetime.day:
+                name = strategy.strategy_name
+                day_count = self.init_day_counts.get(name, 0) + 1
+                self.init_day_counts[name] = day_count
+
+                if day_count >= engine.days:
+                    strategy.inited = True
+                    strategy.on_start()
+                    strategy.trading = True
+
+            if not strategy.inited:
+                engine.datetime = data.datetime
+                engine.callback(data)
+                return
+
+        if self.mode == BacktestingMode.BAR:
+            engine.new_bar(data)
+        else:
+            engine.new_tick(data)
+
+    def calculate_result(self):
+        """
+        Calculate daily result of every strategy, and sum them up into
+        daily result of portfolio.
+        """
+        self.output("开始计算组合逐日盯市盈亏")
+
+        self.strategy_dfs.clear()
+        for strategy_name, engine in self.engines.items():
+            df = engine.calculate_result()
+            if df is not None:
+                self.strategy_dfs[strategy_name] = df
+
+        if not self.strategy_dfs:
+            self.output("成交记录为空，无法计算")
+            return
+
+        df = pd.concat(
+            [df[PNL_COLUMNS] for df in self.strategy_dfs.values()]
+        )
+        self.daily_df = df.groupby(level=0).sum().sort_index()
+
+        self.output("组合逐日盯市盈亏计算完成")
+        return self.daily_df
+
+    def calculate_statistics(self, df: DataFrame = None):
+        """
+        Calculate statistics of portfolio daily result.
+        """
+        self.output("开始计算组合统计指标")
+
+        if df is None:
+            df = self.daily_df
+
+        statistics = calculate_statistics(df, self.capital)
+        output_statistics(statistics, self.capital, self.output)
+
+        return statistics
+
+    def get_strategy(self, strategy_name: str) -> CtaTemplate:
+        """"""
+        engine = self.engines.get(strategy_name, None)
+        if engine:
+            return engine.strategy
+        return None
+
+    def output(self, msg):
+        """
+        Output message of backtesting engine.
+        """
+        print(f"{datetime.now()}\t{msg}")
@@ -0,0 +1,203 @@
+"""
+Persistent cache of backtesting results.
+
+Results are saved as pickle files under .vntrader folder, named by
+hash of everything which decides the result: source code of strategy
+and backtesting engine, history data, engine parameters and strategy
+setting. A changed input gives a new key, so cached results never need
+to be invalidated, only evicted by age and total size.
+
+Bump CACHE_VERSION when results saved before are known to be wrong, for
+example after fixing a bug not covered by the source hash.
+"""
+
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from vnpy.trader.utility import get_folder_path
+
+CACHE_FOLDER = "backtesting_cache"
+
+# Version of cached results, included in every key.
+CACHE_VERSION = 2
+
+# Modules whose source code decides backtesting results.
+ENGINE_MODULES = [
+    "vnpy.app.cta_strategy.backtesting",
+    "vnpy.app.cta_strategy.matching",
+    "vnpy.app.cta_strategy.template",
+    "vnpy.trader.utility",
+]
+
+
+def generate_key(*parts):
+    """
+    Generate hex digest key from parts, which should have stable repr.
+    """
+    return hashlib.sha256(
+        repr((CACHE_VERSION,) + parts).encode("utf-8")
+    ).hexdigest()
+
+
+def get_source_hash(strategy_class: type):
+    """
+    Get hash of source code of modules of strategy class and all its base
+    classes, and backtesting engine.
+
+    Return empty string if source code cannot be found, for example
+    strategy defined in interactive shell.
+    """
+    hasher = hashlib.sha256()
+
+    module_names = []
+    for cls in strategy_class.__mro__:
+        if cls.__module__ != "builtins":
+            module_names.append(cls.__module__)
+    module_names.extend(ENGINE_MODULES)
+
+    for module_name in dict.fromkeys(module_names):
+        module = sys.modules.get(module_name, None)
+        if not module:
+            return ""
+
+        try:
+            source = inspect.getsource(module)
+        except (OSError, TypeError):
+            return ""
+
+        hasher.update(source.encode("utf-8"))
+
+    return hasher.hexdigest()
+
+
+def get_files_hash(path: Path):
+    """
+    Get hash of content of all files in folder, used as fingerprint of
+    history data saved in it.
+    """
+    hasher = hashlib.sha256()
+
+    for file_path in sorted(Path(path).iterdir()):
+        hasher.update(file_path.name.encode("utf-8"))
+
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(block)
+
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed disk cache of backtesting results.
+
+    Each result is saved in one file written atomically (temp file and
+    then rename), so the cache can be read and written by many worker
+    processes at the same time.
+
+    Modify time of a file is updated whenever it is read, so eviction is
+    least recently used: max_age is counted from last access rather than
+    creation, and results not used for max_age are removed.
+    """
+
+    def __init__(
+        self,
+        folder: Path = None,
+        max_age: timedelta = timedelta(days=30),
+        max_size: int = 1024 * 1024 * 1024,
+    ):
+        """"""
+        if folder:
+            self.folder = Path(folder)
+        else:
+            self.folder = get_folder_path(CACHE_FOLDER)
+
+        self.max_age = max_age
+        self.max_size = max_size
+
+    def get_path(self, key: str):
+        """"""
+        return self.folder.joinpath(key[:2], f"{key}.pkl")
+
+    def get(self, key: str):
+        """
+        Get cached result of key, return None if not found.
+        """
+        path = self.get_path(key)
+
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        # Update modify time, so that results used recently are evicted
+        # later.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return result
+
+    def put(self, key: str, result):
+        """
+        Save result of key into cache.
+        """
+        path = self.get_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        temp_path = path.with_name(f"{key}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            pickle.dump(result, f)
+        os.replace(temp_path, path)
+
+    def evict(self):
+        """
+        Remove results older than max age, and then remove least
+        recently used results until total size is within max size.
+
+        Return number of results removed.
+        """
+        expire_time = (datetime.now() - self.max_age).timestamp()
+
+        files = []
+        for path in self.folder.glob("*/*.pkl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        files.sort()
+        total_size = sum(size for mtime, size, path in files)
+
+        count = 0
+        for mtime, size, path in files:
+            if mtime >= expire_time and total_size <= self.max_size:
+                break
+
+            try:
+                path.unlink()
+            except OSError:
+                continue
+
+            total_size -= size
+            count += 1
+
+        return count
+
+    def clear(self):
+        """
+        Remove all cached results.
+        """
+        count = 0
+        for path in self.folder.glob("*/*.pkl"):
+            path.unlink()
+            count += 1
+        return count
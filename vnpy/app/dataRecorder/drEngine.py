@@ -12,6 +12,7 @@ import os
 import copy
 import traceback
 from collections import OrderedDict
+from dataclasses import fields, is_dataclass
 from datetime import datetime, timedelta, time
 from queue import Queue, Empty
 from threading import Thread
@@ -22,12 +23,29 @@ from vnpy.trader.event import *
 from vnpy.trader.utility import *
 from vnpy.trader.object import SubscribeRequest, LogData, BarData, TickData
 from vnpy.trader.utility import BarGenerator
+from vnpy.trader.timestamp import parse_timestamp
 
 from .drBase import *
 
 
 # from .language import text
 
+
+# ----------------------------------------------------------------------
+def getDataDict(data):
+    """获取数据对象的字段字典（TickData使用__slots__，没有__dict__）"""
+    if not is_dataclass(data):
+        return dict(data.__dict__)
+
+    d = {field.name: getattr(data, field.name) for field in fields(data)}
+
+    vtSymbol = getattr(data, 'vt_symbol', None)
+    if vtSymbol:
+        d['vt_symbol'] = vtSymbol
+
+    return d
+
+
 ########################################################################
 
 class DrEngine(object):
@@ -177,10 +195,7 @@ def loadSetting(self):
 
         # 生成datetime对象
         if not tick.datetime:
-            if '.' in tick.time:
-                tick.datetime = datetime.strptime(' '.join([tick.date, tick.time]), '%Y%m%d %H:%M:%S.%f')
-            else:
-                tick.datetime = datetime.strptime(' '.join([tick.date, tick.time]), '%Y%m%d %H:%M:%S')
+            tick.datetime = parse_timestamp(tick.date, tick.time)
 
         self.onTick(tick)
 
@@ -264,7 +279,7 @@ def loadSetting(self):
     # ----------------------------------------------------------------------
     def insertData(self, dbName, collectionName, data):
         """插入数据到数据库（这里的data可以是VtTickData或者VtBarData）"""
-        self.queue.put((dbName, collectionName, data.__dict__))
+        self.queue.put((dbName, collectionName, getDataDict(data)))
 
     # ----------------------------------------------------------------------
     def run(self):
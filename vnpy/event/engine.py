@@ -4,9 +4,9 @@ Event-driven framework of vn.py framework.
 
 from collections import defaultdict
 from queue import Empty, Queue
-from threading import Thread
-from time import sleep
-from typing import Any, Callable
+from threading import Lock, Thread
+from time import perf_counter, sleep
+from typing import Any, Callable, List
 
 EVENT_TIMER = "eTimer"
 
@@ -27,6 +27,30 @@ class Event:
 # Defines handler function to be used in event engine.
 HandlerType = Callable[[Event], None]
 
+# Defines batch handler function which receives a list of events.
+BatchHandlerType = Callable[[List[Event]], None]
+
+
+def get_shard_key(event: Event):
+    """
+    Get key for distributing event to worker lanes.
+
+    Events of the same vt_symbol (or vt_orderid if data has no
+    vt_symbol) are always processed by the same lane.
+    """
+    data = event.data
+    key = getattr(data, "vt_symbol", None)
+    if key is None:
+        key = getattr(data, "vt_orderid", None)
+    return key
+
+
+def get_event_key(event: Event):
+    """
+    Get key for conflating events of the same type.
+    """
+    return getattr(event.data, "vt_symbol", None)
+
 
 class EventEngine:
     """
@@ -37,31 +61,97 @@ class EventEngine:
     which can be used for timing purpose.
     """
 
-    def __init__(self, interval: int = 1):
+    def __init__(self, interval: int = 1, batch: bool = False):
         """
         Timer event is generated every 1 second by default, if
         interval not specified.
+
+        If batch is True, all events waiting in queue are taken out
+        at once and dispatched as a batch.
         """
         self._interval = interval
+        self._batch = batch
         self._queue = Queue()
         self._active = False
         self._thread = Thread(target=self._run)
         self._timer = Thread(target=self._run_timer)
         self._handlers = defaultdict(list)
         self._general_handlers = []
+        self._batch_handlers = defaultdict(list)
+        self._latest_handlers = defaultdict(list)
+        self._latest_events = {}
+
+        # Counters for monitoring event processing.
+        self._event_count = 0
+        self._batch_count = 0
+        self._max_batch_size = 0
+        self._latency = 0
+        self._max_latency = 0
 
     def _run(self):
         """
         Get event from queue and then process it.
         """
+        self._run_queue(self._queue, self._process)
+
+    def _run_queue(self, queue: Queue, process: Callable, count: Callable = len):
+        """
+        Keep getting events from queue and process them with process
+        function till engine is stopped. Number of events counted in
+        each batch is given by count function.
+        """
         while self._active:
             try:
-                event = self._queue.get(block=True, timeout=1)
-                self._process(event)
+                item = queue.get(block=True, timeout=1)
             except Empty:
-                pass
+                continue
+
+            items = [item]
+            if self._batch:
+                self._drain(queue, items)
 
-    def _process(self, event: Event):
+            self._process_batch(items, process, count)
+
+    def _drain(self, queue: Queue, items: list):
+        """
+        Take all events left in queue within one lock acquisition.
+        """
+        with queue.mutex:
+            items.extend(queue.queue)
+            queue.queue.clear()
+
+    def _process_batch(self, items: list, process: Callable, count: Callable = len):
+        """
+        Process a batch of (event, put time) items taken from queue.
+
+        Handlers registered for single event are called in event order,
+        then batch handlers are called once per event type with the
+        list of events of that type.
+        """
+        start = perf_counter()
+
+        batch_events = {}
+        for event, put_time in items:
+            process(event, batch_events)
+
+        for type, events in batch_events.items():
+            for handler in self._batch_handlers[type]:
+                handler(events)
+
+        # Latency is measured from putting the oldest event of batch.
+        size = count(items)
+        if size:
+            self._update_counters(size, start - items[0][1])
+
+    def _update_counters(self, size: int, latency: float):
+        """"""
+        self._event_count += size
+        self._batch_count += 1
+        self._latency = latency
+        self._max_latency = max(self._max_latency, latency)
+        self._max_batch_size = max(self._max_batch_size, size)
+
+    def _process(self, event: Event, batch_events: dict):
         """
         First ditribute event to those handlers registered listening
         to this type. 
@@ -69,11 +159,38 @@ class EventEngine:
         Then distrubute event to those general handlers which listens
         to all types.
         """
+        self._process_type(event, batch_events)
+        self._process_general(event)
+
+    def _process_type(self, event: Event, batch_events: dict):
+        """
+        Distribute event to handlers of its type, and collect it for
+        batch handlers.
+        """
         if event.type in self._handlers:
-            [handler(event) for handler in self._handlers[event.type]]
+            for handler in self._handlers[event.type]:
+                handler(event)
+
+        # Skip event for latest handlers if a newer one of the same
+        # key is waiting in queue.
+        if event.type in self._latest_handlers:
+            key = (event.type, get_event_key(event))
+            latest = self._latest_events.get(key, None)
+
+            if latest is None or latest is event:
+                for handler in self._latest_handlers[event.type]:
+                    handler(event)
+
+        if event.type in self._batch_handlers:
+            batch_events.setdefault(event.type, []).append(event)
 
+    def _process_general(self, event: Event):
+        """
+        Distribute event to general handlers.
+        """
         if self._general_handlers:
-            [handler(event) for handler in self._general_handlers]
+            for handler in self._general_handlers:
+                handler(event)
 
     def _run_timer(self):
         """
@@ -104,7 +221,16 @@ class EventEngine:
         """
         Put an event object into event queue.
         """
-        self._queue.put(event)
+        self._update_latest(event)
+        self._queue.put((event, perf_counter()))
+
+    def _update_latest(self, event: Event):
+        """
+        Record event as the latest of its key for latest handlers.
+        """
+        if event.type in self._latest_handlers:
+            key = (event.type, get_event_key(event))
+            self._latest_events[key] = event
 
     def register(self, type: str, handler: HandlerType):
         """
@@ -141,3 +267,190 @@ class EventEngine:
         """
         if handler in self._general_handlers:
             self._general_handlers.remove(handler)
+
+    def register_latest(self, type: str, handler: HandlerType):
+        """
+        Register a handler function which only needs the latest event.
+
+        Events of the type are conflated by key (vt_symbol of event
+        data): when a newer event of the same key is put before an older
+        one is processed, the older one is skipped for this handler.
+        Handlers registered with register still get every event.
+        """
+        handler_list = self._latest_handlers[type]
+        if handler not in handler_list:
+            handler_list.append(handler)
+
+    def unregister_latest(self, type: str, handler: HandlerType):
+        """
+        Unregister an existing latest handler function.
+        """
+        handler_list = self._latest_handlers[type]
+
+        if handler in handler_list:
+            handler_list.remove(handler)
+
+        if not handler_list:
+            self._latest_handlers.pop(type)
+
+    def register_batch(self, type: str, handler: BatchHandlerType):
+        """
+        Register a batch handler function for a specific event type.
+
+        Batch handler receives a list of events of its type each time.
+        In batch mode, the list contains all events of the type taken
+        out of queue together. Otherwise one event is in the list.
+        """
+        handler_list = self._batch_handlers[type]
+        if handler not in handler_list:
+            handler_list.append(handler)
+
+    def unregister_batch(self, type: str, handler: BatchHandlerType):
+        """
+        Unregister an existing batch handler function.
+        """
+        handler_list = self._batch_handlers[type]
+
+        if handler in handler_list:
+            handler_list.remove(handler)
+
+        if not handler_list:
+            self._batch_handlers.pop(type)
+
+    def get_counters(self):
+        """
+        Get counters of event processing.
+
+        * queue_size: number of events waiting in queue now
+        * max_batch_size: max number of events taken out in one batch
+        * event_count: total number of events processed
+        * batch_count: total number of batches processed
+        * latency: seconds from put to dispatch of last batch
+        * max_latency: max seconds from put to dispatch
+        """
+        counters = {
+            "queue_size": self._queue.qsize(),
+            "max_batch_size": self._max_batch_size,
+            "event_count": self._event_count,
+            "batch_count": self._batch_count,
+            "latency": self._latency,
+            "max_latency": self._max_latency,
+        }
+        return counters
+
+    def reset_counters(self):
+        """
+        Reset max values and totals of counters.
+        """
+        self._event_count = 0
+        self._batch_count = 0
+        self._max_batch_size = 0
+        self._latency = 0
+        self._max_latency = 0
+
+
+class ShardedEventEngine(EventEngine):
+    """
+    Event engine which runs handlers in several worker threads.
+
+    Events are hashed to worker lanes by key (see get_shard_key), so
+    events of the same vt_symbol are still processed in the order they
+    are put, while one slow handler only stalls its own lane.
+
+    Events without key, as well as all general handlers, are processed
+    on a dedicated global lane.
+
+    Handlers of the same event type may run concurrently in different
+    lanes, so they must be safe to call from several threads.
+    """
+
+    def __init__(
+        self, interval: int = 1, batch: bool = False, worker_count: int = 4
+    ):
+        """"""
+        super(ShardedEventEngine, self).__init__(interval, batch)
+
+        self._lanes = [Queue() for i in range(worker_count)]
+        self._workers = [
+            Thread(target=self._run_queue, args=(lane, self._process_type))
+            for lane in self._lanes
+        ]
+
+        self._counter_lock = Lock()
+
+    def _run(self):
+        """
+        Process events on global lane.
+        """
+        self._run_queue(self._queue, self._process_global, self._count_global)
+
+    def _process_global(self, event: Event, batch_events: dict):
+        """
+        Events with key only run general handlers on global lane, since
+        their type handlers run on worker lanes.
+        """
+        if get_shard_key(event) is None:
+            self._process(event, batch_events)
+        else:
+            self._process_general(event)
+
+    def _count_global(self, items: list):
+        """
+        Events with key are counted on their worker lanes, so only events
+        without key are counted on global lane.
+        """
+        return sum(1 for event, put_time in items if get_shard_key(event) is None)
+
+    def _update_counters(self, size: int, latency: float):
+        """"""
+        with self._counter_lock:
+            super(ShardedEventEngine, self)._update_counters(size, latency)
+
+    def start(self):
+        """
+        Start worker lanes, global lane and timer.
+        """
+        self._active = True
+
+        for worker in self._workers:
+            worker.start()
+
+        self._thread.start()
+        self._timer.start()
+
+    def stop(self):
+        """
+        Stop event engine.
+        """
+        super(ShardedEventEngine, self).stop()
+
+        for worker in self._workers:
+            worker.join()
+
+    def put(self, event: Event):
+        """
+        Put event into worker lane of its key, and also into global
+        lane if there is any general handler.
+        """
+        self._update_latest(event)
+
+        item = (event, perf_counter())
+        key = get_shard_key(event)
+
+        if key is None:
+            self._queue.put(item)
+        else:
+            lane = self._lanes[hash(key) % len(self._lanes)]
+            lane.put(item)
+
+            if self._general_handlers:
+                self._queue.put(item)
+
+    def get_counters(self):
+        """
+        Get counters of event processing, with queue size summed over
+        all lanes.
+        """
+        counters = super(ShardedEventEngine, self).get_counters()
+        counters["queue_size"] += sum(lane.qsize() for lane in self._lanes)
+        return counters
@@ -6,13 +6,14 @@ import hashlib
 import hmac
 import sys
 import time
+from bisect import bisect_left, insort
 from copy import copy
 from datetime import datetime
 from urllib.parse import urlencode
 
 from requests import ConnectionError
 
-from vnpy.api.rest import Request, RestClient
+from vnpy.api.rest import AsyncRestClient, Request, RequestPriority, RestClient
 from vnpy.api.websocket import WebsocketClient
 from vnpy.trader.constant import (
     Direction,
@@ -33,6 +34,7 @@ from vnpy.trader.object import (
     CancelRequest,
     SubscribeRequest,
 )
+from vnpy.trader.timestamp import get_epoch_ns, parse_iso_timestamp
 
 REST_HOST = "https://www.bitmex.com/api/v1"
 WEBSOCKET_HOST = "wss://www.bitmex.com/realtime"
@@ -53,6 +55,17 @@ DIRECTION_BITMEX2VT = {v: k for k, v in DIRECTION_VT2BITMEX.items()}
 
 PRICETYPE_VT2BITMEX = {PriceType.LIMIT: "Limit", PriceType.MARKET: "Market"}
 
+# Topics of market depth. orderBook10 pushes snapshot of 10 levels, and
+# orderBookL2 (or orderBookL2_25 of 25 levels) pushes incremental updates
+# maintained in local order book.
+DEPTH_TOPICS = ["orderBook10", "orderBookL2_25", "orderBookL2"]
+DEPTH_LEVELS = 5
+
+BID_PRICE_NAMES = [f"bid_price_{n}" for n in range(1, DEPTH_LEVELS + 1)]
+BID_VOLUME_NAMES = [f"bid_volume_{n}" for n in range(1, DEPTH_LEVELS + 1)]
+ASK_PRICE_NAMES = [f"ask_price_{n}" for n in range(1, DEPTH_LEVELS + 1)]
+ASK_VOLUME_NAMES = [f"ask_volume_{n}" for n in range(1, DEPTH_LEVELS + 1)]
+
 
 class BitmexGateway(BaseGateway):
     """
@@ -66,6 +79,8 @@ class BitmexGateway(BaseGateway):
         "server": ["REAL", "TESTNET"],
         "proxy_host": "127.0.0.1",
         "proxy_port": 1080,
+        "depth": DEPTH_TOPICS,
+        "rest": ["REQUESTS", "AIOHTTP"],
     }
 
     def __init__(self, event_engine):
@@ -83,11 +98,18 @@ class BitmexGateway(BaseGateway):
         server = setting["server"]
         proxy_host = setting["proxy_host"]
         proxy_port = setting["proxy_port"]
+        depth = setting.get("depth", DEPTH_TOPICS[0])
+        rest = setting.get("rest", "REQUESTS")
+
+        if rest == "AIOHTTP":
+            self.rest_api = BitmexAsyncRestApi(self)
 
         self.rest_api.connect(key, secret, session,
                               server, proxy_host, proxy_port)
 
-        self.ws_api.connect(key, secret, server, proxy_host, proxy_port)
+        self.ws_api.connect(
+            key, secret, server, proxy_host, proxy_port, depth
+        )
 
     def subscribe(self, req: SubscribeRequest):
         """"""
@@ -224,6 +246,7 @@ class BitmexRestApi(RestClient):
             extra=order,
             on_failed=self.on_send_order_failed,
             on_error=self.on_send_order_error,
+            priority=RequestPriority.high,
         )
 
         self.gateway.on_order(order)
@@ -244,6 +267,7 @@ class BitmexRestApi(RestClient):
             callback=self.on_cancel_order,
             params=params,
             on_error=self.on_cancel_order_error,
+            priority=RequestPriority.high,
         )
 
     def on_send_order_failed(self, status_code: str, request: Request):
@@ -310,6 +334,14 @@ class BitmexRestApi(RestClient):
         )
 
 
+class BitmexAsyncRestApi(BitmexRestApi, AsyncRestClient):
+    """
+    BitMEX REST API running on asyncio.
+    """
+
+    pass
+
+
 class BitmexWebsocketApi(WebsocketClient):
     """"""
 
@@ -333,17 +365,35 @@ class BitmexWebsocketApi(WebsocketClient):
             "instrument": self.on_contract,
         }
 
+        # Callbacks of tables receiving whole data list of packet.
+        self.batch_callbacks = {}
+
         self.ticks = {}
         self.accounts = {}
         self.orders = {}
         self.trades = set()
 
+        self.depth_topic = DEPTH_TOPICS[0]
+        self.books = {}             # symbol: BitmexOrderBook
+        self.book_synced = False    # whether partial of books received
+
     def connect(
-        self, key: str, secret: str, server: str, proxy_host: str, proxy_port: int
+        self,
+        key: str,
+        secret: str,
+        server: str,
+        proxy_host: str,
+        proxy_port: int,
+        depth: str = DEPTH_TOPICS[0],
     ):
         """"""
         self.key = key
         self.secret = secret.encode()
+        self.depth_topic = depth
+
+        # Incremental depth updates are applied packet by packet.
+        if depth != "orderBook10":
+            self.batch_callbacks[depth] = self.on_book
 
         if server == "REAL":
             self.init(WEBSOCKET_HOST, proxy_host, proxy_port)
@@ -393,13 +443,20 @@ class BitmexWebsocketApi(WebsocketClient):
 
         elif "table" in packet:
             name = packet["table"]
+            data = packet["data"]
+
+            batch_callback = self.batch_callbacks.get(name, None)
+            if batch_callback:
+                batch_callback(packet["action"], data)
+                return
+
             callback = self.callbacks[name]
 
-            if isinstance(packet["data"], list):
-                for d in packet["data"]:
+            if isinstance(data, list):
+                for d in data:
                     callback(d)
             else:
-                callback(packet["data"])
+                callback(data)
 
     def on_error(self, exception_type: type, exception_value: Exception, tb):
         """"""
@@ -433,7 +490,7 @@ class BitmexWebsocketApi(WebsocketClient):
             "args": [
                 "instrument",
                 "trade",
-                "orderBook10",
+                self.depth_topic,
                 "execution",
                 "order",
                 "position",
@@ -450,9 +507,8 @@ class BitmexWebsocketApi(WebsocketClient):
             return
 
         tick.last_price = d["price"]
-        tick.datetime = datetime.strptime(
-            d["timestamp"], "%Y-%m-%dT%H:%M:%S.%fZ")
-        self.gateway.write_log(tick)
+        tick.datetime = parse_iso_timestamp(d["timestamp"])
+        tick.epoch_ns = get_epoch_ns(tick.datetime)
         self.gateway.on_tick(copy(tick))
 
     def on_depth(self, d):
@@ -472,10 +528,92 @@ class BitmexWebsocketApi(WebsocketClient):
             tick.__setattr__("ask_price_%s" % (n + 1), price)
             tick.__setattr__("ask_volume_%s" % (n + 1), volume)
 
-        tick.datetime = datetime.strptime(
-            d["timestamp"], "%Y-%m-%dT%H:%M:%S.%fZ")
+        tick.datetime = parse_iso_timestamp(d["timestamp"])
+        tick.epoch_ns = get_epoch_ns(tick.datetime)
+        self.gateway.on_tick(copy(tick))
+
+    def on_book(self, action: str, data: list):
+        """
+        Apply orderBookL2 partial/insert/update/delete data to local order
+        books, and push tick of symbols whose top levels changed.
+        """
+        if action == "partial":
+            for symbol in set(d["symbol"] for d in data):
+                self.books[symbol] = BitmexOrderBook()
+            self.book_synced = True
+
+        # Updates before partial cannot be applied.
+        elif not self.book_synced:
+            return
+
+        if not data:
+            return
+        timestamp = data[-1].get("timestamp", "")
+
+        symbols = set()
+        for d in data:
+            symbol = d["symbol"]
+            book = self.books.get(symbol, None)
+
+            if not book or not book.apply(action, d):
+                self.resync_book()
+                return
+
+            symbols.add(symbol)
+
+        for symbol in symbols:
+            book = self.books[symbol]
+
+            if book.is_crossed():
+                self.resync_book()
+                return
+
+            self.update_book_tick(symbol, book, timestamp)
+
+    def update_book_tick(self, symbol: str, book, timestamp: str):
+        """
+        Push tick of order book only if its top levels changed.
+        """
+        tick = self.ticks.get(symbol, None)
+        if not tick:
+            return
+
+        top = book.get_top(DEPTH_LEVELS)
+        if top == book.top:
+            return
+        book.top = top
+
+        bid_prices, bid_volumes, ask_prices, ask_volumes = top
+        for names, values in [
+            (BID_PRICE_NAMES, bid_prices),
+            (BID_VOLUME_NAMES, bid_volumes),
+            (ASK_PRICE_NAMES, ask_prices),
+            (ASK_VOLUME_NAMES, ask_volumes),
+        ]:
+            for name, value in zip(names, values):
+                setattr(tick, name, value)
+
+        if timestamp:
+            tick.datetime = parse_iso_timestamp(timestamp)
+        else:
+            tick.datetime = datetime.utcnow()
+        tick.epoch_ns = get_epoch_ns(tick.datetime)
+
         self.gateway.on_tick(copy(tick))
 
+    def resync_book(self):
+        """
+        Local order books are out of sync with server, subscribe depth
+        topic again to receive a new partial.
+        """
+        self.gateway.write_log("订单簿数据不同步，重新订阅深度行情")
+
+        self.book_synced = False
+        self.books.clear()
+
+        self.send_packet({"op": "unsubscribe", "args": [self.depth_topic]})
+        self.send_packet({"op": "subscribe", "args": [self.depth_topic]})
+
     def on_trade(self, d):
         """"""
         # Filter trade update with no trade volume and side (funding)
@@ -584,3 +722,125 @@ class BitmexWebsocketApi(WebsocketClient):
         )
 
         self.gateway.on_contract(contract)
+
+
+class BitmexOrderBook:
+    """
+    Local order book of one symbol maintained by orderBookL2 data.
+
+    Price levels of each side are kept in a sorted array of prices and a
+    dict of price: size, so top levels are the first items of arrays.
+    Bid prices are saved as negative values to sort from best to worst.
+    Level id is mapped to its price, since update and delete data only
+    carry id.
+    """
+
+    def __init__(self):
+        """"""
+        self.levels = {}            # id: (side, price)
+        self.bid_keys = []          # sorted negative bid prices
+        self.ask_keys = []          # sorted ask prices
+        self.bid_sizes = {}         # price: size
+        self.ask_sizes = {}         # price: size
+
+        self.top = None             # top levels last pushed
+
+    def apply(self, action: str, d: dict):
+        """
+        Apply a partial/insert/update/delete data.
+
+        Return False if data is inconsistent with local book.
+        """
+        if action == "partial" or action == "insert":
+            return self.insert(d)
+        elif action == "update":
+            return self.update(d)
+        elif action == "delete":
+            return self.delete(d)
+        return True
+
+    def insert(self, d: dict):
+        """"""
+        level_id = d["id"]
+        if level_id in self.levels:
+            return False
+
+        side = d["side"]
+        price = d["price"]
+
+        if side == "Buy":
+            if price in self.bid_sizes:
+                return False
+            insort(self.bid_keys, -price)
+            self.bid_sizes[price] = d["size"]
+        else:
+            if price in self.ask_sizes:
+                return False
+            insort(self.ask_keys, price)
+            self.ask_sizes[price] = d["size"]
+
+        self.levels[level_id] = (side, price)
+
+        return True
+
+    def update(self, d: dict):
+        """"""
+        level = self.levels.get(d["id"], None)
+        if not level:
+            return False
+
+        side, price = level
+        if side == "Buy":
+            self.bid_sizes[price] = d["size"]
+        else:
+            self.ask_sizes[price] = d["size"]
+
+        return True
+
+    def delete(self, d: dict):
+        """"""
+        level = self.levels.pop(d["id"], None)
+        if not level:
+            return False
+
+        side, price = level
+        if side == "Buy":
+            keys = self.bid_keys
+            key = -price
+            self.bid_sizes.pop(price)
+        else:
+            keys = self.ask_keys
+            key = price
+            self.ask_sizes.pop(price)
+
+        ix = bisect_left(keys, key)
+        del keys[ix]
+
+        return True
+
+    def is_crossed(self):
+        """
+        Check if best bid price is not lower than best ask price.
+        """
+        if not self.bid_keys or not self.ask_keys:
+            return False
+        return -self.bid_keys[0] >= self.ask_keys[0]
+
+    def get_top(self, n: int):
+        """
+        Get tuple of (bid prices, bid sizes, ask prices, ask sizes) of top
+        n levels, padded with 0 if not enough levels.
+        """
+        bid_prices = [-key for key in self.bid_keys[:n]]
+        ask_prices = self.ask_keys[:n]
+
+        bid_sizes = [self.bid_sizes[price] for price in bid_prices]
+        ask_sizes = [self.ask_sizes[price] for price in ask_prices]
+
+        padding = [0] * n
+        return (
+            tuple((bid_prices + padding)[:n]),
+            tuple((bid_sizes + padding)[:n]),
+            tuple((ask_prices + padding)[:n]),
+            tuple((ask_sizes + padding)[:n]),
+        )
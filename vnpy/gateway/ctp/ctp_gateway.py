@@ -58,6 +58,7 @@ from vnpy.trader.object import (
     CancelRequest,
     SubscribeRequest,
 )
+from vnpy.trader.timestamp import get_epoch_ns, parse_ctp_timestamp
 from vnpy.trader.utility import get_folder_path
 from vnpy.trader.event import EVENT_TIMER
 
@@ -280,12 +281,15 @@ class CtpMdApi(MdApi):
         if not exchange:
             return
         
-        timestamp = f"{data['ActionDay']} {data['UpdateTime']}.{int(data['UpdateMillisec']/100)}"
-        
+        dt = parse_ctp_timestamp(
+            data["ActionDay"], data["UpdateTime"], data["UpdateMillisec"]
+        )
+
         tick = TickData(
             symbol=symbol,
             exchange=exchange,
-            datetime=datetime.strptime(timestamp, "%Y%m%d %H:%M:%S.%f"),
+            datetime=dt,
+            epoch_ns=get_epoch_ns(dt),
             name=symbol_name_map[symbol],
             volume=data["Volume"],
             last_price=data["LastPrice"],
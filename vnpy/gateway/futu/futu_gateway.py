@@ -39,6 +39,7 @@ from vnpy.trader.object import (
     OrderRequest,
     CancelRequest
 )
+from vnpy.trader.timestamp import parse_timestamp
 
 EXCHANGE_VT2FUTU = {
     Exchange.SMART: "US",
@@ -410,10 +411,7 @@ class FutuGateway(BaseGateway):
 
             tick = self.get_tick(symbol)
 
-            date = row["data_date"].replace("-", "")
-            time = row["data_time"]
-            tick.datetime = datetime.strptime(
-                f"{date} {time}", "%Y%m%d %H:%M:%S")
+            tick.datetime = parse_timestamp(row["data_date"], row["data_time"])
             tick.open_price = row["open_price"]
             tick.high_price = row["high_price"]
             tick.low_price = row["low_price"]
@@ -433,16 +431,15 @@ class FutuGateway(BaseGateway):
         symbol = data["code"]
         tick = self.get_tick(symbol)
 
-        d = tick.__dict__
         for i in range(5):
             bid_data = data["Bid"][i]
             ask_data = data["Ask"][i]
             n = i + 1
 
-            d["bid_price_%s" % n] = bid_data[0]
-            d["bid_volume_%s" % n] = bid_data[1]
-            d["ask_price_%s" % n] = ask_data[0]
-            d["ask_volume_%s" % n] = ask_data[1]
+            setattr(tick, "bid_price_%s" % n, bid_data[0])
+            setattr(tick, "bid_volume_%s" % n, bid_data[1])
+            setattr(tick, "ask_price_%s" % n, ask_data[0])
+            setattr(tick, "ask_volume_%s" % n, ask_data[1])
 
         if tick.datetime:
             self.on_tick(copy(tick))
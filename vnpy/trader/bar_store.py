@@ -0,0 +1,431 @@
+"""
+Columnar on-disk store of bar data.
+
+Bars of every vt_symbol/interval are saved as contiguous numpy column
+files together with a day partition index. Loading a date range returns
+slices of read-only memory-mapped arrays, so no data is copied until
+it is actually touched.
+
+Date ranges known to be complete are recorded as coverage. A range not
+covered should be loaded from SQLite database instead, since the store
+is only a copy of bars imported from it.
+"""
+
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from .constant import Exchange, Interval
+from .database import DbBarData
+from .object import BarData
+from .utility import get_folder_path
+
+BAR_STORE_FOLDER = "bar_store"
+DATETIME_DTYPE = "datetime64[ns]"
+DAY_DTYPE = "datetime64[D]"
+
+PRICE_COLUMNS = [
+    "open_price",
+    "high_price",
+    "low_price",
+    "close_price",
+    "volume",
+]
+
+
+def get_interval_value(interval):
+    """
+    Get interval string from Interval or plain string.
+    """
+    if isinstance(interval, Interval):
+        return interval.value
+    return str(interval)
+
+
+@dataclass
+class BarColumns:
+    """
+    Column arrays of bar data of one vt_symbol/interval.
+
+    Arrays returned by BarStore are read-only views into memory-mapped
+    files.
+    """
+
+    symbol: str
+    exchange: Exchange
+    interval: str
+
+    datetime: np.ndarray
+    open_price: np.ndarray
+    high_price: np.ndarray
+    low_price: np.ndarray
+    close_price: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self):
+        """"""
+        return len(self.datetime)
+
+    def to_bars(self, gateway_name: str = "DB"):
+        """
+        Generate list of BarData from column arrays.
+        """
+        try:
+            interval = Interval(self.interval)
+        except ValueError:
+            interval = self.interval
+
+        datetimes = self.datetime.astype("datetime64[us]").tolist()
+
+        bars = []
+        for dt, open_price, high_price, low_price, close_price, volume in zip(
+            datetimes,
+            self.open_price.tolist(),
+            self.high_price.tolist(),
+            self.low_price.tolist(),
+            self.close_price.tolist(),
+            self.volume.tolist(),
+        ):
+            bar = BarData(
+                symbol=self.symbol,
+                exchange=self.exchange,
+                datetime=dt,
+                interval=interval,
+                volume=volume,
+                open_price=open_price,
+                high_price=high_price,
+                low_price=low_price,
+                close_price=close_price,
+                gateway_name=gateway_name,
+            )
+            bars.append(bar)
+
+        return bars
+
+    def iter_bars(self, chunk_size: int, gateway_name: str = "DB"):
+        """
+        Generator of BarData, which are created chunk by chunk from
+        column arrays.
+        """
+        for ix in range(0, len(self), chunk_size):
+            chunk = BarColumns(
+                symbol=self.symbol,
+                exchange=self.exchange,
+                interval=self.interval,
+                datetime=self.datetime[ix:ix + chunk_size],
+                **{
+                    name: getattr(self, name)[ix:ix + chunk_size]
+                    for name in PRICE_COLUMNS
+                },
+            )
+            yield from chunk.to_bars(gateway_name)
+
+
+class BarStore:
+    """
+    Memory-mapped columnar storage of bar data.
+
+    Files of each vt_symbol/interval are saved under:
+        <root>/<vt_symbol>/<interval>/<column>.npy
+
+    Rows are sorted by datetime and unique. The day partition index
+    (day.npy and day_offset.npy) records the first row of every
+    trading day, so that whole days can be located without scanning
+    the datetime column.
+
+    Coverage (coverage.npy) is a sorted array of [start, end] datetime
+    ranges, within which all bars of database have been saved. Bars
+    saved into database after importing are not in store, so import
+    again after updating database.
+    """
+
+    def __init__(self, root: Path = None):
+        """"""
+        if root:
+            self.root = Path(root)
+        else:
+            self.root = get_folder_path(BAR_STORE_FOLDER)
+
+    def get_path(self, vt_symbol: str, interval):
+        """
+        Get folder path of a specific vt_symbol/interval.
+        """
+        return self.root.joinpath(vt_symbol, get_interval_value(interval))
+
+    def has_data(self, vt_symbol: str, interval):
+        """
+        Check if any bar of vt_symbol/interval is saved in store.
+        """
+        path = self.get_path(vt_symbol, interval)
+        return path.joinpath("datetime.npy").exists()
+
+    def covers(
+        self,
+        vt_symbol: str,
+        interval,
+        start: datetime = None,
+        end: datetime = None,
+    ):
+        """
+        Check if all bars within [start, end] are saved in store.
+        """
+        coverage = self.load_coverage(vt_symbol, interval)
+        if not len(coverage):
+            return False
+
+        if start:
+            start = np.datetime64(start, "ns")
+        else:
+            start = coverage[0, 0]
+
+        if end:
+            end = np.datetime64(end, "ns")
+        else:
+            end = coverage[-1, 1]
+
+        return bool(((coverage[:, 0] <= start) & (coverage[:, 1] >= end)).any())
+
+    def load_coverage(self, vt_symbol: str, interval):
+        """
+        Load array of [start, end] ranges covered by store.
+        """
+        path = self.get_path(vt_symbol, interval).joinpath("coverage.npy")
+        if not path.exists():
+            return np.empty((0, 2), dtype=DATETIME_DTYPE)
+        return np.load(path)
+
+    def add_coverage(self, vt_symbol: str, interval, start, end):
+        """
+        Add [start, end] into coverage, merging overlapped ranges.
+        """
+        ranges = self.load_coverage(vt_symbol, interval).tolist()
+        ranges.append([start, end])
+
+        array = np.array(ranges, dtype=DATETIME_DTYPE).reshape(-1, 2)
+        array = array[np.argsort(array[:, 0], kind="stable")]
+
+        merged = []
+        for range_start, range_end in array:
+            if merged and range_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], range_end)
+            else:
+                merged.append([range_start, range_end])
+
+        path = self.get_path(vt_symbol, interval)
+        path.mkdir(parents=True, exist_ok=True)
+        self._save_array(
+            path, "coverage", np.array(merged, dtype=DATETIME_DTYPE)
+        )
+
+    def save_bars(self, bars: Sequence[BarData]):
+        """
+        Save bar data into store.
+
+        All bars should be of the same vt_symbol and interval. Bars with
+        datetime already saved will overwrite existing ones.
+        """
+        if not bars:
+            return 0
+
+        bar = bars[0]
+        columns = {
+            "datetime": np.array(
+                [bar.datetime for bar in bars], dtype=DATETIME_DTYPE
+            )
+        }
+        for name in PRICE_COLUMNS:
+            columns[name] = np.array(
+                [getattr(bar, name) for bar in bars], dtype=float
+            )
+
+        vt_symbol = f"{bar.symbol}.{bar.exchange.value}"
+        return self.save_columns(vt_symbol, bar.interval, columns)
+
+    def save_columns(
+        self,
+        vt_symbol: str,
+        interval,
+        columns: dict,
+        start: datetime = None,
+        end: datetime = None,
+    ):
+        """
+        Save column arrays (datetime and prices) into store.
+
+        [start, end] is added into coverage, which is from the first to
+        the last datetime of columns by default.
+        """
+        path = self.get_path(vt_symbol, interval)
+        path.mkdir(parents=True, exist_ok=True)
+
+        columns = {
+            name: np.asarray(columns[name]) for name in ["datetime"] + PRICE_COLUMNS
+        }
+        columns["datetime"] = columns["datetime"].astype(DATETIME_DTYPE)
+
+        if not len(columns["datetime"]):
+            return 0
+
+        if start:
+            start = np.datetime64(start, "ns")
+        else:
+            start = columns["datetime"].min()
+
+        if end:
+            end = np.datetime64(end, "ns")
+        else:
+            end = columns["datetime"].max()
+
+        # Merge with existing data, new rows take priority.
+        if self.has_data(vt_symbol, interval):
+            for name, array in columns.items():
+                old_array = np.load(path.joinpath(f"{name}.npy"))
+                columns[name] = np.concatenate([old_array, array])
+
+        order = np.argsort(columns["datetime"], kind="stable")
+        dt = columns["datetime"][order]
+        keep = np.append(dt[1:] != dt[:-1], True)
+        index = order[keep]
+
+        for name, array in columns.items():
+            self._save_array(path, name, array[index])
+
+        days, day_offset = self._generate_day_index(dt[keep])
+        self._save_array(path, "day", days)
+        self._save_array(path, "day_offset", day_offset)
+
+        self.add_coverage(vt_symbol, interval, start, end)
+
+        return len(index)
+
+    def import_from_database(
+        self,
+        vt_symbol: str,
+        interval,
+        start: datetime = None,
+        end: datetime = None,
+    ):
+        """
+        Import bar data from SQLite database into store.
+
+        [start, end] is recorded as covered, and end is now if not given.
+        """
+        interval_value = get_interval_value(interval)
+
+        query = (
+            DbBarData.select(
+                DbBarData.datetime,
+                DbBarData.open_price,
+                DbBarData.high_price,
+                DbBarData.low_price,
+                DbBarData.close_price,
+                DbBarData.volume,
+            )
+            .where(
+                (DbBarData.vt_symbol == vt_symbol)
+                & (DbBarData.interval == interval_value)
+            )
+            .order_by(DbBarData.datetime)
+        )
+        if start:
+            query = query.where(DbBarData.datetime >= start)
+        if end:
+            query = query.where(DbBarData.datetime <= end)
+
+        rows = list(query.tuples())
+        if not rows:
+            return 0
+
+        data = list(zip(*rows))
+        columns = {"datetime": np.array(data[0], dtype=DATETIME_DTYPE)}
+        for name, values in zip(PRICE_COLUMNS, data[1:]):
+            columns[name] = np.array(values, dtype=float)
+
+        if not end:
+            end = datetime.now()
+
+        return self.save_columns(
+            vt_symbol, interval_value, columns, start, end
+        )
+
+    def load_bar_columns(
+        self,
+        vt_symbol: str,
+        interval,
+        start: datetime = None,
+        end: datetime = None,
+    ):
+        """
+        Load column arrays of bar data within [start, end].
+
+        Returned arrays are zero-copy views of memory-mapped files.
+        None is returned if vt_symbol/interval is not saved in store.
+        """
+        if not self.has_data(vt_symbol, interval):
+            return None
+
+        path = self.get_path(vt_symbol, interval)
+        dt = self._load_array(path, "datetime")
+
+        ix_start = 0
+        ix_end = len(dt)
+        if start:
+            ix_start = dt.searchsorted(np.datetime64(start, "ns"), side="left")
+        if end:
+            ix_end = dt.searchsorted(np.datetime64(end, "ns"), side="right")
+
+        symbol, exchange_str = vt_symbol.split(".")
+        columns = BarColumns(
+            symbol=symbol,
+            exchange=Exchange(exchange_str),
+            interval=get_interval_value(interval),
+            datetime=dt[ix_start:ix_end],
+            **{
+                name: self._load_array(path, name)[ix_start:ix_end]
+                for name in PRICE_COLUMNS
+            },
+        )
+        return columns
+
+    def load_day_index(self, vt_symbol: str, interval):
+        """
+        Load day partition index of vt_symbol/interval.
+
+        Return (days, day_offset) where rows of days[i] are located in
+        [day_offset[i], day_offset[i + 1]).
+        """
+        if not self.has_data(vt_symbol, interval):
+            return None, None
+
+        path = self.get_path(vt_symbol, interval)
+        days = self._load_array(path, "day")
+        day_offset = self._load_array(path, "day_offset")
+        return days, day_offset
+
+    @staticmethod
+    def _generate_day_index(dt: np.ndarray):
+        """
+        Generate first row offset of each day from sorted datetime array.
+        """
+        day_array = dt.astype(DAY_DTYPE)
+        days, day_offset = np.unique(day_array, return_index=True)
+        day_offset = np.append(day_offset, len(dt)).astype(np.int64)
+        return days, day_offset
+
+    @staticmethod
+    def _load_array(path: Path, name: str):
+        """"""
+        return np.load(path.joinpath(f"{name}.npy"), mmap_mode="r")
+
+    @staticmethod
+    def _save_array(path: Path, name: str, array: np.ndarray):
+        """
+        Write to a temp file first, then replace old file at once.
+        """
+        temp_path = path.joinpath(f"{name}.tmp.npy")
+        np.save(temp_path, array)
+        os.replace(temp_path, path.joinpath(f"{name}.npy"))
@@ -1,6 +1,19 @@
 """"""
 
-from peewee import SqliteDatabase, Model, CharField, DateTimeField, FloatField
+from datetime import datetime
+from enum import Enum
+from time import perf_counter
+from typing import Iterable
+
+from pandas import DataFrame
+from peewee import (
+    SqliteDatabase,
+    Model,
+    CharField,
+    DateTimeField,
+    FloatField,
+    chunked,
+)
 
 #from .constant import Exchange, Interval
 #from .object import BarData, TickData
@@ -11,7 +24,22 @@ from vnpy.trader.utility import get_file_path
 
 DB_NAME = "database.db"
 dbname = str(get_file_path(DB_NAME))
-DB = SqliteDatabase(str(get_file_path(DB_NAME)))
+DB = SqliteDatabase(
+    str(get_file_path(DB_NAME)),
+    pragmas={
+        "journal_mode": "wal",      # readers are not blocked by writer
+        "synchronous": "normal",    # safe in WAL mode, much less fsync
+        "cache_size": -64 * 1024,   # 64MB page cache
+        "temp_store": "memory",
+    }
+)
+
+# Number of rows committed in one transaction by bulk writer, and
+# number of rows loaded in one query by streaming loader.
+CHUNK_SIZE = 50_000
+
+# Names of data object attributes saved in fields with different name.
+TICK_FIELD_ALIASES = {"close_price": "pre_close"}
 
 
 class DbBarData(Model):
@@ -100,7 +128,7 @@ class DbTickData(Model):
     open_price = FloatField()
     high_price = FloatField()
     low_price = FloatField()
-    close_price = FloatField()
+    close_price = FloatField()  # pre_close of tick
 
     bid_price_1 = FloatField()
     bid_price_2 = FloatField()
@@ -152,7 +180,7 @@ class DbTickData(Model):
         db_tick.open_price = tick.open_price
         db_tick.high_price = tick.high_price
         db_tick.low_price = tick.low_price
-        db_tick.pre_close = tick.pre_close
+        db_tick.close_price = tick.pre_close
 
         db_tick.bid_price_1 = tick.bid_price_1
         db_tick.ask_price_1 = tick.ask_price_1
@@ -183,7 +211,7 @@ class DbTickData(Model):
         db_tick.vt_symbol = tick.vt_symbol
         db_tick.gateway_name = "DB"
 
-        return tick
+        return db_tick
 
     def to_tick(self):
         """
@@ -202,7 +230,7 @@ class DbTickData(Model):
             open_price=self.open_price,
             high_price=self.high_price,
             low_price=self.low_price,
-            pre_close=self.pre_close,
+            pre_close=self.close_price,
             bid_price_1=self.bid_price_1,
             ask_price_1=self.ask_price_1,
             bid_volume_1=self.bid_volume_1,
@@ -234,5 +262,198 @@ class DbTickData(Model):
         return tick
 
 
+def generate_rows(
+    data, model: type, constants: dict, aliases: dict = None
+):
+    """
+    Generate row tuples of model fields from data objects or DataFrame.
+
+    DataFrame columns are named as fields of model, and datetime can
+    also be index of DataFrame. Values in constants are used for fields
+    which are the same for all rows (symbol, exchange, etc.). Data
+    object attributes are read with names in aliases if found.
+    """
+    field_names = get_field_names(model)
+    constants.setdefault("gateway_name", "DB")
+
+    if isinstance(data, DataFrame):
+        if "datetime" not in data.columns:
+            data = data.rename_axis("datetime").reset_index()
+        items = data.to_dict("records")
+        get_value = dict.get
+    else:
+        items = data
+        attribute_names = aliases or {}
+
+        def get_value(item, name, default):
+            """Get attribute of data object."""
+            return getattr(item, attribute_names.get(name, name), default)
+
+    for item in items:
+        values = {}
+        for name in field_names:
+            if name in constants:
+                value = constants[name]
+            else:
+                value = get_value(item, name, None)
+
+            if isinstance(value, Enum):
+                value = value.value
+            elif value is None:
+                value = 0
+
+            values[name] = value
+
+        if not values["vt_symbol"]:
+            values["vt_symbol"] = f"{values['symbol']}.{values['exchange']}"
+
+        # Saved in the same text format as DateTimeField.
+        dt = values["datetime"]
+        if hasattr(dt, "to_pydatetime"):
+            dt = dt.to_pydatetime()
+        values["datetime"] = dt.isoformat(" ")
+
+        yield tuple(values[name] for name in field_names)
+
+
+def get_field_names(model: type):
+    """
+    Get names of fields to be saved, except primary key.
+    """
+    return [name for name in model._meta.sorted_field_names if name != "id"]
+
+
+def save_data(
+    model: type,
+    data,
+    chunk_size: int,
+    constants: dict,
+    aliases: dict = None
+):
+    """
+    Save data into database with chunked upserts.
+
+    Each chunk is written by one executemany of a prepared
+    INSERT OR REPLACE statement and committed in one transaction, which
+    avoids building SQL for every row. Return number of rows saved and
+    rows saved per second.
+    """
+    field_names = get_field_names(model)
+    columns = ", ".join(
+        f'"{model._meta.fields[name].column_name}"' for name in field_names
+    )
+    placeholders = ", ".join("?" * len(field_names))
+    sql = (
+        f'INSERT OR REPLACE INTO "{model._meta.table_name}" '
+        f"({columns}) VALUES ({placeholders})"
+    )
+
+    start = perf_counter()
+    count = 0
+
+    rows = generate_rows(data, model, dict(constants), aliases)
+    for chunk in chunked(rows, chunk_size):
+        with DB.atomic():
+            DB.cursor().executemany(sql, chunk)
+        count += len(chunk)
+
+    cost = perf_counter() - start
+    if cost:
+        speed = count / cost
+    else:
+        speed = 0
+
+    return count, speed
+
+
+def save_bar_data(
+    data: Iterable[BarData], chunk_size: int = CHUNK_SIZE, **constants
+):
+    """
+    Bulk save bar data into database, existing bars with the same
+    vt_symbol, interval and datetime are replaced.
+
+    Data can be iterable of BarData or DataFrame, see generate_rows.
+    Return number of bars saved and bars saved per second.
+    """
+    return save_data(DbBarData, data, chunk_size, constants)
+
+
+def save_tick_data(
+    data: Iterable[TickData], chunk_size: int = CHUNK_SIZE, **constants
+):
+    """
+    Bulk save tick data into database, existing ticks with the same
+    vt_symbol and datetime are replaced.
+
+    Data can be iterable of TickData or DataFrame, see generate_rows.
+    Return number of ticks saved and ticks saved per second.
+    """
+    return save_data(
+        DbTickData, data, chunk_size, constants, TICK_FIELD_ALIASES
+    )
+
+
+def load_chunks(model: type, condition, start, end, chunk_size: int):
+    """
+    Generator of model objects within [start, end], loaded by chunks.
+
+    Each chunk is queried with keyset pagination on datetime (rows after
+    the last datetime of previous chunk), so that only one chunk is kept
+    in memory and no query needs to skip rows with offset.
+    """
+    query = model.select().where(condition).order_by(model.datetime)
+    if end:
+        query = query.where(model.datetime <= end)
+
+    last_datetime = None
+    while True:
+        if last_datetime:
+            chunk_query = query.where(model.datetime > last_datetime)
+        elif start:
+            chunk_query = query.where(model.datetime >= start)
+        else:
+            chunk_query = query
+
+        rows = list(chunk_query.limit(chunk_size))
+        yield from rows
+
+        if len(rows) < chunk_size:
+            break
+        last_datetime = rows[-1].datetime
+
+
+def load_bar_data(
+    vt_symbol: str,
+    interval: str,
+    start: datetime = None,
+    end: datetime = None,
+    chunk_size: int = CHUNK_SIZE,
+):
+    """
+    Generator of BarData loaded from database chunk by chunk.
+    """
+    condition = (
+        (DbBarData.vt_symbol == vt_symbol)
+        & (DbBarData.interval == interval)
+    )
+    for db_bar in load_chunks(DbBarData, condition, start, end, chunk_size):
+        yield db_bar.to_bar()
+
+
+def load_tick_data(
+    vt_symbol: str,
+    start: datetime = None,
+    end: datetime = None,
+    chunk_size: int = CHUNK_SIZE,
+):
+    """
+    Generator of TickData loaded from database chunk by chunk.
+    """
+    condition = DbTickData.vt_symbol == vt_symbol
+    for db_tick in load_chunks(DbTickData, condition, start, end, chunk_size):
+        yield db_tick.to_tick()
+
+
 DB.connect()
 DB.create_tables([DbBarData, DbTickData])
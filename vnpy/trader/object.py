@@ -2,15 +2,67 @@
 Basic data structure used for general trading function in VN Trader.
 """
 
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, fields
 from datetime import datetime
 from logging import INFO
+from operator import attrgetter
 
 from .constant import Direction, Exchange, Interval, Offset, Status, Product, OptionType, PriceType
 
 ACTIVE_STATUSES = set([Status.SUBMITTING, Status.NOTTRADED, Status.PARTTRADED])
 
+VT_SYMBOLS = {}     # (symbol, exchange): vt_symbol
 
+
+def get_vt_symbol(symbol: str, exchange: Exchange):
+    """
+    Get vt_symbol of symbol and exchange, the same string object is
+    returned for the same contract.
+    """
+    key = (symbol, exchange)
+
+    vt_symbol = VT_SYMBOLS.get(key, None)
+    if not vt_symbol:
+        vt_symbol = sys.intern(f"{symbol}.{exchange.value}")
+        VT_SYMBOLS[key] = vt_symbol
+
+    return vt_symbol
+
+
+def add_slots(*extra_names: str):
+    """
+    Class decorator which recreates a dataclass with __slots__ of its
+    own fields and extra attribute names, so that instances have no
+    __dict__.
+
+    Default values of fields are kept by generated __init__, and
+    removed from class namespace to avoid conflict with slots.
+    """
+    def decorator(cls: type):
+        """"""
+        base_names = set()
+        for base in cls.__mro__[1:]:
+            base_names.update(getattr(base, "__slots__", ()))
+
+        names = tuple(
+            field.name for field in fields(cls)
+            if field.name not in base_names
+        ) + extra_names
+
+        namespace = dict(cls.__dict__)
+        for name in names:
+            namespace.pop(name, None)
+        namespace.pop("__dict__", None)
+        namespace.pop("__weakref__", None)
+        namespace["__slots__"] = names
+
+        return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+    return decorator
+
+
+@add_slots()
 @dataclass
 class BaseData:
     """
@@ -21,6 +73,7 @@ class BaseData:
     gateway_name: str
 
 
+@add_slots("vt_symbol")
 @dataclass
 class TickData(BaseData):
     """
@@ -28,6 +81,9 @@ class TickData(BaseData):
         * last trade in market
         * orderbook snapshot
         * intraday market statistics.
+
+    Tick data is created and copied for every market data update, so it
+    is slotted to save memory and time.
     """
 
     symbol: str
@@ -70,9 +126,21 @@ class TickData(BaseData):
     ask_volume_4: float = 0
     ask_volume_5: float = 0
 
+    epoch_ns: int = 0   # optional integer nanoseconds of datetime
+
     def __post_init__(self):
         """"""
-        self.vt_symbol = f"{self.symbol}.{self.exchange.value}"
+        self.vt_symbol = get_vt_symbol(self.symbol, self.exchange)
+
+    def __copy__(self):
+        """
+        Copy by passing all field values to __init__, faster than the
+        default copy protocol.
+        """
+        return TickData(*get_tick_values(self))
+
+
+get_tick_values = attrgetter(*[field.name for field in fields(TickData)])
 
 
 @dataclass
@@ -94,7 +162,7 @@ class BarData(BaseData):
 
     def __post_init__(self):
         """"""
-        self.vt_symbol = f"{self.symbol}.{self.exchange}"
+        self.vt_symbol = f"{self.symbol}.{self.exchange.value}"
 
 
 @dataclass
@@ -0,0 +1,114 @@
+"""
+Fast parsing of fixed format timestamps received by gateways.
+
+Date part of timestamps changes only once a day, so it is parsed once
+and cached, and time part is parsed by slicing fixed positions instead
+of datetime.strptime.
+"""
+
+from datetime import datetime
+
+EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+# Max number of date strings cached before the cache is cleared.
+DATE_CACHE_SIZE = 1024
+
+date_cache = {}     # date string: (year, month, day)
+
+
+def parse_date(date_str: str):
+    """
+    Parse date string of format YYYYMMDD or YYYY-MM-DD into tuple of
+    (year, month, day).
+    """
+    fields = date_cache.get(date_str, None)
+    if fields:
+        return fields
+
+    if len(date_str) == 8:
+        fields = (int(date_str[:4]), int(date_str[4:6]), int(date_str[6:8]))
+    else:
+        fields = (int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10]))
+
+    if len(date_cache) >= DATE_CACHE_SIZE:
+        date_cache.clear()
+    date_cache[date_str] = fields
+
+    return fields
+
+
+def parse_microsecond(fraction: str):
+    """
+    Convert digits of fraction of second into microseconds.
+    """
+    if not fraction:
+        return 0
+    return int(fraction[:6].ljust(6, "0"))
+
+
+def parse_timestamp(date_str: str, time_str: str):
+    """
+    Parse date (YYYYMMDD or YYYY-MM-DD) and time (HH:MM:SS with optional
+    fraction of second such as HH:MM:SS.5) into datetime.
+    """
+    year, month, day = parse_date(date_str)
+
+    return datetime(
+        year,
+        month,
+        day,
+        int(time_str[:2]),
+        int(time_str[3:5]),
+        int(time_str[6:8]),
+        parse_microsecond(time_str[9:])
+    )
+
+
+def parse_ctp_timestamp(date_str: str, time_str: str, millisecond: int):
+    """
+    Parse ActionDay (YYYYMMDD), UpdateTime (HH:MM:SS) and UpdateMillisec
+    of CTP market data into datetime.
+    """
+    year, month, day = parse_date(date_str)
+
+    return datetime(
+        year,
+        month,
+        day,
+        int(time_str[:2]),
+        int(time_str[3:5]),
+        int(time_str[6:8]),
+        int(millisecond) * 1000
+    )
+
+
+def parse_iso_timestamp(timestamp: str):
+    """
+    Parse ISO 8601 UTC timestamp such as 2019-01-01T08:00:00.123Z into
+    naive datetime.
+    """
+    year, month, day = parse_date(timestamp[:10])
+
+    return datetime(
+        year,
+        month,
+        day,
+        int(timestamp[11:13]),
+        int(timestamp[14:16]),
+        int(timestamp[17:19]),
+        parse_microsecond(timestamp[20:].rstrip("Z"))
+    )
+
+
+def get_epoch_ns(dt: datetime):
+    """
+    Get integer nanoseconds since 1970-01-01 of a naive datetime, without
+    any time zone conversion.
+    """
+    seconds = (
+        (dt.toordinal() - EPOCH_ORDINAL) * 86400
+        + dt.hour * 3600
+        + dt.minute * 60
+        + dt.second
+    )
+    return seconds * 1_000_000_000 + dt.microsecond * 1000
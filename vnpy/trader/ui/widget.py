@@ -182,6 +182,7 @@ class BaseMonitor(QtWidgets.QTableWidget):
     event_type = ""
     data_key = ""
     sorting = False
+    latest_only = False     # Only process latest event of each vt_symbol
     headers = {}
 
     signal = QtCore.pyqtSignal(Event)
@@ -235,7 +236,12 @@ class BaseMonitor(QtWidgets.QTableWidget):
         Register event handler into event engine.
         """
         self.signal.connect(self.process_event)
-        self.event_engine.register(self.event_type, self.signal.emit)
+
+        if self.latest_only:
+            self.event_engine.register_latest(
+                self.event_type, self.signal.emit)
+        else:
+            self.event_engine.register(self.event_type, self.signal.emit)
 
     def process_event(self, event):
         """
@@ -340,6 +346,7 @@ class TickMonitor(BaseMonitor):
     event_type = EVENT_TICK
     data_key = "vt_symbol"
     sorting = True
+    latest_only = True
 
     headers = {
         "symbol": {"display": "代码", "cell": BaseCell, "update": False},
@@ -705,7 +712,7 @@ class TradingWidget(QtWidgets.QWidget):
     def register_event(self):
         """"""
         self.signal_tick.connect(self.process_tick_event)
-        self.event_engine.register(EVENT_TICK, self.signal_tick.emit)
+        self.event_engine.register_latest(EVENT_TICK, self.signal_tick.emit)
 
     def process_tick_event(self, event: Event):
         """"""
@@ -3,6 +3,8 @@ General utility functions.
 """
 
 import json
+from collections import deque
+from math import sqrt
 from pathlib import Path
 from typing import Callable
 
@@ -212,24 +214,481 @@ class BarGenerator:
         self.bar = None
 
 
+def is_zero(value: float, scale: float = 0):
+    """
+    Check if value is zero before dividing, as talib does: exactly zero,
+    or within 1e-14 of scale of the values it is calculated from.
+    """
+    return abs(value) <= 0.00000000000001 * abs(scale)
+
+
+def get_true_range(high: float, low: float, pre_close: float):
+    """
+    True range of bar, same as talib.TRANGE.
+    """
+    return max(high - low, abs(pre_close - high), abs(pre_close - low))
+
+
+class IncrementalIndicator:
+    """
+    Base class of indicator updated in constant time with every new bar.
+
+    Value of indicator is nan before enough bars are received. Values
+    are the same as talib function calculated over all bars updated.
+    """
+
+    def __init__(self):
+        """"""
+        self.count = 0
+        self.value = np.nan
+
+    def update(self, high: float, low: float, close: float):
+        """
+        Update indicator with new bar, and return the latest value.
+        """
+        raise NotImplementedError
+
+
+class SmaIndicator(IncrementalIndicator):
+    """
+    Simple moving average, same as talib.SMA.
+    """
+
+    def __init__(self, n: int):
+        """"""
+        super(SmaIndicator, self).__init__()
+        self.n = n
+        self.window = deque()
+        self.total = 0
+
+    def update(self, high: float, low: float, close: float):
+        """"""
+        self.count += 1
+        self.window.append(close)
+        self.total += close
+
+        if self.count >= self.n:
+            self.value = self.total / self.n
+            self.total -= self.window.popleft()
+
+        return self.value
+
+
+class EmaIndicator(IncrementalIndicator):
+    """
+    Exponential moving average seeded with simple average of first n
+    values, same as talib.EMA.
+    """
+
+    def __init__(self, n: int):
+        """"""
+        super(EmaIndicator, self).__init__()
+        self.n = n
+        self.k = 2 / (n + 1)
+        self.total = 0
+
+    def update(self, high: float, low: float, close: float):
+        """"""
+        self.count += 1
+
+        if self.count < self.n:
+            self.total += close
+        elif self.count == self.n:
+            self.total += close
+            self.value = self.total / self.n
+        else:
+            self.value = (close - self.value) * self.k + self.value
+
+        return self.value
+
+
+class StdIndicator(IncrementalIndicator):
+    """
+    Population standard deviation, same as talib.STDDEV.
+
+    Running sums are kept on values shifted by a reference price, and
+    recalculated from window every n bars, so that rounding errors
+    neither grow with price level nor accumulate over time. Update cost
+    is constant amortized.
+    """
+
+    def __init__(self, n: int):
+        """"""
+        super(StdIndicator, self).__init__()
+        self.n = n
+        self.window = deque()
+        self.reference = 0
+        self.total = 0
+        self.square_total = 0
+
+    def update(self, high: float, low: float, close: float):
+        """"""
+        self.count += 1
+        self.window.append(close)
+
+        if len(self.window) > self.n:
+            old = self.window.popleft() - self.reference
+            self.total -= old
+            self.square_total -= old * old
+
+        if not self.count % self.n:
+            self.reference = close
+            self.total = 0
+            self.square_total = 0
+
+            for value in self.window:
+                value -= close
+                self.total += value
+                self.square_total += value * value
+        else:
+            value = close - self.reference
+            self.total += value
+            self.square_total += value * value
+
+        if self.count >= self.n:
+            mean = self.total / self.n
+            variance = self.square_total / self.n - mean * mean
+
+            if variance < 0.00000001:
+                self.value = 0
+            else:
+                self.value = sqrt(variance)
+
+        return self.value
+
+
+class AtrIndicator(IncrementalIndicator):
+    """
+    Average true range with Wilder smoothing, same as talib.ATR.
+    """
+
+    def __init__(self, n: int):
+        """"""
+        super(AtrIndicator, self).__init__()
+        self.n = n
+        self.total = 0
+        self.pre_close = 0
+
+    def update(self, high: float, low: float, close: float):
+        """"""
+        self.count += 1
+
+        if self.count > 1:
+            tr = get_true_range(high, low, self.pre_close)
+
+            if self.n == 1:
+                self.value = tr
+            elif self.count <= self.n:
+                self.total += tr
+            elif self.count == self.n + 1:
+                self.total += tr
+                self.value = self.total / self.n
+            else:
+                self.value = (self.value * (self.n - 1) + tr) / self.n
+
+        self.pre_close = close
+        return self.value
+
+
+class RsiIndicator(IncrementalIndicator):
+    """
+    Relative strength index, same as talib.RSI.
+    """
+
+    def __init__(self, n: int):
+        """"""
+        super(RsiIndicator, self).__init__()
+        self.n = n
+        self.gain = 0
+        self.loss = 0
+        self.pre_close = 0
+
+    def update(self, high: float, low: float, close: float):
+        """"""
+        self.count += 1
+
+        if self.count > 1:
+            diff = close - self.pre_close
+
+            if self.count > self.n + 1:
+                self.gain *= self.n - 1
+                self.loss *= self.n - 1
+
+            if diff < 0:
+                self.loss -= diff
+            else:
+                self.gain += diff
+
+            if self.count >= self.n + 1:
+                self.gain /= self.n
+                self.loss /= self.n
+
+                total = self.gain + self.loss
+                if is_zero(total):
+                    self.value = 0
+                else:
+                    self.value = 100 * (self.gain / total)
+
+        self.pre_close = close
+        return self.value
+
+
+class MacdIndicator(IncrementalIndicator):
+    """
+    MACD, same as talib.MACD.
+
+    Value is tuple of (macd, signal, hist). Both fast and slow EMA start
+    at the slow_period-th bar, seeded with simple average of their own
+    period, as talib does.
+    """
+
+    def __init__(self, fast_period: int, slow_period: int, signal_period: int):
+        """"""
+        super(MacdIndicator, self).__init__()
+
+        if slow_period < fast_period:
+            fast_period, slow_period = slow_period, fast_period
+
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.signal_period = signal_period
+
+        self.fast_k = 2 / (fast_period + 1)
+        self.slow_k = 2 / (slow_period + 1)
+        self.signal_k = 2 / (signal_period + 1)
+
+        self.value = (np.nan, np.nan, np.nan)
+
+        self.window = deque(maxlen=fast_period)
+        self.slow_total = 0
+        self.fast_ema = 0
+        self.slow_ema = 0
+
+        self.macd_count = 0
+        self.macd_total = 0
+        self.signal = 0
+
+    def update(self, high: float, low: float, close: float):
+        """"""
+        self.count += 1
+
+        if self.count < self.slow_period:
+            self.window.append(close)
+            self.slow_total += close
+            return self.value
+        elif self.count == self.slow_period:
+            self.window.append(close)
+            self.slow_total += close
+            self.fast_ema = sum(self.window) / self.fast_period
+            self.slow_ema = self.slow_total / self.slow_period
+        else:
+            self.fast_ema = (close - self.fast_ema) * self.fast_k + self.fast_ema
+            self.slow_ema = (close - self.slow_ema) * self.slow_k + self.slow_ema
+
+        macd = self.fast_ema - self.slow_ema
+        self.macd_count += 1
+
+        if self.macd_count < self.signal_period:
+            self.macd_total += macd
+            return self.value
+        elif self.macd_count == self.signal_period:
+            self.macd_total += macd
+            self.signal = self.macd_total / self.signal_period
+        else:
+            self.signal = (macd - self.signal) * self.signal_k + self.signal
+
+        self.value = (macd, self.signal, macd - self.signal)
+        return self.value
+
+
+class CciIndicator(IncrementalIndicator):
+    """
+    Commodity channel index, same as talib.CCI.
+
+    Mean deviation has to be summed over the window, so each update
+    costs O(n) instead of O(1), but still avoids recalculating over the
+    whole array.
+    """
+
+    def __init__(self, n: int):
+        """"""
+        super(CciIndicator, self).__init__()
+        self.n = n
+        self.window = deque(maxlen=n)
+
+    def update(self, high: float, low: float, close: float):
+        """"""
+        self.count += 1
+
+        typical_price = (high + low + close) / 3
+        self.window.append(typical_price)
+
+        if self.count >= self.n:
+            mean = sum(self.window) / self.n
+
+            deviation = 0
+            for price in self.window:
+                deviation += abs(price - mean)
+
+            diff = typical_price - mean
+            deviation /= self.n
+
+            if not is_zero(diff, mean) and not is_zero(deviation, mean):
+                self.value = diff / (0.015 * deviation)
+            else:
+                self.value = 0
+
+        return self.value
+
+
+class AdxIndicator(IncrementalIndicator):
+    """
+    Average directional movement index, same as talib.ADX.
+    """
+
+    def __init__(self, n: int):
+        """"""
+        super(AdxIndicator, self).__init__()
+        self.n = n
+
+        self.pre_high = 0
+        self.pre_low = 0
+        self.pre_close = 0
+
+        self.plus_dm = 0
+        self.minus_dm = 0
+        self.tr = 0
+        self.dx_total = 0
+
+    def update(self, high: float, low: float, close: float):
+        """"""
+        self.count += 1
+        n = self.n
+
+        if self.count > 1:
+            diff_plus = high - self.pre_high
+            diff_minus = self.pre_low - low
+            tr = get_true_range(high, low, self.pre_close)
+
+            # Directional movement and true range are summed over first
+            # n-1 bars, then smoothed with Wilder method.
+            if self.count > n:
+                self.minus_dm -= self.minus_dm / n
+                self.plus_dm -= self.plus_dm / n
+
+            if diff_minus > 0 and diff_plus < diff_minus:
+                self.minus_dm += diff_minus
+            elif diff_plus > 0 and diff_plus > diff_minus:
+                self.plus_dm += diff_plus
+
+            if self.count > n:
+                self.tr = self.tr - self.tr / n + tr
+            else:
+                self.tr += tr
+
+            if self.count > n:
+                self.update_adx()
+
+        self.pre_high = high
+        self.pre_low = low
+        self.pre_close = close
+        return self.value
+
+    def update_adx(self):
+        """
+        Calculate dx of the bar, and update adx with it.
+        """
+        n = self.n
+
+        dx = None
+        if not is_zero(self.tr):
+            minus_di = 100 * (self.minus_dm / self.tr)
+            plus_di = 100 * (self.plus_dm / self.tr)
+
+            di_total = minus_di + plus_di
+            if not is_zero(di_total):
+                dx = 100 * (abs(minus_di - plus_di) / di_total)
+
+        # The first adx is simple average of dx of n bars.
+        if self.count < n * 2:
+            if dx is not None:
+                self.dx_total += dx
+        elif self.count == n * 2:
+            if dx is not None:
+                self.dx_total += dx
+            self.value = self.dx_total / n
+        elif dx is not None:
+            self.value = (self.value * (n - 1) + dx) / n
+
+
+class DonchianIndicator(IncrementalIndicator):
+    """
+    Donchian channel, same as talib.MAX of high and talib.MIN of low.
+
+    Value is tuple of (up, down). Monotonic queues keep the highest and
+    lowest price of window in amortized constant time.
+    """
+
+    def __init__(self, n: int):
+        """"""
+        super(DonchianIndicator, self).__init__()
+        self.n = n
+        self.value = (np.nan, np.nan)
+
+        self.highs = deque()    # (count, high) in decreasing high
+        self.lows = deque()     # (count, low) in increasing low
+
+    def update(self, high: float, low: float, close: float):
+        """"""
+        self.count += 1
+        start = self.count - self.n
+
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((self.count, high))
+        if self.highs[0][0] <= start:
+            self.highs.popleft()
+
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((self.count, low))
+        if self.lows[0][0] <= start:
+            self.lows.popleft()
+
+        if self.count >= self.n:
+            self.value = (self.highs[0][1], self.lows[0][1])
+
+        return self.value
+
+
 class ArrayManager(object):
     """
     For:
     1. time series container of bar data
     2. calculating technical indicator value
+
+    If incremental is True, latest indicator values (array=False) are
+    calculated by incremental indicators updated with every new bar,
+    instead of recalculating talib over the whole array. Each indicator
+    is warmed up with bars in array when first used, and then gives the
+    same value as talib calculated over all bars since then.
     """
 
-    def __init__(self, size=100):
+    def __init__(self, size=100, incremental=False):
         """Constructor"""
         self.count = 0
         self.size = size
         self.inited = False
 
-        self.open_array = np.zeros(size)
-        self.high_array = np.zeros(size)
-        self.low_array = np.zeros(size)
-        self.close_array = np.zeros(size)
-        self.volume_array = np.zeros(size)
+        self.incremental = incremental
+        self.indicators = {}
+
+        # Bars are saved in a ring buffer of double length, every value
+        # is written both at ix and ix + size. So the latest [size] bars
+        # are always in one contiguous slice, which is used as array
+        # of each column without copying.
+        self.buffer = np.zeros((5, size * 2))
+        self.start = 0
 
     def update_bar(self, bar):
         """
@@ -239,17 +698,83 @@ class ArrayManager(object):
         if not self.inited and self.count >= self.size:
             self.inited = True
 
-        self.open_array[:-1] = self.open_array[1:]
-        self.high_array[:-1] = self.high_array[1:]
-        self.low_array[:-1] = self.low_array[1:]
-        self.close_array[:-1] = self.close_array[1:]
-        self.volume_array[:-1] = self.volume_array[1:]
+        ix = self.start
+        values = (
+            bar.open_price,
+            bar.high_price,
+            bar.low_price,
+            bar.close_price,
+            bar.volume
+        )
+        self.buffer[:, ix] = values
+        self.buffer[:, ix + self.size] = values
+
+        self.start += 1
+        if self.start == self.size:
+            self.start = 0
+
+        for indicator in self.indicators.values():
+            indicator.update(bar.high_price, bar.low_price, bar.close_price)
+
+    def get_indicator(self, indicator_class: type, *params):
+        """
+        Get incremental indicator, which is created and updated with
+        bars in array when first used.
+        """
+        key = (indicator_class, params)
+        indicator = self.indicators.get(key, None)
+
+        if not indicator:
+            indicator = indicator_class(*params)
+
+            # Only bars received are used, not zeros filled before.
+            count = min(self.count, self.size)
+            if count:
+                for high, low, close in zip(
+                    self.high_array[-count:].tolist(),
+                    self.low_array[-count:].tolist(),
+                    self.close_array[-count:].tolist()
+                ):
+                    indicator.update(high, low, close)
+
+            self.indicators[key] = indicator
+
+        return indicator
+
+    @property
+    def open_array(self):
+        """
+        Get view of open price in ring buffer.
+        """
+        return self.buffer[0, self.start:self.start + self.size]
+
+    @property
+    def high_array(self):
+        """
+        Get view of high price in ring buffer.
+        """
+        return self.buffer[1, self.start:self.start + self.size]
+
+    @property
+    def low_array(self):
+        """
+        Get view of low price in ring buffer.
+        """
+        return self.buffer[2, self.start:self.start + self.size]
 
-        self.open_array[-1] = bar.open_price
-        self.high_array[-1] = bar.high_price
-        self.low_array[-1] = bar.low_price
-        self.close_array[-1] = bar.close_price
-        self.volume_array[-1] = bar.volume
+    @property
+    def close_array(self):
+        """
+        Get view of close price in ring buffer.
+        """
+        return self.buffer[3, self.start:self.start + self.size]
+
+    @property
+    def volume_array(self):
+        """
+        Get view of trading volume in ring buffer.
+        """
+        return self.buffer[4, self.start:self.start + self.size]
 
     @property
     def open(self):
@@ -290,15 +815,33 @@ class ArrayManager(object):
         """
         Simple moving average.
         """
+        if self.incremental and not array:
+            return self.get_indicator(SmaIndicator, n).value
+
         result = talib.SMA(self.close, n)
         if array:
             return result
         return result[-1]
 
+    def ema(self, n, array=False):
+        """
+        Exponential moving average.
+        """
+        if self.incremental and not array:
+            return self.get_indicator(EmaIndicator, n).value
+
+        result = talib.EMA(self.close, n)
+        if array:
+            return result
+        return result[-1]
+
     def std(self, n, array=False):
         """
         Standard deviation
         """
+        if self.incremental and not array:
+            return self.get_indicator(StdIndicator, n).value
+
         result = talib.STDDEV(self.close, n)
         if array:
             return result
@@ -308,6 +851,9 @@ class ArrayManager(object):
         """
         Commodity Channel Index (CCI).
         """
+        if self.incremental and not array:
+            return self.get_indicator(CciIndicator, n).value
+
         result = talib.CCI(self.high, self.low, self.close, n)
         if array:
             return result
@@ -317,6 +863,9 @@ class ArrayManager(object):
         """
         Average True Range (ATR).
         """
+        if self.incremental and not array:
+            return self.get_indicator(AtrIndicator, n).value
+
         result = talib.ATR(self.high, self.low, self.close, n)
         if array:
             return result
@@ -326,6 +875,9 @@ class ArrayManager(object):
         """
         Relative Strenght Index (RSI).
         """
+        if self.incremental and not array:
+            return self.get_indicator(RsiIndicator, n).value
+
         result = talib.RSI(self.close, n)
         if array:
             return result
@@ -335,6 +887,11 @@ class ArrayManager(object):
         """
         MACD.
         """
+        if self.incremental and not array:
+            return self.get_indicator(
+                MacdIndicator, fast_period, slow_period, signal_period
+            ).value
+
         macd, signal, hist = talib.MACD(
             self.close, fast_period, slow_period, signal_period
         )
@@ -346,6 +903,9 @@ class ArrayManager(object):
         """
         ADX.
         """
+        if self.incremental and not array:
+            return self.get_indicator(AdxIndicator, n).value
+
         result = talib.ADX(self.high, self.low, self.close, n)
         if array:
             return result
@@ -379,6 +939,9 @@ class ArrayManager(object):
         """
         Donchian Channel.
         """
+        if self.incremental and not array:
+            return self.get_indicator(DonchianIndicator, n).value
+
         up = talib.MAX(self.high, n)
         down = talib.MIN(self.low, n)
 